@@ -1,10 +1,47 @@
-import logging
+from __future__ import annotations
+
 import base64
-import io
-from typing import Optional, Dict, Any
-import requests
-from PIL import Image
+import dataclasses
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING, Optional, Dict, Any, List, Callable, Sequence, Tuple
+)
 from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from ..imaging import (
+    CanvasRegion, GeneratedImage, decode_image, encode_init_image,
+    fit_resolution, paste_into_region, prepare_image, preview_from_pil
+)
+from ..tiling import TiledCanvas, plan_tiles
+from .batch import BatchCall, GenerationRequest, coalesce
+from .cache import GenerationCache
+from .comfyui import (
+    PromptRun, WorkflowCache, list_checkpoints, list_input_options
+)
+from .pool import (
+    BackendNode, BackendPool, NoBackendAvailable, connection_errors
+)
+from .history import GenerationHistory
+from .metrics import Metrics, count, current, span
+from .monitor import HealthMonitor
+from .progress import ProgressPoller
+from .references import ReferenceAssets, ReferenceImage
+from .scheduler import JobScheduler
+from .streaming import iter_base64_array
+from .worker import Job, JobEngine
+
+if TYPE_CHECKING:
+    # requests and Pillow are only imported once the first job runs, so
+    # loading the plugin doesn't pull in the HTTP stack at Krita startup
+    from PIL import Image
 
 class StableDiffusionAPI(QObject):
     """Interface for communicating with local Stable Diffusion APIs."""
@@ -12,8 +49,25 @@ class StableDiffusionAPI(QObject):
     # Signals for progress updates
     generation_started = pyqtSignal()
     generation_progress = pyqtSignal(int)  # Progress percentage
-    generation_complete = pyqtSignal(Image.Image)  # Generated PIL Image
+    generation_eta = pyqtSignal(float)  # Estimated seconds remaining
+    generation_preview = pyqtSignal(QImage)  # Downsampled intermediate image
+    generation_complete = pyqtSignal(GeneratedImage)  # Converted result
     generation_failed = pyqtSignal(str)  # Error message
+    generation_cancelled = pyqtSignal()  # Running generation was cancelled
+    frame_complete = pyqtSignal(int, GeneratedImage)  # Frame index, result
+    batch_progress = pyqtSignal(int, int)  # Frames done, frames total
+    batch_complete = pyqtSignal()  # Every frame of a batch is done
+    tile_complete = pyqtSignal(GeneratedImage)  # Blended area of a tiled image
+    connection_checked = pyqtSignal(dict)  # Connection status information
+    catalog_updated = pyqtSignal(dict)  # Model, sampler and LoRA name lists
+    job_metrics = pyqtSignal(dict)  # Timing spans and counters of a finished job
+    history_added = pyqtSignal(int)  # Id of a new history entry
+    history_loaded = pyqtSignal(GeneratedImage)  # Past result, ready to insert
+    
+    # Bytes read per chunk when streaming large responses
+    STREAM_CHUNK_SIZE = 256 * 1024
+    # Encoded img2img sources kept for repeated passes over a region
+    INIT_IMAGE_CACHE_SIZE = 4
     
     def __init__(self, config):
         """Initialize the API interface.
@@ -24,16 +78,86 @@ class StableDiffusionAPI(QObject):
         super().__init__()
         self.config = config
         self.logger = logging.getLogger('Autoboarding.API')
-        self.session = requests.Session()
+        self.pool = BackendPool(
+            config.get_backend_urls(),
+            max_in_flight=config.max_jobs_per_backend,
+            max_retries=config.max_retries,
+            backoff=config.retry_backoff
+        )
+        # Every in-flight backend call needs a thread plus one for its
+        # poller, the health monitor holds one for good and one is spare
+        in_flight = len(self.pool.nodes) * self.pool.max_in_flight
+        self.engine = JobEngine(max(config.max_workers, 2 * in_flight + 2))
+        self.cache: Optional[GenerationCache] = None
+        if config.cache_enabled:
+            self.cache = GenerationCache(
+                config.cache_path, config.cache_max_mb * 1024 * 1024
+            )
+        self.metrics = Metrics(
+            config.cache_path.parent / "autoboarding_metrics.jsonl"
+            if config.metrics_log else None,
+            config.metrics_log_mb * 1024 * 1024
+        )
+        self.history: Optional[GenerationHistory] = None
+        if config.history_enabled:
+            try:
+                self.history = GenerationHistory(
+                    config.config_path.parent / "autoboarding_history",
+                    config.history_max_entries,
+                    config.history_max_mb * 1024 * 1024
+                )
+            except Exception as e:
+                self.logger.warning(f"Generation history disabled: {e}")
+        self.workflows = WorkflowCache()
+        self.references = ReferenceAssets()
+        self._checkpoints: Dict[str, List[str]] = {}  # ComfyUI files per URL
+        self._init_images: "OrderedDict[str, Tuple[bytes, Optional[bytes]]]" = OrderedDict()
+        self._init_lock = threading.Lock()
+        # Generation jobs not yet finished, with their parameters; several
+        # run at once when supersede_running is off
+        self._running: List[Tuple[Job, tuple]] = []
+        self._warm_up_job: Optional[Job] = None
+        self.monitor = HealthMonitor(
+            self.pool,
+            self._probe_node,
+            self._fetch_catalog,
+            self._report_status,
+            self.catalog_updated.emit,
+            config.health_interval,
+            config.health_max_interval,
+            config.catalog_interval
+        )
+        # Started by set_monitoring() once the docker is shown, so Krita
+        # sessions that never open it don't probe (or import requests)
+        self._monitor_job: Optional[Job] = None
+        self._monitoring = False
+    
+    def shutdown(self) -> None:
+        """Stop background jobs and release network resources."""
+        self.monitor.stop()
+        self.engine.shutdown()
+        self.pool.close()
+        if self.cache:
+            self.cache.flush()
+        if self.history:
+            self.history.close()
     
     def generate_image(self, prompt: str, negative_prompt: str = "",
                       width: Optional[int] = None,
                       height: Optional[int] = None,
                       steps: Optional[int] = None,
                       cfg_scale: Optional[float] = None,
-                      sampler: Optional[str] = None) -> None:
+                      sampler: Optional[str] = None,
+                      seed: int = -1,
+                      checkpoint: str = "") -> Job:
         """Generate an image using the configured backend.
         
+        The request runs on a background job; the result is reported
+        through the generation_* signals. If a generation is already
+        running, identical requests are ignored and, with
+        supersede_running enabled, changed requests interrupt it and
+        discard its result.
+        
         Args:
             prompt: Text prompt for generation
             negative_prompt: Negative text prompt
@@ -42,99 +166,1102 @@ class StableDiffusionAPI(QObject):
             steps: Number of generation steps (uses default if None)
             cfg_scale: Guidance scale (uses default if None)
             sampler: Sampler name (uses default if None)
+            seed: Generation seed (-1 for random)
+            checkpoint: Checkpoint to use ("" keeps the backend default)
+            
+        Returns:
+            The queued background Job
+        """
+        request = self.make_request(
+            prompt, negative_prompt, width, height,
+            steps, cfg_scale, sampler, seed, checkpoint=checkpoint
+        )
+        return self._submit_generation(self._run_generation, [request])
+    
+    def generate_img2img(self, region: CanvasRegion, prompt: str,
+                         negative_prompt: str = "",
+                         width: Optional[int] = None,
+                         height: Optional[int] = None,
+                         steps: Optional[int] = None,
+                         cfg_scale: Optional[float] = None,
+                         sampler: Optional[str] = None,
+                         seed: int = -1,
+                         denoising_strength: float = 0.75,
+                         checkpoint: str = "") -> Job:
+        """Regenerate a canvas region (img2img, or inpainting with a mask).
+        
+        The region is scaled to the pixel count of width x height,
+        keeping its aspect ratio, on a worker thread. The result is
+        reported through generation_complete scaled back to the region
+        and positioned at it, ready to paste.
+        
+        Args:
+            region: Pixels read from the canvas, see export_region()
+            prompt: Text prompt for generation
+            negative_prompt: Negative text prompt
+            width: Target width (uses default if None)
+            height: Target height (uses default if None)
+            steps: Number of generation steps (uses default if None)
+            cfg_scale: Guidance scale (uses default if None)
+            sampler: Sampler name (uses default if None)
+            seed: Generation seed (-1 for random)
+            denoising_strength: 0 keeps the region, 1 ignores it
+            checkpoint: Checkpoint to use ("" keeps the backend default)
+            
+        Returns:
+            The queued background Job
+        """
+        width, height = fit_resolution(
+            region.width, region.height,
+            width or self.config.default_width,
+            height or self.config.default_height
+        )
+        request = self.make_request(
+            prompt, negative_prompt, width, height, steps, cfg_scale,
+            sampler, seed, checkpoint=checkpoint, init_image=region,
+            denoising_strength=denoising_strength
+        )
+        return self._submit_generation(self._run_generation, [request])
+    
+    def generate_tiled(self, prompt: str, width: int, height: int,
+                       negative_prompt: str = "",
+                       steps: Optional[int] = None,
+                       cfg_scale: Optional[float] = None,
+                       sampler: Optional[str] = None,
+                       seed: int = -1,
+                       checkpoint: str = "") -> Job:
+        """Generate an image larger than a backend can render in one go.
+        
+        A base image is generated at the default resolution and upscaled
+        to the target size, then refined in overlapping tiles of at most
+        tile_size pixels with img2img. Tiles run as independent backend
+        calls across the whole pool and are feather-blended into the
+        upscaled base as they finish.
+        
+        The upscaled base and then every blended tile are reported
+        through tile_complete, positioned in the target; batch_progress
+        counts finished tiles and batch_complete follows the last one.
+        
+        Args:
+            prompt: Text prompt for generation
+            width: Target width
+            height: Target height
+            negative_prompt: Negative text prompt
+            steps: Number of generation steps (uses default if None)
+            cfg_scale: Guidance scale (uses default if None)
+            sampler: Sampler name (uses default if None)
+            seed: Generation seed (-1 for random)
+            checkpoint: Checkpoint to use ("" keeps the backend default)
+            
+        Returns:
+            The queued background Job
+        """
+        # Tiles and the base are fixed to one seed so their detail agrees
+        if seed < 0:
+            seed = random.randrange(2 ** 31)
+        width, height = (max(64, width // 8 * 8), max(64, height // 8 * 8))
+        base_width, base_height = fit_resolution(
+            width, height, self.config.default_width, self.config.default_height
+        )
+        request = self.make_request(
+            prompt, negative_prompt, base_width, base_height,
+            steps, cfg_scale, sampler, seed, checkpoint=checkpoint
+        )
+        return self._submit_generation(
+            self._run_tiled, [request], width, height
+        )
+    
+    def generate_batch(self, requests: List[GenerationRequest]) -> Job:
+        """Generate a storyboard batch using the configured backend.
+        
+        Compatible frames are coalesced into batched backend calls.
+        Each finished frame is reported through frame_complete, followed
+        by batch_complete once every frame is done.
+        
+        Args:
+            requests: Frames to generate, see make_request()
+            
+        Returns:
+            The queued background Job
+        """
+        return self._submit_generation(self._run_batch, list(requests))
+    
+    def make_request(self, prompt: str, negative_prompt: str = "",
+                     width: Optional[int] = None,
+                     height: Optional[int] = None,
+                     steps: Optional[int] = None,
+                     cfg_scale: Optional[float] = None,
+                     sampler: Optional[str] = None,
+                     seed: int = -1, frame: int = 0,
+                     checkpoint: str = "", vae: str = "",
+                     loras: Sequence[Tuple[str, float]] = (),
+                     references: Sequence[ReferenceImage] = (),
+                     init_image: Optional[CanvasRegion] = None,
+                     denoising_strength: float = 0.75) -> GenerationRequest:
+        """Build a GenerationRequest, filling gaps from the config defaults.
+        
+        Returns:
+            The completed GenerationRequest
         """
+        return GenerationRequest(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            width=width or self.config.default_width,
+            height=height or self.config.default_height,
+            steps=steps or self.config.default_steps,
+            cfg_scale=cfg_scale or self.config.default_cfg_scale,
+            sampler=sampler or self.config.default_sampler,
+            seed=seed,
+            checkpoint=checkpoint,
+            vae=vae,
+            loras=tuple((name, float(weight)) for name, weight in loras),
+            references=tuple(references),
+            init_image=init_image,
+            denoising_strength=denoising_strength,
+            frame=frame
+        )
+    
+    def _submit_generation(self, fn, requests: List[GenerationRequest],
+                           *args) -> Job:
+        """Queue a generation job, superseding running ones if needed."""
+        params = (fn.__name__, tuple(requests)) + args
+        running = self._running_jobs()
+        for job, job_params in running:
+            if params == job_params:
+                self.logger.info("Ignoring duplicate generation request")
+                return job
+        if self.config.supersede_running:
+            for job, _ in running:
+                self.logger.info(f"Superseding generation job {job.job_id}")
+                self._interrupt(job)
+        
+        job = self.engine.submit(self._run_timed, fn, requests, *args)
+        self._running = self._running_jobs() + [(job, params)]
+        return job
+    
+    def _running_jobs(self) -> List[Tuple[Job, tuple]]:
+        """Return the generation jobs that are neither done nor cancelled."""
+        return [(job, params) for job, params in self._running
+                if not job.is_done() and not job.is_cancelled()]
+    
+    def _run_timed(self, fn, requests: List[GenerationRequest], *args) -> None:
+        """Run a generation job, recording where its time goes.
+        
+        The job's record is logged and reported through job_metrics.
+        """
+        job = Job.current()
+        timings = self.metrics.begin(
+            job.job_id if job else None,
+            fn.__name__[len("_run_"):],
+            job.submitted if job else None
+        )
+        retries, swaps = self.pool.retries, self.pool.model_swaps
+        try:
+            fn(requests, *args)
+        finally:
+            if timings.counts.get("errors"):
+                status = "failed"
+            elif job and job.is_cancelled():
+                status = "cancelled"
+            else:
+                status = "ok"
+            record = self.metrics.finish(
+                timings, status,
+                frames=len(requests),
+                counts={
+                    "retries": self.pool.retries - retries,
+                    "model_swaps": self.pool.model_swaps - swaps,
+                }
+            )
+            self.job_metrics.emit(record)
+    
+    def record_span(self, name: str, seconds: float) -> None:
+        """Add GUI-side time, e.g. layer insertion, to the job metrics.
+        
+        Args:
+            name: Span name, e.g. "insert"
+            seconds: Time spent
+        """
+        self.metrics.add_span(name, seconds)
+    
+    def cancel(self) -> None:
+        """Cancel every running generation, if any."""
+        running = self._running_jobs()
+        for job, _ in running:
+            self.logger.info(f"Cancelling generation job {job.job_id}")
+            self._interrupt(job)
+        self._running = []
+        if running:
+            self.generation_cancelled.emit()
+    
+    def _interrupt(self, job: Job) -> None:
+        """Mark a job cancelled and ask its backends to stop working on it."""
+        job.cancel()
+        for node in self.pool.nodes_for(job.job_id):
+            self.engine.submit(self._send_interrupt, node)
+    
+    def _send_interrupt(self, node: BackendNode) -> None:
+        """Tell a backend to stop its current generation."""
+        if self.config.backend_type == "automatic1111":
+            endpoint = "/sdapi/v1/interrupt"
+        else:  # comfyui
+            endpoint = "/interrupt"
+        try:
+            response = node.session.post(
+                f"{node.url}{endpoint}",
+                timeout=5
+            )
+            response.raise_for_status()
+        except Exception as e:
+            self.logger.warning(f"Interrupt request failed: {e}")
+    
+    def _run_generation(self, requests: List[GenerationRequest]) -> None:
+        """Run a single-image generation on a worker thread."""
+        job = Job.current()
         try:
             self.generation_started.emit()
+            cached = self._cache_lookup(requests[0])
+            if cached is not None:
+                self.generation_complete.emit(self._prepare(cached))
+                return
+            images = self._generate(BatchCall(requests), job)
             
-            # Use config defaults for missing parameters
-            width = width or self.config.default_width
-            height = height or self.config.default_height
-            steps = steps or self.config.default_steps
-            cfg_scale = cfg_scale or self.config.default_cfg_scale
-            sampler = sampler or self.config.default_sampler
-            
-            if self.config.backend_type == "automatic1111":
-                result = self._generate_automatic1111(
-                    prompt, negative_prompt, width, height,
-                    steps, cfg_scale, sampler
+            if job and job.is_cancelled():
+                self.logger.info(f"Discarding result of cancelled job {job.job_id}")
+            elif images:
+                self._cache_store(requests[0], images[0])
+                self._record_history(requests[0], images[0])
+                self.generation_complete.emit(
+                    self._prepare(images[0], requests[0].init_image)
                 )
-            else:  # comfyui
-                result = self._generate_comfyui(
-                    prompt, negative_prompt, width, height,
-                    steps, cfg_scale, sampler
-                )
-                
-            if result:
-                self.generation_complete.emit(result)
             
         except Exception as e:
+            if job and job.is_cancelled():
+                self.logger.info(f"Cancelled job {job.job_id} stopped: {e}")
+                return
             self.logger.error(f"Generation failed: {e}")
+            count("errors")
+            self.generation_failed.emit(str(e))
+    
+    def _run_batch(self, requests: List[GenerationRequest]) -> None:
+        """Run a storyboard batch on a worker thread."""
+        job = Job.current()
+        try:
+            self.generation_started.emit()
+            done = 0
+            lock = threading.Lock()
+            
+            # Frames with a locked seed may already be cached
+            missing = []
+            for request in requests:
+                cached = self._cache_lookup(request)
+                if cached is None:
+                    missing.append(request)
+                else:
+                    self.frame_complete.emit(request.frame, self._prepare(cached))
+                    done += 1
+            if done:
+                self.batch_progress.emit(done, len(requests))
+            
+            def on_result(call: BatchCall, images: List[Image.Image]) -> None:
+                nonlocal done
+                for request, image in zip(call.requests, images):
+                    self._cache_store(request, image)
+                    self._record_history(request, image)
+                    self.frame_complete.emit(
+                        request.frame, self._prepare(image, request.init_image)
+                    )
+                with lock:
+                    done += len(call.requests)
+                    self.batch_progress.emit(done, len(requests))
+            
+            if missing:
+                # Cap n_iter so the batch splits evenly over the backend pool
+                batch_size = self.config.max_batch_size
+                slots = len(self.pool.nodes) * self.pool.max_in_flight
+                calls = coalesce(
+                    missing, batch_size,
+                    max_n_iter=math.ceil(len(missing) / (batch_size * slots))
+                )
+                self.logger.info(
+                    f"Generating {len(missing)} frames in {len(calls)} calls"
+                )
+                self._dispatch(calls, job, on_result)
+            
+            if job and job.is_cancelled():
+                self.logger.info(f"Stopped cancelled batch job {job.job_id}")
+            else:
+                self.batch_complete.emit()
+            
+        except Exception as e:
+            if job and job.is_cancelled():
+                self.logger.info(f"Cancelled job {job.job_id} stopped: {e}")
+                return
+            self.logger.error(f"Batch generation failed: {e}")
+            count("errors")
+            self.generation_failed.emit(str(e))
+    
+    def _run_tiled(self, requests: List[GenerationRequest],
+                   width: int, height: int) -> None:
+        """Run a tiled high-resolution generation on a worker thread."""
+        job = Job.current()
+        try:
+            self.generation_started.emit()
+            request = requests[0]
+            base = self._cache_lookup(request)
+            if base is None:
+                base = self._generate(BatchCall([request]), job)[0]
+                # An interrupted backend still returns a partial image
+                if job and job.is_cancelled():
+                    return
+                self._cache_store(request, base)
+            if job and job.is_cancelled():
+                return
+            
+            from PIL import Image
+            canvas = TiledCanvas(
+                base.resize((width, height), Image.LANCZOS),
+                self.config.tile_overlap,
+                self.config.preview_size
+            )
+            self.tile_complete.emit(prepare_image(
+                canvas.image, self.config.preview_size
+            ))
+            
+            tiles = plan_tiles(
+                width, height, self.config.tile_size, self.config.tile_overlap
+            )
+            calls = [BatchCall([dataclasses.replace(
+                request,
+                width=tile.width,
+                height=tile.height,
+                denoising_strength=self.config.tile_denoise,
+                frame=tile.index
+            )]) for tile in tiles]
+            done = 0
+            lock = threading.Lock()
+            self.batch_progress.emit(0, len(tiles))
+            self.logger.info(
+                f"Refining {width}x{height} image in {len(tiles)} tiles"
+            )
+            
+            def on_result(call: BatchCall, images: List[Image.Image]) -> None:
+                nonlocal done
+                tile = tiles[call.first.frame]
+                with span("convert"):
+                    blended = canvas.blend(tile, images[0])
+                self.tile_complete.emit(blended)
+                with lock:
+                    done += 1
+                    self.batch_progress.emit(done, len(tiles))
+            
+            def with_source(call: BatchCall) -> BatchCall:
+                # Cropped only once a backend is free for the tile, so the
+                # canvas isn't copied tile by tile up front; overlaps with
+                # tiles finished by then are refined from their blend
+                tile = tiles[call.first.frame]
+                with span("convert"):
+                    source = canvas.region(tile)
+                return BatchCall([dataclasses.replace(
+                    call.first, init_image=source
+                )])
+            
+            self._dispatch(calls, job, on_result, with_source)
+            
+            if job and job.is_cancelled():
+                self.logger.info(f"Stopped cancelled tiled job {job.job_id}")
+            else:
+                self._record_history(request, canvas.image, mode="tiled")
+                self.batch_complete.emit()
+            
+        except Exception as e:
+            if job and job.is_cancelled():
+                self.logger.info(f"Cancelled job {job.job_id} stopped: {e}")
+                return
+            self.logger.error(f"Tiled generation failed: {e}")
+            count("errors")
             self.generation_failed.emit(str(e))
     
-    def _generate_automatic1111(self, prompt: str, negative_prompt: str,
-                              width: int, height: int, steps: int,
-                              cfg_scale: float, sampler: str) -> Optional[Image.Image]:
+    def _dispatch(self, calls: List[BatchCall], job: Optional[Job],
+                  on_result: Callable[[BatchCall, List[Image.Image]], None],
+                  prepare: Optional[Callable[[BatchCall], BatchCall]] = None
+                  ) -> None:
+        """Run backend calls concurrently across the backend pool.
+        
+        One drain loop per backend slot reserves a free node and asks the
+        JobScheduler for the call that node should run next, so calls
+        sharing a model setup stay on the node that has it loaded. The
+        calling thread runs one of the loops itself, and helpers that
+        haven't started by the time it is done are dropped.
+        
+        Args:
+            calls: Backend calls to run
+            job: Job the calls belong to, for cancellation
+            on_result: Called from worker threads with each finished call
+            prepare: Completes a call right before it is sent, e.g. with
+                data too large to build for every call up front
+            
+        Raises:
+            Exception: The first error raised by any call
+        """
+        scheduler = JobScheduler(calls)
+        errors: List[Exception] = []
+        attempts: Dict[int, int] = {}
+        tag = job.job_id if job else None
+        cancelled = job.is_cancelled if job else None
+        timings = current()
+        
+        def drain() -> None:
+            # Helpers run on their own threads; time them as part of the job
+            with self.metrics.bind(timings):
+                drain_calls()
+        
+        def drain_calls() -> None:
+            while not errors and not (cancelled and cancelled()):
+                try:
+                    node = self.pool.acquire(tag, cancelled)
+                except Exception as e:
+                    errors.append(e)
+                    return
+                call = scheduler.next_for(node)
+                if call is None:
+                    self.pool.release(node, tag)
+                    return
+                self.pool.use_model(node, call.first.model_key())
+                started = time.monotonic()
+                try:
+                    sent = prepare(call) if prepare else call
+                    images = self._generate_on(node, sent, cancelled)
+                except connection_errors() as e:
+                    self.pool.release(node, tag, error=e)
+                    attempt = attempts.get(id(call), 0) + 1
+                    attempts[id(call)] = attempt
+                    if attempt > self.pool.max_retries:
+                        errors.append(e)
+                        return
+                    self.pool.note_retry(node, e, attempt)
+                    scheduler.requeue(call)
+                    continue
+                except Exception as e:
+                    self.pool.release(node, tag)
+                    errors.append(e)
+                    return
+                self.pool.release(node, tag, elapsed=time.monotonic() - started)
+                if not (cancelled and cancelled()):
+                    on_result(call, images)
+        
+        swaps_before = self.pool.model_swaps
+        slots = len(self.pool.nodes) * self.pool.max_in_flight
+        helpers = [self.engine.submit(drain)
+                   for _ in range(min(slots, len(calls)) - 1)]
+        drain()
+        for helper in helpers:
+            # A helper still queued behind other jobs has nothing left to
+            # do; waiting for it could leave every worker thread waiting
+            if not self.engine.take(helper):
+                helper.wait()
+        self.logger.info(
+            f"Ran {len(calls)} calls with "
+            f"{self.pool.model_swaps - swaps_before} model swaps"
+        )
+        if errors:
+            raise errors[0]
+    
+    def _generate(self, call: BatchCall, job: Optional[Job]) -> List[Image.Image]:
+        """Run one backend call on the least-loaded healthy backend.
+        
+        Returns:
+            One PIL Image per request in the call
+        """
+        cancelled = job.is_cancelled if job else None
+        return self.pool.run(
+            lambda node: self._generate_on(node, call, cancelled),
+            tag=job.job_id if job else None,
+            cancelled=cancelled,
+            model_key=call.first.model_key()
+        )
+    
+    def _generate_on(self, node: BackendNode, call: BatchCall,
+                     cancelled: Optional[Callable[[], bool]] = None
+                     ) -> List[Image.Image]:
+        """Run one backend call on a specific node.
+        
+        Returns:
+            One PIL Image per request in the call
+        """
+        count("calls")
+        if self.config.backend_type == "automatic1111":
+            return self._generate_automatic1111(node, call)
+        else:  # comfyui
+            return self._generate_comfyui(node, call, cancelled)
+    
+    def _generate_automatic1111(self, node: BackendNode,
+                                call: BatchCall) -> List[Image.Image]:
         """Generate using AUTOMATIC1111 API.
         
         Returns:
-            PIL Image if successful, None otherwise
+            One PIL Image per request in the call
+        """
+        with span("send"):
+            body = json.dumps(self._automatic1111_payload(
+                call.first, call.batch_size, call.n_iter
+            )).encode("utf-8")
+        mode = "txt2img" if call.first.init_image is None else "img2img"
+        
+        poller = self._start_progress_poller(node)
+        try:
+            # A1111 answers once the images are done, so this also covers
+            # uploading the (usually small) request body
+            with span("compute"):
+                response = node.session.post(
+                    f"{node.url}/sdapi/v1/{mode}",
+                    data=body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.config.timeout,
+                    stream=True
+                )
+        finally:
+            poller.stop()
+        
+        # The body is read in chunks and each image is base64-decoded as
+        # it arrives, rather than building the whole JSON text and dict;
+        # images are decoded as they come, so at most one encoded image
+        # is held at a time. Multi-image calls may lead with a grid, and
+        # ControlNet appends its detected maps after the frames.
+        images = []
+        grid = None  # Held back until the response shows if it was a grid
+        received = 0
+        with response:
+            response.raise_for_status()
+            encoded = iter_base64_array(
+                response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+            )
+            while True:
+                with span("download"):
+                    data = next(encoded, None)
+                if data is None:
+                    break
+                received += 1
+                if received == 1 and call.image_count > 1:
+                    grid = data
+                    continue
+                if len(images) < call.image_count:
+                    with span("decode"):
+                        images.append(decode_image(data))
+        if grid is not None and received <= call.image_count:
+            # No grid after all, so the held image is the first frame
+            with span("decode"):
+                images.insert(0, decode_image(grid))
+        if len(images) < call.image_count:
+            raise RuntimeError(
+                f"Backend returned {len(images)} images, "
+                f"expected {call.image_count}"
+            )
+        return images[:call.image_count]
+    
+    def _automatic1111_payload(self, request: GenerationRequest,
+                               batch_size: int = 1,
+                               n_iter: int = 1,
+                               reference_data: Optional[Callable[[str], str]] = None
+                               ) -> Dict[str, Any]:
+        """Build the AUTOMATIC1111 txt2img/img2img payload for a request.
+        
+        Args:
+            request: Request to build the payload for
+            batch_size: Frames generated in parallel
+            n_iter: Batches generated one after another
+            reference_data: Maps a reference image path to the string
+                sent for it (cached base64 by default)
+        
+        Returns:
+            JSON-serialisable payload dict
         """
+        prompt = request.prompt
+        # A1111 loads LoRAs from prompt tags
+        for name, weight in request.loras:
+            prompt += f" <lora:{name}:{weight}>"
         payload = {
             "prompt": prompt,
-            "negative_prompt": negative_prompt,
-            "width": width,
-            "height": height,
-            "steps": steps,
-            "cfg_scale": cfg_scale,
-            "sampler_name": sampler,
+            "negative_prompt": request.negative_prompt,
+            "width": request.width,
+            "height": request.height,
+            "steps": request.steps,
+            "cfg_scale": request.cfg_scale,
+            "sampler_name": request.sampler,
+            "seed": request.seed,
+            "batch_size": batch_size,
+            "n_iter": n_iter,
         }
+        override_settings = {}
+        if request.checkpoint:
+            override_settings["sd_model_checkpoint"] = request.checkpoint
+        if request.vae:
+            override_settings["sd_vae"] = request.vae
+        if override_settings:
+            payload["override_settings"] = override_settings
+            # Keep the model loaded so the next call on this node can reuse it
+            payload["override_settings_restore_afterwards"] = False
+        if request.references:
+            # Encoded once per file and shared by every frame of a batch
+            reference_data = reference_data or self.references.base64
+            payload["alwayson_scripts"] = {"controlnet": {"args": [
+                {
+                    "enabled": True,
+                    "image": reference_data(reference.path),
+                    "module": reference.module,
+                    "model": reference.model,
+                    "weight": reference.weight,
+                }
+                for reference in request.references
+            ]}}
+        if request.init_image is not None:
+            image, mask = self._init_image_data(request)
+            payload["init_images"] = [base64.b64encode(image).decode("ascii")]
+            payload["denoising_strength"] = request.denoising_strength
+            if mask is not None:
+                payload["mask"] = base64.b64encode(mask).decode("ascii")
+                payload["inpainting_fill"] = 1  # Start from the original
+                payload["inpaint_full_res"] = False  # Already cropped
+                payload["mask_blur"] = 4
+        return payload
+    
+    def _init_image_data(self, request: GenerationRequest
+                         ) -> Tuple[bytes, Optional[bytes]]:
+        """Return the encoded source image and mask of an img2img request.
         
-        response = self.session.post(
-            f"{self.config.backend_url}/sdapi/v1/txt2img",
-            json=payload,
-            timeout=self.config.timeout
+        Downsampling and PNG encoding run once per distinct region content
+        and size, so repeated passes over an unchanged area (and retries
+        on other backends) reuse the result.
+        
+        Returns:
+            (image PNG, mask PNG or None)
+        """
+        key = (f"{request.init_image.content_key()}"
+               f"-{request.width}x{request.height}")
+        with self._init_lock:
+            encoded = self._init_images.get(key)
+            if encoded is not None:
+                self._init_images.move_to_end(key)
+                return encoded
+        encoded = encode_init_image(
+            request.init_image, request.width, request.height
         )
-        response.raise_for_status()
+        with self._init_lock:
+            self._init_images[key] = encoded
+            while len(self._init_images) > self.INIT_IMAGE_CACHE_SIZE:
+                self._init_images.popitem(last=False)
+        return encoded
+    
+    def _cache_key(self, request: GenerationRequest) -> Optional[str]:
+        """Return the cache key for a request, or None if uncacheable.
         
-        result = response.json()
-        image_data = base64.b64decode(result["images"][0])
-        return Image.open(io.BytesIO(image_data))
+        Only requests with a fixed seed are deterministic enough to cache,
+        and only with a chosen checkpoint: the backend default is whatever
+        model the backend last loaded, which the key can't know. The key
+        covers the full single-image payload, so batched frames share
+        entries with the same frame generated on its own.
+        """
+        if (self.cache is None or request.seed < 0 or not request.checkpoint
+                or request.init_image is not None):
+            return None
+        # Reference images are keyed by content hash, not inlined
+        payload = self._automatic1111_payload(
+            request, reference_data=self.references.digest
+        )
+        payload["backend_type"] = self.config.backend_type
+        if self.config.backend_type == "comfyui" and self.config.comfyui_workflow:
+            # A user workflow decides what is rendered; edits to it must miss
+            path = os.path.expanduser(self.config.comfyui_workflow)
+            try:
+                payload["workflow"] = [path, os.path.getmtime(path)]
+            except OSError:
+                return None
+        return self.cache.make_key(payload)
     
-    def _generate_comfyui(self, prompt: str, negative_prompt: str,
-                         width: int, height: int, steps: int,
-                         cfg_scale: float, sampler: str) -> Optional[Image.Image]:
-        """Generate using ComfyUI API.
+    def _cache_lookup(self, request: GenerationRequest) -> Optional[Image.Image]:
+        """Return the cached result for a request, if any."""
+        key = self._cache_key(request)
+        image = self.cache.get(key) if key else None
+        if image is not None:
+            count("cache_hits")
+        return image
+    
+    def _cache_store(self, request: GenerationRequest, image: Image.Image) -> None:
+        """Store a generated frame in the cache."""
+        key = self._cache_key(request)
+        if key:
+            self.cache.put(key, image, {
+                "prompt": request.prompt,
+                "seed": request.seed,
+                "width": request.width,
+                "height": request.height
+            })
+    
+    def _start_progress_poller(self, node: BackendNode) -> ProgressPoller:
+        """Start polling an AUTOMATIC1111 node for progress on a worker thread.
         
         Returns:
-            PIL Image if successful, None otherwise
+            The running ProgressPoller; call stop() once the job is done
         """
-        # TODO: Implement ComfyUI API integration
-        raise NotImplementedError("ComfyUI support coming soon")
+        poller = ProgressPoller(
+            node.session,
+            node.url,
+            self.config.progress_interval,
+            self._report_progress,
+            self._report_preview if self.config.live_preview else None,
+            self.config.preview_interval
+        )
+        self.engine.submit(poller.run)
+        return poller
     
-    def check_connection(self) -> Dict[str, Any]:
-        """Check backend API connection status.
+    def _prepare(self, image: Image.Image,
+                 region: Optional[CanvasRegion] = None) -> GeneratedImage:
+        """Convert a decoded frame for the GUI while still on a worker thread.
         
-        Returns:
-            Dict with connection status information
+        img2img results are scaled back and positioned at their region.
         """
+        with span("convert"):
+            if region is not None:
+                return paste_into_region(
+                    image, region, self.config.preview_size
+                )
+            return prepare_image(image, self.config.preview_size)
+    
+    def _record_history(self, request: GenerationRequest, image: Image.Image,
+                        mode: Optional[str] = None) -> None:
+        """Add a finished image to the history on the worker thread."""
+        if self.history is None:
+            return
+        if mode is None:
+            mode = "txt2img" if request.init_image is None else "img2img"
+        params = {
+            "mode": mode,
+            "steps": request.steps,
+            "cfg_scale": request.cfg_scale,
+            "sampler": request.sampler,
+            "checkpoint": request.checkpoint,
+            "vae": request.vae,
+            "loras": [list(lora) for lora in request.loras],
+        }
+        if request.init_image is not None:
+            params["denoising_strength"] = request.denoising_strength
         try:
-            if self.config.backend_type == "automatic1111":
-                response = self.session.get(
-                    f"{self.config.backend_url}/sdapi/v1/sd-models",
-                    timeout=5
+            with span("history"):
+                entry_id = self.history.add(
+                    image, request.prompt, request.negative_prompt,
+                    request.seed, params
                 )
-                response.raise_for_status()
-                return {
-                    "connected": True,
-                    "models": len(response.json()),
-                    "api_type": "automatic1111"
-                }
-            else:
-                # TODO: Implement ComfyUI connection check
-                raise NotImplementedError("ComfyUI support coming soon")
         except Exception as e:
-            return {
+            self.logger.warning(f"Could not record history entry: {e}")
+            return
+        self.history_added.emit(entry_id)
+    
+    def load_history(self, entry_id: int) -> Job:
+        """Load a past result at full size in the background.
+        
+        The image is reported through history_loaded, converted and
+        ready to insert, or the error through generation_failed.
+        
+        Args:
+            entry_id: History entry to load
+            
+        Returns:
+            The queued background Job
+        """
+        return self.engine.submit(self._run_load_history, entry_id)
+    
+    def _run_load_history(self, entry_id: int) -> None:
+        """Decode and convert a history image on a worker thread."""
+        try:
+            image = self.history.image(entry_id)
+            self.history_loaded.emit(self._prepare(image))
+        except Exception as e:
+            self.logger.error(f"Loading history entry {entry_id} failed: {e}")
+            self.generation_failed.emit(str(e))
+    
+    def _report_preview(self, image: Image.Image) -> None:
+        """Emit a downsampled live preview from the poller thread."""
+        self.generation_preview.emit(
+            preview_from_pil(image, self.config.preview_size)
+        )
+    
+    def _report_progress(self, percent: int, eta: float) -> None:
+        """Emit progress signals from the poller thread."""
+        self.generation_progress.emit(percent)
+        self.generation_eta.emit(eta)
+    
+    def _generate_comfyui(self, node: BackendNode, call: BatchCall,
+                          cancelled: Optional[Callable[[], bool]] = None
+                          ) -> List[Image.Image]:
+        """Generate using ComfyUI API.
+        
+        Frames with fixed seeds are queued as one prompt each so every
+        frame matches the same seed generated on its own; ComfyUI reuses
+        the loaded model and text encodings between them. Random-seed
+        txt2img frames are queued as n_iter prompts with a latent of
+        batch_size images each, so no prompt exceeds max_batch_size.
+        
+        Returns:
+            One PIL Image per request in the call
+        """
+        request = call.first
+        template = self.workflows.get(request, self.config.comfyui_workflow)
+        checkpoint = request.checkpoint
+        if not checkpoint and not self.config.comfyui_workflow:
+            checkpoint = self._comfyui_checkpoint(node)
+        with span("send"):
+            # Uploaded once per instance and referenced by name afterwards
+            images = [
+                self.references.upload(node.session, node.url, reference.path)
+                for reference in request.references[:len(template.images)]
+            ]
+            init_image = mask = ""
+            if request.init_image is not None and template.init:
+                image_data, mask_data = self._init_image_data(request)
+                init_image = self.references.upload_data(
+                    node.session, node.url, image_data
+                )
+                if mask_data is not None and template.mask:
+                    mask = self.references.upload_data(
+                        node.session, node.url, mask_data
+                    )
+        
+        if request.seed < 0 and not init_image:
+            graphs = [
+                template.render(
+                    request, random.randrange(2 ** 32), call.batch_size,
+                    checkpoint, images
+                )
+                for _ in range(call.n_iter)
+            ]
+        else:
+            graphs = [
+                template.render(
+                    frame,
+                    frame.seed if frame.seed >= 0 else random.randrange(2 ** 32),
+                    1, checkpoint, images, init_image, mask
+                )
+                for frame in call.requests
+            ]
+        
+        run = PromptRun(
+            node.session,
+            node.url,
+            self.config.timeout,
+            self._report_progress,
+            self._report_preview if self.config.live_preview else None,
+            self.config.preview_interval,
+            cancelled
+        )
+        encoded = run.run(graphs, template.outputs)
+        if len(encoded) < len(call.requests):
+            raise RuntimeError(
+                f"Backend returned {len(encoded)} images, "
+                f"expected {len(call.requests)}"
+            )
+        with span("decode"):
+            return [decode_image(data) for data in encoded[:len(call.requests)]]
+    
+    def _comfyui_checkpoint(self, node: BackendNode) -> str:
+        """Return the checkpoint a ComfyUI node uses when none is chosen."""
+        checkpoints = self._checkpoints.get(node.url)
+        if checkpoints is None:
+            checkpoints = list_checkpoints(node.session, node.url)
+            self._checkpoints[node.url] = checkpoints
+        if not checkpoints:
+            raise RuntimeError(f"No checkpoints installed on {node.url}")
+        return checkpoints[0]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return dispatch statistics for the backend pool.
+        
+        Returns:
+            Dict with per-backend state, retry, model swap and cache counts
+        """
+        return {
+            "backends": self.pool.stats(),
+            "retries": self.pool.retries,
+            "model_swaps": self.pool.model_swaps,
+            "cache": self.cache.stats() if self.cache else None,
+            "metrics": self.metrics.summary()
+        }
+    
+    def check_connection(self) -> Optional[Job]:
+        """Check backend API connection status in the background.
+        
+        Every instance is probed right away and the model, sampler and
+        LoRA lists are fetched again. The result is reported through the
+        connection_checked signal, and catalog_updated if the lists
+        changed.
+        
+        Returns:
+            The queued background Job, or None if the health monitor
+            runs the check
+        """
+        if self._monitoring:
+            self.monitor.wake(refresh_catalog=True)
+            return None
+        return self.engine.submit(self.monitor.check, True, True)
+    
+    def set_monitoring(self, active: bool) -> None:
+        """Start or pause probing the backends in the background.
+        
+        The monitor is started the first time this is called with True;
+        it does nothing if health_interval is 0.
+        
+        Args:
+            active: True while the status and lists are on screen
+        """
+        if self.config.health_interval <= 0 or active == self._monitoring:
+            return
+        self._monitoring = active
+        if not active:
+            self.monitor.pause()
+        elif self._monitor_job is None:
+            self._monitor_job = self.engine.submit(self.monitor.run)
+        else:
+            self.monitor.resume()
+    
+    def _report_status(self, statuses: List[Dict[str, Any]]) -> None:
+        """Emit the combined connection status from the monitor thread."""
+        connected = [status for status in statuses if status["connected"]]
+        if not connected:
+            self.connection_checked.emit({
                 "connected": False,
-                "error": str(e),
+                "error": "; ".join(status["error"] for status in statuses),
                 "api_type": self.config.backend_type
+            })
+            return
+        self.connection_checked.emit({
+            "connected": True,
+            "models": len(self.monitor.catalog().get("models", [])),
+            "api_type": self.config.backend_type,
+            "backends": len(connected),
+            "total_backends": len(statuses)
+        })
+    
+    def _probe_node(self, node: BackendNode) -> None:
+        """Send one lightweight request to a backend instance.
+        
+        Raises:
+            Exception: If the instance doesn't answer
+        """
+        if self.config.backend_type == "automatic1111":
+            # Answered even while a generation is running
+            response = node.session.get(
+                f"{node.url}/sdapi/v1/progress",
+                params={"skip_current_image": "true"},
+                timeout=5
+            )
+        else:
+            response = node.session.get(f"{node.url}/system_stats", timeout=5)
+        response.raise_for_status()
+    
+    def _fetch_catalog(self, node: BackendNode) -> Dict[str, List[str]]:
+        """Query a backend instance for its models, samplers and LoRAs.
+        
+        Returns:
+            Dict of name lists keyed by "models", "samplers" and "loras"
+        """
+        if self.config.backend_type == "automatic1111":
+            def names(endpoint: str, field: str) -> List[str]:
+                response = node.session.get(
+                    f"{node.url}/sdapi/v1/{endpoint}", timeout=5
+                )
+                if response.status_code == 404:
+                    return []  # Older versions have no LoRA listing
+                response.raise_for_status()
+                return [entry[field] for entry in response.json()]
+            
+            return {
+                "models": names("sd-models", "title"),
+                "samplers": names("samplers", "name"),
+                "loras": names("loras", "name"),
             }
+        
+        checkpoints = list_checkpoints(node.session, node.url)
+        self._checkpoints[node.url] = checkpoints
+        return {
+            "models": checkpoints,
+            "samplers": list_input_options(
+                node.session, node.url, "KSampler", "sampler_name"
+            ),
+            "loras": list_input_options(
+                node.session, node.url, "LoraLoader", "lora_name"
+            ),
+        }
+    
+    def warm_up(self, checkpoint: str = "") -> Job:
+        """Load a checkpoint on every healthy backend ahead of time.
+        
+        A tiny one-step generation is run on each instance, so the model
+        load and first-run setup are done before the user asks for an
+        image. No signals are emitted and nothing is cached.
+        
+        Args:
+            checkpoint: Checkpoint to load ("" keeps the backend default)
+            
+        Returns:
+            The queued background Job
+        """
+        if self._warm_up_job is not None:
+            self._warm_up_job.cancel()  # Only the last choice matters
+        self._warm_up_job = self.engine.submit(self._run_warm_up, checkpoint)
+        return self._warm_up_job
+    
+    def _run_warm_up(self, checkpoint: str) -> None:
+        """Run a warm-up generation on each healthy node on a worker thread."""
+        request = self.make_request(
+            "", width=64, height=64, steps=1, seed=0, checkpoint=checkpoint
+        )
+        job = Job.current()
+        tag = job.job_id if job else None
+        cancelled = job.is_cancelled if job else None
+        for node in self.pool.nodes:
+            if cancelled and cancelled():
+                return
+            if not node.healthy:
+                continue
+            # Reserved like a generation call, so the warm-up waits for
+            # user jobs on the node instead of competing with them
+            try:
+                self.pool.acquire(tag, cancelled, node=node)
+            except NoBackendAvailable:
+                return  # Cancelled while waiting
+            started = time.monotonic()
+            try:
+                self._warm_up_node(node, request)
+                self.pool.use_model(node, request.model_key())
+            except Exception as e:
+                self.logger.warning(f"Warm-up on {node.url} failed: {e}")
+                continue
+            finally:
+                self.pool.release(node, tag)
+            self.logger.info(
+                f"Warmed up {node.url} with {checkpoint or 'the default model'} "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+    
+    def _warm_up_node(self, node: BackendNode,
+                      request: GenerationRequest) -> None:
+        """Run one throwaway generation on a node and discard the image."""
+        if self.config.backend_type == "automatic1111":
+            response = node.session.post(
+                f"{node.url}/sdapi/v1/txt2img",
+                json=self._automatic1111_payload(request),
+                timeout=self.config.timeout
+            )
+            response.raise_for_status()
+            return
+        
+        template = self.workflows.get(request, self.config.comfyui_workflow)
+        if template.images:
+            return  # The workflow needs reference images we don't have
+        checkpoint = request.checkpoint
+        if not checkpoint and not self.config.comfyui_workflow:
+            checkpoint = self._comfyui_checkpoint(node)
+        run = PromptRun(
+            node.session, node.url, self.config.timeout,
+            lambda percent, eta: None
+        )
+        run.run([template.render(request, 0, 1, checkpoint)], template.outputs)
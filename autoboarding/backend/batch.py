@@ -0,0 +1,121 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .references import ReferenceImage
+
+if TYPE_CHECKING:
+    from ..imaging import CanvasRegion
+
+
+@dataclass(frozen=True)
+class GenerationRequest:
+    """A single frame to generate."""
+
+    prompt: str
+    negative_prompt: str = ""
+    width: int = 512
+    height: int = 512
+    steps: int = 20
+    cfg_scale: float = 7.0
+    sampler: str = "Euler a"
+    seed: int = -1  # -1 lets the backend pick a random seed
+    checkpoint: str = ""  # Empty uses the backend's loaded model
+    vae: str = ""  # Empty uses the backend's loaded VAE
+    loras: Tuple[Tuple[str, float], ...] = ()  # (name, weight) pairs
+    references: Tuple[ReferenceImage, ...] = ()  # ControlNet/IP-Adapter units
+    init_image: Optional["CanvasRegion"] = None  # img2img source, None = txt2img
+    denoising_strength: float = 0.75  # How far img2img may move from the source
+    frame: int = 0  # Position of the frame in its storyboard batch
+
+    def model_key(self) -> Tuple:
+        """Return the model setup the backend must have loaded."""
+        return (self.checkpoint, self.vae, self.loras)
+
+    def batch_key(self) -> Tuple:
+        """Return the parameters that must match to share a backend call."""
+        return (
+            self.prompt, self.negative_prompt, self.width, self.height,
+            self.steps, self.cfg_scale, self.sampler, self.references,
+            self.init_image, self.denoising_strength
+        ) + self.model_key()
+
+
+@dataclass
+class BatchCall:
+    """One backend call producing batch_size * n_iter frames.
+
+    Backends number the seeds of a batch consecutively from the first
+    request's seed, so frames are only coalesced when their seeds follow
+    on from each other (or are all random).
+    """
+
+    requests: List[GenerationRequest] = field(default_factory=list)
+    batch_size: int = 1
+    n_iter: int = 1
+
+    @property
+    def first(self) -> GenerationRequest:
+        """Return the request whose parameters the call is sent with."""
+        return self.requests[0]
+
+    @property
+    def image_count(self) -> int:
+        """Return the number of frames the call produces."""
+        return self.batch_size * self.n_iter
+
+
+def _follows(previous: GenerationRequest, request: GenerationRequest) -> bool:
+    """Return True if request continues previous' seed sequence."""
+    if previous.seed < 0 or request.seed < 0:
+        return previous.seed < 0 and request.seed < 0
+    return request.seed == previous.seed + 1
+
+
+def _split_run(run: List[GenerationRequest], max_batch_size: int,
+               max_n_iter: int) -> List[BatchCall]:
+    """Split a run of coalescable requests into backend calls."""
+    calls = []
+    while len(run) >= max_batch_size:
+        n_iter = min(len(run) // max_batch_size, max_n_iter)
+        count = n_iter * max_batch_size
+        calls.append(BatchCall(run[:count], max_batch_size, n_iter))
+        run = run[count:]
+    if run:
+        calls.append(BatchCall(run, len(run), 1))
+    return calls
+
+
+def coalesce(requests: List[GenerationRequest], max_batch_size: int = 4,
+             max_n_iter: Optional[int] = None) -> List[BatchCall]:
+    """Group compatible requests into as few backend calls as possible.
+
+    Requests sharing the same prompt, size, steps, CFG, sampler and
+    model setup are merged into batch_size/n_iter calls. Groups keep the
+    order in which they first appear.
+
+    Args:
+        requests: Frames to generate
+        max_batch_size: Largest batch_size to send in one call
+        max_n_iter: Largest n_iter to send in one call (unlimited if None);
+            lower it to spread a batch over several backends
+
+    Returns:
+        Backend calls covering every request exactly once
+    """
+    max_batch_size = max(1, max_batch_size)
+    max_n_iter = max(1, max_n_iter or len(requests))
+    groups: Dict[Tuple, List[GenerationRequest]] = {}
+    for request in requests:
+        groups.setdefault(request.batch_key(), []).append(request)
+
+    calls = []
+    for group in groups.values():
+        run = [group[0]]
+        for request in group[1:]:
+            if _follows(run[-1], request):
+                run.append(request)
+            else:
+                calls.extend(_split_run(run, max_batch_size, max_n_iter))
+                run = [request]
+        calls.extend(_split_run(run, max_batch_size, max_n_iter))
+    return calls
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class GenerationCache:
+    """Content-addressed on-disk cache of generated images.
+
+    Images are stored as PNG files named after a hash of the canonical
+    request payload. A small JSON index kept in least-recently-used order
+    maps keys to files, so lookups never touch the image directory and
+    eviction can drop the oldest entries once the size limit is reached.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            directory: Folder holding the index and PNG files
+            max_bytes: Total image size to keep before evicting
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('Autoboarding.Cache')
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load_index()
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Return the cache key for a request payload.
+
+        Args:
+            payload: JSON-serialisable description of the request
+
+        Returns:
+            Hex digest of the payload in canonical form
+        """
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Image.Image]:
+        """Return the cached image for a key, if any.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            The cached PIL Image, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+        # Decoded outside the lock, so parallel lookups don't queue up
+        # behind one disk read
+        try:
+            from PIL import Image
+            image = Image.open(self.directory / entry["file"])
+            image.load()
+        except OSError as e:
+            self.logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+            with self._lock:
+                if self._entries.get(key) is entry:  # Not replaced meanwhile
+                    self._remove(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def put(self, key: str, image: Image.Image,
+            metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Store an image under a key, evicting old entries if needed.
+
+        Args:
+            key: Key from make_key()
+            image: Generated PIL Image
+            metadata: Extra JSON-serialisable details kept in the index
+        """
+        relative = f"{key[:2]}/{key}.png"
+        path = self.directory / relative
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            image.save(path, "PNG")
+            size = path.stat().st_size
+        except OSError as e:
+            self.logger.warning(f"Could not cache image {key}: {e}")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]["size"]
+            self._entries[key] = {
+                "file": relative,
+                "size": size,
+                "created": time.time(),
+                "meta": metadata or {},
+            }
+            self._entries.move_to_end(key)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+            self._save_index()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit statistics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def flush(self) -> None:
+        """Write the index if lookups changed the LRU order."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _remove(self, key: str) -> None:
+        """Delete an entry and its file. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry["size"]
+        self._dirty = True
+        try:
+            (self.directory / entry["file"]).unlink()
+        except OSError:
+            pass
+
+    def _load_index(self) -> None:
+        """Read the index from disk, oldest entry first."""
+        path = self.directory / self.INDEX_NAME
+        if not path.exists():
+            return
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+            for key, entry in entries:
+                self._entries[key] = entry
+                self._total_bytes += entry["size"]
+        except Exception as e:
+            self.logger.warning(f"Ignoring corrupt cache index: {e}")
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _save_index(self) -> None:
+        """Atomically write the index to disk. Caller holds the lock."""
+        path = self.directory / self.INDEX_NAME
+        temp = path.with_suffix(".tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(temp, 'w') as f:
+                json.dump(list(self._entries.items()), f)
+            os.replace(temp, path)
+            self._dirty = False
+        except OSError as e:
+            self.logger.warning(f"Could not save cache index: {e}")
@@ -0,0 +1,586 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import (
+    TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+)
+
+from ..imaging import decode_image
+from .batch import GenerationRequest
+from .metrics import span
+from .websocket import OP_BINARY, OP_TEXT, WebSocket, WebSocketError
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# A1111 sampler names mapped to ComfyUI's sampler_name values
+_SAMPLERS = {
+    "euler a": "euler_ancestral",
+    "euler": "euler",
+    "lms": "lms",
+    "heun": "heun",
+    "dpm2": "dpm_2",
+    "dpm2 a": "dpm_2_ancestral",
+    "dpm++ 2s a": "dpmpp_2s_ancestral",
+    "dpm++ 2m": "dpmpp_2m",
+    "dpm++ sde": "dpmpp_sde",
+    "dpm++ 2m sde": "dpmpp_2m_sde",
+    "dpm fast": "dpm_fast",
+    "dpm adaptive": "dpm_adaptive",
+    "ddim": "ddim",
+    "unipc": "uni_pc",
+    "lcm": "lcm",
+}
+_SCHEDULERS = ("karras", "exponential")
+
+# Binary WebSocket event carrying a sampler preview frame
+_PREVIEW_IMAGE = 1
+
+
+def comfyui_sampler(name: str) -> Tuple[str, str]:
+    """Translate an A1111 sampler name to ComfyUI's sampler and scheduler.
+
+    Names ComfyUI already understands (e.g. "euler_ancestral") pass
+    through unchanged.
+
+    Returns:
+        (sampler_name, scheduler)
+    """
+    key = name.strip().lower()
+    scheduler = "normal"
+    for candidate in _SCHEDULERS:
+        if key.endswith(" " + candidate):
+            key = key[:-len(candidate) - 1]
+            scheduler = candidate
+    return _SAMPLERS.get(key, key), scheduler
+
+
+def default_workflow(lora_count: int = 0, custom_vae: bool = False,
+                     init_image: bool = False, mask: bool = False) -> Dict[str, Any]:
+    """Build the built-in txt2img/img2img graph in ComfyUI's API format.
+
+    Args:
+        lora_count: Number of LoraLoader nodes chained after the checkpoint
+        custom_vae: Decode with a separately loaded VAE
+        init_image: Start from an encoded input image (img2img)
+        mask: Only denoise the masked area of the input image (inpainting)
+
+    Returns:
+        Workflow graph keyed by node id, with placeholder inputs
+    """
+    graph: Dict[str, Any] = {
+        "4": {"class_type": "CheckpointLoaderSimple",
+              "inputs": {"ckpt_name": ""}},
+    }
+    model, clip = ["4", 0], ["4", 1]
+    for index in range(lora_count):
+        node_id = str(10 + index)
+        graph[node_id] = {"class_type": "LoraLoader", "inputs": {
+            "lora_name": "", "strength_model": 1.0, "strength_clip": 1.0,
+            "model": model, "clip": clip,
+        }}
+        model, clip = [node_id, 0], [node_id, 1]
+    vae = ["4", 2]
+    if custom_vae:
+        graph["20"] = {"class_type": "VAELoader", "inputs": {"vae_name": ""}}
+        vae = ["20", 0]
+    if init_image:
+        graph["40"] = {"class_type": "LoadImage", "inputs": {"image": ""}}
+        graph["41"] = {"class_type": "VAEEncode",
+                       "inputs": {"pixels": ["40", 0], "vae": vae}}
+        latent = ["41", 0]
+        if mask:
+            graph["42"] = {"class_type": "LoadImageMask",
+                           "inputs": {"image": "", "channel": "red"}}
+            graph["43"] = {"class_type": "SetLatentNoiseMask",
+                           "inputs": {"samples": latent, "mask": ["42", 0]}}
+            latent = ["43", 0]
+    else:
+        graph["5"] = {"class_type": "EmptyLatentImage",
+                      "inputs": {"width": 512, "height": 512, "batch_size": 1}}
+        latent = ["5", 0]
+    graph.update({
+        "6": {"class_type": "CLIPTextEncode",
+              "inputs": {"text": "", "clip": clip}},
+        "7": {"class_type": "CLIPTextEncode",
+              "inputs": {"text": "", "clip": clip}},
+        "3": {"class_type": "KSampler", "inputs": {
+            "seed": 0, "steps": 20, "cfg": 7.0,
+            "sampler_name": "euler", "scheduler": "normal", "denoise": 1.0,
+            "model": model, "positive": ["6", 0], "negative": ["7", 0],
+            "latent_image": latent,
+        }},
+        "8": {"class_type": "VAEDecode",
+              "inputs": {"samples": ["3", 0], "vae": vae}},
+        "9": {"class_type": "SaveImage",
+              "inputs": {"filename_prefix": "autoboarding", "images": ["8", 0]}},
+    })
+    return graph
+
+
+class WorkflowTemplate:
+    """A parsed workflow graph with the inputs a request fills in located.
+
+    The node ids of the sampler, prompts, latent, checkpoint, VAE and
+    LoRA loaders are found once when the template is built. render()
+    then copies only the nodes it patches and shares every other node
+    with the template, instead of rebuilding the whole graph per frame.
+    """
+
+    def __init__(self, graph: Dict[str, Any]):
+        """Locate the parameter nodes of a graph.
+
+        Args:
+            graph: Workflow in ComfyUI's API format
+
+        Raises:
+            ValueError: If the graph has no KSampler to parameterise
+        """
+        self.graph = graph
+        samplers = self._nodes_of("KSampler")
+        if not samplers:
+            raise ValueError("Workflow has no KSampler node")
+        self.sampler = samplers[0]
+        inputs = graph[self.sampler]["inputs"]
+        self.positive = self._source(inputs.get("positive"), "CLIPTextEncode")
+        self.negative = self._source(inputs.get("negative"), "CLIPTextEncode")
+        self.latent = self._source(inputs.get("latent_image"), "EmptyLatentImage")
+        # img2img graphs feed the sampler VAEEncode(LoadImage), possibly
+        # through a SetLatentNoiseMask whose mask comes from LoadImageMask
+        self.init = self.mask = None
+        encoded = inputs.get("latent_image")
+        masked = self._source(encoded, "SetLatentNoiseMask")
+        if masked:
+            encoded = graph[masked]["inputs"].get("samples")
+            self.mask = self._source(
+                graph[masked]["inputs"].get("mask"), "LoadImageMask"
+            )
+        encoder = self._source(encoded, "VAEEncode")
+        if encoder:
+            self.init = self._source(
+                graph[encoder]["inputs"].get("pixels"), "LoadImage"
+            )
+        checkpoints = self._nodes_of("CheckpointLoaderSimple")
+        self.checkpoint = checkpoints[0] if checkpoints else None
+        vaes = self._nodes_of("VAELoader")
+        self.vae = vaes[0] if vaes else None
+        self.loras = self._lora_chain(inputs.get("model"))
+        self.images = [node_id for node_id in self._nodes_of("LoadImage")
+                       if node_id != self.init]
+        self.outputs: Set[str] = set(self._nodes_of("SaveImage"))
+
+    def render(self, request: GenerationRequest, seed: int,
+               batch_size: int = 1, checkpoint: str = "",
+               images: Sequence[str] = (), init_image: str = "",
+               mask: str = "") -> Dict[str, Any]:
+        """Return the graph with a request's parameters patched in.
+
+        Args:
+            request: Request whose parameters to use
+            seed: Seed to sample with (must not be negative)
+            batch_size: Frames in the latent batch
+            checkpoint: Checkpoint file name (template's value if empty)
+            images: Uploaded reference image names for the LoadImage
+                nodes, in node id order
+            init_image: Uploaded img2img source image name
+            mask: Uploaded inpainting mask name
+
+        Returns:
+            New graph sharing unpatched nodes with the template
+        """
+        sampler_name, scheduler = comfyui_sampler(request.sampler)
+        patches: Dict[str, Dict[str, Any]] = {
+            self.sampler: {
+                "seed": seed,
+                "steps": request.steps,
+                "cfg": request.cfg_scale,
+                "sampler_name": sampler_name,
+                "scheduler": scheduler,
+            }
+        }
+        if self.positive:
+            patches[self.positive] = {"text": request.prompt}
+        if self.negative:
+            patches[self.negative] = {"text": request.negative_prompt}
+        if self.latent:
+            patches[self.latent] = {
+                "width": request.width,
+                "height": request.height,
+                "batch_size": batch_size,
+            }
+        if self.checkpoint and checkpoint:
+            patches[self.checkpoint] = {"ckpt_name": checkpoint}
+        if self.vae and request.vae:
+            patches[self.vae] = {"vae_name": request.vae}
+        for node_id, (name, weight) in zip(self.loras, request.loras):
+            if "." not in name:
+                name += ".safetensors"
+            patches[node_id] = {
+                "lora_name": name,
+                "strength_model": weight,
+                "strength_clip": weight,
+            }
+        for node_id, name in zip(self.images, images):
+            patches[node_id] = {"image": name}
+        if self.init and init_image:
+            patches[self.init] = {"image": init_image}
+            patches[self.sampler]["denoise"] = request.denoising_strength
+        if self.mask and mask:
+            patches[self.mask] = {"image": mask}
+
+        graph = dict(self.graph)
+        for node_id, values in patches.items():
+            node = dict(graph[node_id])
+            node["inputs"] = {**node["inputs"], **values}
+            graph[node_id] = node
+        return graph
+
+    def _nodes_of(self, class_type: str) -> List[str]:
+        """Return the ids of every node of a class, in id order."""
+        ids = [node_id for node_id, node in self.graph.items()
+               if node.get("class_type") == class_type]
+        return sorted(ids, key=lambda node_id: (len(node_id), node_id))
+
+    def _source(self, link: Any, class_type: str) -> Optional[str]:
+        """Return the node a link points at if it has the given class."""
+        if not isinstance(link, list) or not link:
+            return None
+        node = self.graph.get(str(link[0]))
+        if node and node.get("class_type") == class_type:
+            return str(link[0])
+        return None
+
+    def _lora_chain(self, link: Any) -> List[str]:
+        """Return the LoraLoader ids feeding the sampler, nearest last."""
+        chain = []
+        node_id = self._source(link, "LoraLoader")
+        while node_id is not None and node_id not in chain:
+            chain.append(node_id)
+            node_id = self._source(
+                self.graph[node_id]["inputs"].get("model"), "LoraLoader"
+            )
+        chain.reverse()
+        return chain
+
+
+class WorkflowCache:
+    """Parsed workflow templates, built once and reused across requests.
+
+    The built-in graph is keyed by its shape (LoRA count and VAE loader);
+    a user workflow file is re-parsed only when its modification time
+    changes.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('Autoboarding.ComfyUI')
+        self._templates: Dict[Tuple, WorkflowTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, request: GenerationRequest,
+            workflow_path: str = "") -> WorkflowTemplate:
+        """Return the template to run a request with.
+
+        Args:
+            request: Request to be rendered
+            workflow_path: API-format workflow JSON file (built-in graph
+                if empty)
+
+        Returns:
+            Cached or newly parsed WorkflowTemplate
+        """
+        if workflow_path:
+            path = os.path.expanduser(workflow_path)
+            key: Tuple = ("file", path, os.path.getmtime(path))
+        else:
+            init = request.init_image
+            key = ("default", len(request.loras), bool(request.vae),
+                   init is not None, init is not None and init.mask is not None)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None:
+                if workflow_path:
+                    with open(path, 'r') as f:
+                        template = WorkflowTemplate(json.load(f))
+                    # Drop templates of older versions of the same file
+                    for old in [k for k in self._templates if k[:2] == key[:2]]:
+                        del self._templates[old]
+                    self.logger.info(f"Loaded workflow template {path}")
+                else:
+                    template = WorkflowTemplate(default_workflow(*key[1:]))
+                self._templates[key] = template
+        if len(request.loras) > len(template.loras):
+            self.logger.warning(
+                f"Workflow has {len(template.loras)} LoRA loaders, "
+                f"ignoring {len(request.loras) - len(template.loras)} LoRAs"
+            )
+        if request.init_image is not None and template.init is None:
+            self.logger.warning(
+                "Workflow has no VAEEncode(LoadImage) input, "
+                "generating from scratch instead of the canvas"
+            )
+        if len(request.references) > len(template.images):
+            self.logger.warning(
+                f"Workflow has {len(template.images)} LoadImage nodes, "
+                f"ignoring {len(request.references) - len(template.images)} "
+                f"reference images"
+            )
+        return template
+
+
+def list_input_options(session, base_url: str, node_class: str,
+                       input_name: str, timeout: float = 5) -> List[str]:
+    """Return the values a ComfyUI node's choice input accepts.
+
+    Only the one node class is queried, which is much cheaper than
+    fetching the whole /object_info listing.
+
+    Args:
+        session: requests.Session to query with
+        base_url: Backend base URL
+        node_class: Node class name, e.g. "KSampler"
+        input_name: Required input of that node, e.g. "sampler_name"
+        timeout: Request timeout in seconds
+    """
+    response = session.get(
+        f"{base_url}/object_info/{node_class}",
+        timeout=timeout
+    )
+    response.raise_for_status()
+    info = response.json()[node_class]
+    return list(info["input"]["required"][input_name][0])
+
+
+def list_checkpoints(session, base_url: str, timeout: float = 5) -> List[str]:
+    """Return the checkpoint files a ComfyUI instance can load.
+
+    Args:
+        session: requests.Session to query with
+        base_url: Backend base URL
+        timeout: Request timeout in seconds
+    """
+    return list_input_options(
+        session, base_url, "CheckpointLoaderSimple", "ckpt_name", timeout
+    )
+
+
+class PromptRun:
+    """Queues workflow graphs on one ComfyUI instance and collects the images.
+
+    Execution is followed over the instance's /ws event stream: sampler
+    progress and preview frames are reported through callbacks as they
+    arrive, and output images are fetched from /view once their node has
+    executed, so /history never has to be polled.
+    """
+
+    def __init__(self, session, base_url: str, timeout: float,
+                 on_progress: Callable[[int, float], None],
+                 on_preview: Optional[Callable[[Image.Image], None]] = None,
+                 preview_interval: float = 1.0,
+                 cancelled: Optional[Callable[[], bool]] = None):
+        """Initialize the run.
+
+        Args:
+            session: requests.Session for the HTTP endpoints
+            base_url: Backend base URL
+            timeout: Seconds without any event before giving up
+            on_progress: Called with (percent, eta_seconds)
+            on_preview: Called with decoded preview frames (None disables
+                previews)
+            preview_interval: Minimum seconds between decoded previews
+            cancelled: Polled while waiting; stops the run when True
+        """
+        self.session = session
+        self.base_url = base_url
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.on_preview = on_preview
+        self.preview_interval = preview_interval
+        self.cancelled = cancelled
+        self.client_id = uuid.uuid4().hex
+        self.logger = logging.getLogger('Autoboarding.ComfyUI')
+        self._next_preview = 0.0
+
+    def run(self, graphs: Sequence[Dict[str, Any]],
+            outputs: Set[str]) -> List[bytes]:
+        """Execute graphs in order and return their encoded output images.
+
+        Args:
+            graphs: Rendered workflow graphs
+            outputs: Ids of the nodes whose images are the results
+
+        Returns:
+            Encoded images (PNG) in prompt order
+
+        Raises:
+            RuntimeError: If a prompt is rejected, fails or is interrupted
+            WebSocketError: If the event stream breaks
+        """
+        ws_url = "ws" + self.base_url[len("http"):] + f"/ws?clientId={self.client_id}"
+        # Connect first so no event of our prompts can be missed
+        with WebSocket.connect(ws_url, timeout=min(self.timeout, 10)) as ws:
+            prompt_ids = []
+            try:
+                with span("send"):
+                    for graph in graphs:
+                        prompt_ids.append(self._queue(graph))
+                with span("compute"):
+                    images = self._follow(ws, prompt_ids, outputs)
+            except BaseException:
+                self._delete_queued(prompt_ids)
+                raise
+        with span("download"):
+            return [self._fetch(image) for prompt_id in prompt_ids
+                    for image in images[prompt_id]]
+
+    def _queue(self, graph: Dict[str, Any]) -> str:
+        """Submit one graph to /prompt and return its prompt id."""
+        response = self.session.post(
+            f"{self.base_url}/prompt",
+            json={"prompt": graph, "client_id": self.client_id},
+            timeout=min(self.timeout, 10)
+        )
+        if response.status_code == 400:
+            data = response.json()
+            error = data.get("error") or {}
+            details = [
+                f"{node_id}: {message.get('message', '')}"
+                for node_id, info in (data.get("node_errors") or {}).items()
+                for message in info.get("errors", [])
+            ]
+            raise RuntimeError(
+                f"ComfyUI rejected the workflow: {error.get('message', data)}"
+                + (f" ({'; '.join(details)})" if details else "")
+            )
+        response.raise_for_status()
+        return response.json()["prompt_id"]
+
+    def _follow(self, ws: WebSocket, prompt_ids: List[str],
+                outputs: Set[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Consume events until every prompt has finished executing.
+
+        Returns:
+            Output image references per prompt id
+        """
+        pending = list(prompt_ids)
+        images: Dict[str, List[Dict[str, Any]]] = {pid: [] for pid in prompt_ids}
+        started = time.monotonic()
+        last_event = started
+        while pending:
+            if self.cancelled and self.cancelled():
+                raise RuntimeError("Generation cancelled")
+            message = ws.recv(timeout=0.5)
+            now = time.monotonic()
+            if message is None:
+                if now - last_event > self.timeout:
+                    raise WebSocketError(
+                        f"No progress from ComfyUI for {self.timeout} seconds"
+                    )
+                continue
+            last_event = now
+            opcode, payload = message
+            if opcode == OP_BINARY:
+                self._preview(payload)
+                continue
+            if opcode != OP_TEXT:
+                continue
+            event = json.loads(payload)
+            kind = event.get("type")
+            data = event.get("data") or {}
+            prompt_id = data.get("prompt_id")
+            if prompt_id not in images:
+                continue
+
+            if kind == "progress":
+                done = len(prompt_ids) - len(pending)
+                step = float(data.get("value", 0)) / max(1, data.get("max", 1))
+                fraction = (done + step) / len(prompt_ids)
+                elapsed = now - started
+                eta = elapsed * (1 - fraction) / fraction if fraction > 0 else 0.0
+                self.on_progress(min(int(fraction * 100), 100), eta)
+            elif kind == "executed":
+                if not outputs or str(data.get("node")) in outputs:
+                    images[prompt_id].extend(
+                        (data.get("output") or {}).get("images", [])
+                    )
+            elif kind == "execution_error":
+                raise RuntimeError(
+                    f"ComfyUI node {data.get('node_type', data.get('node_id'))} "
+                    f"failed: {data.get('exception_message', 'unknown error')}"
+                )
+            elif kind == "execution_interrupted":
+                raise RuntimeError("Generation interrupted")
+            elif ((kind == "executing" and data.get("node") is None)
+                  or kind == "execution_success"):
+                if prompt_id in pending:
+                    pending.remove(prompt_id)
+                    if not images[prompt_id]:
+                        # Fully cached prompts may not re-send their outputs
+                        images[prompt_id] = self._history_images(prompt_id, outputs)
+        return images
+
+    def _preview(self, payload: bytes) -> None:
+        """Decode and report a binary preview frame, throttled."""
+        if (self.on_preview is None or len(payload) < 8
+                or int.from_bytes(payload[:4], "big") != _PREVIEW_IMAGE):
+            return
+        now = time.monotonic()
+        if now < self._next_preview:
+            return
+        try:
+            image = decode_image(payload[8:])
+        except Exception as e:
+            self.logger.debug(f"Ignoring undecodable preview: {e}")
+            return
+        self.on_preview(image)
+        # Skip frames while decoding lags behind the requested rate
+        self._next_preview = time.monotonic() + max(
+            self.preview_interval, (time.monotonic() - now) * 4
+        )
+
+    def _history_images(self, prompt_id: str,
+                        outputs: Set[str]) -> List[Dict[str, Any]]:
+        """Look up a finished prompt's output images in /history once."""
+        response = self.session.get(
+            f"{self.base_url}/history/{prompt_id}",
+            timeout=min(self.timeout, 10)
+        )
+        response.raise_for_status()
+        entry = response.json().get(prompt_id) or {}
+        return [
+            image
+            for node_id, output in (entry.get("outputs") or {}).items()
+            if not outputs or node_id in outputs
+            for image in output.get("images", [])
+        ]
+
+    def _fetch(self, image: Dict[str, Any]) -> bytes:
+        """Download one output image from /view."""
+        response = self.session.get(
+            f"{self.base_url}/view",
+            params={
+                "filename": image["filename"],
+                "subfolder": image.get("subfolder", ""),
+                "type": image.get("type", "output"),
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.content
+
+    def _delete_queued(self, prompt_ids: List[str]) -> None:
+        """Remove prompts of an abandoned run that have not started yet."""
+        if not prompt_ids:
+            return
+        try:
+            self.session.post(
+                f"{self.base_url}/queue",
+                json={"delete": prompt_ids},
+                timeout=5
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not clear queued prompts: {e}")
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    prompt TEXT NOT NULL,
+    negative_prompt TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    file TEXT NOT NULL,
+    thumbnail BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+# External-content FTS index kept in sync by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(
+    prompt, negative_prompt, content='generations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS generations_ai AFTER INSERT ON generations BEGIN
+    INSERT INTO generations_fts(rowid, prompt, negative_prompt)
+    VALUES (new.id, new.prompt, new.negative_prompt);
+END;
+CREATE TRIGGER IF NOT EXISTS generations_ad AFTER DELETE ON generations BEGIN
+    INSERT INTO generations_fts(generations_fts, rowid, prompt, negative_prompt)
+    VALUES ('delete', old.id, old.prompt, old.negative_prompt);
+END;
+"""
+
+
+@dataclass
+class HistoryEntry:
+    """One past generation, without its image data."""
+
+    id: int
+    created: float
+    prompt: str
+    negative_prompt: str
+    seed: int  # As requested; -1 for a random seed
+    width: int
+    height: int
+    params: Dict[str, Any]  # steps, cfg_scale, sampler, checkpoint, ...
+
+
+class GenerationHistory:
+    """Persistent, searchable record of every generated image.
+
+    Metadata and a small JPEG thumbnail per image live in an SQLite
+    database, with an FTS5 index over the prompts where SQLite has it
+    (plain LIKE matching otherwise). Full-size images are PNG files next
+    to the database and are only read when an entry is inserted again,
+    so browsing hundreds of entries only ever touches thumbnails. The
+    oldest entries are deleted beyond a count and a total file size.
+    """
+
+    DB_NAME = "history.sqlite3"
+    THUMBNAIL_SIZE = 128
+
+    def __init__(self, directory: Path, max_entries: int = 2000,
+                 max_bytes: int = 0):
+        """Open or create the history.
+
+        Args:
+            directory: Folder holding the database and image files
+            max_entries: Entries kept before the oldest are deleted
+            max_bytes: Total image file size kept before the oldest are
+                deleted (0 for no limit); the newest entry is always kept
+        """
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('Autoboarding.History')
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the GUI and worker threads, serialised
+        # by the lock; WAL keeps readers from waiting on disk syncs
+        self._db = sqlite3.connect(
+            str(self.directory / self.DB_NAME), check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            self.logger.info(f"Full-text search unavailable, using LIKE: {e}")
+            self.full_text = False
+        self._db.commit()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def add(self, image: Image.Image, prompt: str, negative_prompt: str,
+            seed: int, params: Dict[str, Any]) -> int:
+        """Record a generated image.
+
+        Encoding happens before the lock is taken, so call this from a
+        worker thread.
+
+        Args:
+            image: Full-size generated image
+            prompt: Prompt it was generated from
+            negative_prompt: Negative prompt
+            seed: Requested seed
+            params: Further JSON-serialisable settings
+
+        Returns:
+            The new entry's id
+        """
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail((self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "JPEG", quality=85)
+
+        created = time.time()
+        relative = time.strftime("%Y-%m", time.localtime(created))
+        name = f"{uuid.uuid4().hex}.png"
+        path = self.directory / relative / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image.save(path, "PNG", compress_level=1)
+        size = path.stat().st_size
+
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO generations (created, prompt, negative_prompt, "
+                "seed, width, height, params, file, thumbnail, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (created, prompt, negative_prompt, seed, image.width,
+                 image.height, json.dumps(params), f"{relative}/{name}",
+                 buffer.getvalue(), size)
+            )
+            entry_id = cursor.lastrowid
+            self._prune()
+            self._db.commit()
+        return entry_id
+
+    def ids(self, query: str = "") -> List[int]:
+        """Return the ids of matching entries, newest first.
+
+        Args:
+            query: Words the prompt must contain, each matched as the
+                start of a word so partly typed words match too. Empty
+                matches everything.
+        """
+        words = query.split()
+        with self._lock:
+            if not words:
+                rows = self._db.execute(
+                    "SELECT id FROM generations ORDER BY id DESC"
+                )
+            elif self.full_text:
+                # Every word quoted, so user input is never FTS syntax
+                match = " ".join(
+                    '"' + word.replace('"', '""') + '"*' for word in words
+                )
+                rows = self._db.execute(
+                    "SELECT rowid FROM generations_fts "
+                    "WHERE generations_fts MATCH ? ORDER BY rowid DESC",
+                    (f"prompt : ({match})",)
+                )
+            else:
+                clauses = " AND ".join(
+                    "prompt LIKE ? ESCAPE '\\'" for _ in words
+                )
+                patterns = [
+                    "%" + word.replace("\\", "\\\\").replace("%", "\\%")
+                    .replace("_", "\\_") + "%"
+                    for word in words
+                ]
+                rows = self._db.execute(
+                    f"SELECT id FROM generations WHERE {clauses} "
+                    "ORDER BY id DESC",
+                    patterns
+                )
+            return [row[0] for row in rows]
+
+    def entry(self, entry_id: int) -> Optional[HistoryEntry]:
+        """Return an entry's metadata, or None if it was deleted."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, created, prompt, negative_prompt, seed, width, "
+                "height, params FROM generations WHERE id = ?",
+                (entry_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return HistoryEntry(*row[:7], json.loads(row[7]))
+
+    def thumbnail(self, entry_id: int) -> Optional[bytes]:
+        """Return an entry's JPEG thumbnail, or None if it was deleted."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT thumbnail FROM generations WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def image(self, entry_id: int) -> Image.Image:
+        """Load an entry's full-size image.
+
+        Raises:
+            KeyError: If the entry doesn't exist
+            OSError: If its image file is missing or unreadable
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file FROM generations WHERE id = ?", (entry_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No history entry {entry_id}")
+        from PIL import Image
+        image = Image.open(self.directory / row[0])
+        image.load()
+        return image
+
+    def recent_prompts(self, limit: int) -> List[str]:
+        """Return distinct prompts, most recently used first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT prompt FROM generations WHERE prompt != '' "
+                "GROUP BY prompt ORDER BY MAX(id) DESC LIMIT ?",
+                (limit,)
+            )
+            return [row[0] for row in rows]
+
+    def delete(self, entry_id: int) -> None:
+        """Delete an entry and its image file."""
+        with self._lock:
+            self._delete(self._db.execute(
+                "SELECT id, file FROM generations WHERE id = ?", (entry_id,)
+            ).fetchall())
+            self._db.commit()
+
+    def total_bytes(self) -> int:
+        """Return the size of every stored image file."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM generations"
+            ).fetchone()[0]
+
+    def _prune(self) -> None:
+        """Delete the oldest entries beyond the limits. Caller holds the lock."""
+        self._delete(self._db.execute(
+            "SELECT id, file FROM generations ORDER BY id DESC "
+            "LIMIT -1 OFFSET ?",
+            (self.max_entries,)
+        ).fetchall())
+        if not self.max_bytes:
+            return
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM generations"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        # Oldest first, never the newest entry
+        for entry_id, relative, size in self._db.execute(
+                "SELECT id, file, size FROM generations ORDER BY id "
+                "LIMIT (SELECT COUNT(*) - 1 FROM generations)"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((entry_id, relative))
+            total -= size
+        self._delete(doomed)
+
+    def _delete(self, rows: List[Tuple[int, str]]) -> None:
+        """Delete entries and their files. Caller holds the lock."""
+        for entry_id, relative in rows:
+            self._db.execute("DELETE FROM generations WHERE id = ?", (entry_id,))
+            try:
+                (self.directory / relative).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,235 @@
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Timings of the job the calling thread works on, set by Metrics.bind()
+_active = threading.local()
+
+
+class JobTimings:
+    """Timing spans and counters collected while one job runs.
+
+    Spans of the same name add up, so a batch reports the total time
+    its calls spent in each step; with several backends working at
+    once the totals can exceed the job's wall time.
+    """
+
+    def __init__(self, job_id: Optional[int], kind: str, queued: float):
+        """Initialize the timings.
+
+        Args:
+            job_id: Id of the job the timings belong to
+            kind: What the job does, e.g. "batch"
+            queued: time.monotonic() when the job was submitted
+        """
+        self.job_id = job_id
+        self.kind = kind
+        self.started = time.monotonic()
+        self.spans: Dict[str, float] = {"queue_wait": self.started - queued}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add seconds to a span."""
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the spans in milliseconds and the counters."""
+        with self._lock:
+            return {
+                "job": self.job_id,
+                "kind": self.kind,
+                "total_ms": round((time.monotonic() - self.started) * 1000, 1),
+                "spans_ms": {name: round(seconds * 1000, 1)
+                             for name, seconds in self.spans.items()},
+                "counts": dict(self.counts),
+            }
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a step of the job the calling thread works on.
+
+    Does nothing on threads that aren't bound to a job, so backend code
+    can be timed unconditionally.
+    """
+    timings = getattr(_active, "timings", None)
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def current() -> Optional[JobTimings]:
+    """Return the timings bound to the calling thread, if any."""
+    return getattr(_active, "timings", None)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Increase a counter of the job the calling thread works on."""
+    timings = getattr(_active, "timings", None)
+    if timings is not None:
+        timings.count(name, amount)
+
+
+class Metrics:
+    """Collects per-job timings, keeps running totals and logs them.
+
+    Every finished job is written as one JSON line to a size-rotated log
+    file, if one is configured, so slow boards can be traced to the
+    network, the backend or Krita-side conversion after the fact.
+    """
+
+    def __init__(self, log_path: Optional[Path] = None,
+                 max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        """Initialize the collector.
+
+        Args:
+            log_path: JSONL file to append finished jobs to (None disables)
+            max_bytes: Size at which the log is rotated
+            backups: Rotated files kept next to the log
+        """
+        self.logger = logging.getLogger('Autoboarding.Metrics')
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._spans: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._last: Optional[Dict[str, Any]] = None
+        self._running: List[JobTimings] = []
+        self._log: Optional[logging.Logger] = None
+        if log_path is not None:
+            try:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=max_bytes, backupCount=backups,
+                    encoding="utf-8", delay=True
+                )
+            except OSError as e:
+                self.logger.warning(f"Metrics log disabled: {e}")
+            else:
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._log = logging.getLogger('Autoboarding.Metrics.Log')
+                self._log.propagate = False
+                self._log.setLevel(logging.INFO)
+                for old in list(self._log.handlers):
+                    self._log.removeHandler(old)
+                    old.close()
+                self._log.addHandler(handler)
+
+    def begin(self, job_id: Optional[int], kind: str,
+              queued: Optional[float] = None) -> JobTimings:
+        """Start timing a job and bind it to the calling thread.
+
+        Args:
+            job_id: Id of the job
+            kind: What the job does, e.g. "generation"
+            queued: time.monotonic() when the job was submitted
+
+        Returns:
+            The job's timings; pass them to finish()
+        """
+        timings = JobTimings(job_id, kind, queued or time.monotonic())
+        _active.timings = timings
+        with self._lock:
+            self._running.append(timings)
+        return timings
+
+    @contextmanager
+    def bind(self, timings: Optional[JobTimings]) -> Iterator[None]:
+        """Attribute spans on the calling thread to a job, e.g. in a helper."""
+        previous = getattr(_active, "timings", None)
+        _active.timings = timings
+        try:
+            yield
+        finally:
+            _active.timings = previous
+
+    def finish(self, timings: JobTimings, status: str,
+               **extra) -> Dict[str, Any]:
+        """Stop timing a job, add it to the totals and log it.
+
+        Args:
+            timings: Timings returned by begin()
+            status: "ok", "failed" or "cancelled"
+            **extra: Further fields for the record, e.g. counters
+
+        Returns:
+            The job's record
+        """
+        if getattr(_active, "timings", None) is timings:
+            _active.timings = None
+        for name, value in extra.pop("counts", {}).items():
+            if value:
+                timings.count(name, value)
+        record = timings.to_dict()
+        record["status"] = status
+        record.update(extra)
+        with self._lock:
+            if timings in self._running:
+                self._running.remove(timings)
+            self._jobs += 1
+            for name, value in record["spans_ms"].items():
+                self._spans[name] = self._spans.get(name, 0.0) + value
+            for name, value in record["counts"].items():
+                self._counts[name] = self._counts.get(name, 0) + value
+            self._last = record
+        self.write(record)
+        return record
+
+    def add_span(self, name: str, seconds: float) -> None:
+        """Add a span measured outside any job, e.g. on the GUI thread.
+
+        It is counted towards the newest running job (e.g. tiles written
+        while the rest are still generating), or else the job that
+        finished last and is logged as an event of its own.
+        """
+        with self._lock:
+            running = self._running[-1] if self._running else None
+            last = self._last
+        if running is not None:
+            running.add(name, seconds)
+            return
+        ms = seconds * 1000
+        with self._lock:
+            self._spans[name] = self._spans.get(name, 0.0) + ms
+            if last is not None:
+                spans = last["spans_ms"]
+                spans[name] = round(spans.get(name, 0.0) + ms, 1)
+        self.write({"event": name, "ms": round(ms, 1),
+                    "job": last["job"] if last else None})
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Append one record to the log, timestamped."""
+        if self._log is None:
+            return
+        record = dict(record, time=round(time.time(), 3))
+        try:
+            self._log.info(json.dumps(record))
+        except (TypeError, ValueError) as e:
+            self.logger.debug(f"Unloggable metrics record: {e}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the totals over every job so far and the last job."""
+        with self._lock:
+            return {
+                "jobs": self._jobs,
+                "spans_ms": {name: round(value, 1)
+                             for name, value in self._spans.items()},
+                "counts": dict(self._counts),
+                "last": self._last,
+            }
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from .pool import BackendNode, BackendPool
+
+
+class HealthMonitor:
+    """Watches every backend instance in the background between generations.
+
+    Runs on a worker thread of the job engine and reports through plain
+    callbacks, like ProgressPoller. Each instance is probed with a cheap
+    request every interval, which also keeps its pooled HTTP connection
+    open so the first generation doesn't pay for connection setup.
+    Unreachable instances are probed again with exponential backoff.
+
+    The model, sampler and LoRA lists are fetched when an instance comes
+    online and refreshed every catalog_interval, so the docker never has
+    to ask for them itself. pause() suspends probing, e.g. while nobody
+    looks at the results.
+    """
+
+    def __init__(self, pool: BackendPool,
+                 probe: Callable[[BackendNode], None],
+                 fetch_catalog: Callable[[BackendNode], Dict[str, List[str]]],
+                 on_status: Callable[[List[Dict[str, Any]]], None],
+                 on_catalog: Callable[[Dict[str, List[str]]], None],
+                 interval: float = 10.0,
+                 max_interval: float = 120.0,
+                 catalog_interval: float = 300.0):
+        """Initialize the monitor.
+
+        Args:
+            pool: Backend instances to watch
+            probe: Raises if a node doesn't answer a lightweight request
+            fetch_catalog: Returns a node's lists keyed by "models",
+                "samplers" and "loras"
+            on_status: Called with one status dict per node whenever a
+                node connects or disconnects, or a report was asked for
+            on_catalog: Called with the merged lists whenever they change
+            interval: Seconds between probes of a healthy node
+            max_interval: Longest backoff between probes of a failing node
+            catalog_interval: Seconds before the lists are fetched again
+        """
+        self.pool = pool
+        self.probe = probe
+        self.fetch_catalog = fetch_catalog
+        self.on_status = on_status
+        self.on_catalog = on_catalog
+        self.interval = max(1.0, interval)
+        self.max_interval = max(self.interval, max_interval)
+        self.catalog_interval = catalog_interval
+        self.logger = logging.getLogger('Autoboarding.Monitor')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._active = threading.Event()
+        self._active.set()
+        self._report = False
+        self._refresh = False
+        self._due = {node.url: 0.0 for node in pool.nodes}
+        self._failures = {node.url: 0 for node in pool.nodes}
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._catalogs: Dict[str, Dict[str, List[str]]] = {}
+        self._catalog_at: Dict[str, float] = {}
+        self._catalog: Dict[str, List[str]] = {}
+
+    def stop(self) -> None:
+        """Ask the monitoring loop to exit."""
+        self._stop.set()
+        self._wake.set()
+        self._active.set()
+
+    def pause(self) -> None:
+        """Stop probing until resume() is called."""
+        self._active.clear()
+        self._wake.set()
+
+    def resume(self) -> None:
+        """Probe again; nodes that came due while paused are probed now."""
+        self._active.set()
+        self._wake.set()
+
+    def wake(self, refresh_catalog: bool = False) -> None:
+        """Probe every node now and report the result through on_status.
+
+        Args:
+            refresh_catalog: Fetch the lists again even if still fresh
+        """
+        with self._lock:
+            self._report = True
+            self._refresh = self._refresh or refresh_catalog
+        self._wake.set()
+
+    def catalog(self) -> Dict[str, List[str]]:
+        """Return the last merged lists (empty until a node answered)."""
+        with self._lock:
+            return dict(self._catalog)
+
+    def run(self) -> None:
+        """Monitor until stopped."""
+        while not self._stop.is_set():
+            self._active.wait()
+            if self._stop.is_set():
+                break
+            self._wake.clear()
+            with self._lock:
+                report, self._report = self._report, False
+                refresh, self._refresh = self._refresh, False
+            self.check(force=report, refresh_catalog=refresh)
+            now = time.monotonic()
+            wait = max(0.0, min(self._due.values()) - now)
+            self._wake.wait(wait)
+
+    def check(self, force: bool = False,
+              refresh_catalog: bool = False) -> None:
+        """Probe the nodes that are due (every node if force) once.
+
+        Args:
+            force: Probe every node and call on_status regardless
+            refresh_catalog: Fetch the lists again even if still fresh
+        """
+        changed = False
+        catalog_changed = False
+        for node in self.pool.nodes:
+            now = time.monotonic()
+            if not force and now < self._due[node.url]:
+                continue
+            previous = self._statuses.get(node.url, {}).get("connected")
+            status = self._check_node(node, refresh_catalog)
+            self._statuses[node.url] = status
+            changed = changed or status["connected"] != previous
+            catalog_changed = self._merge_catalogs() or catalog_changed
+            if self._stop.is_set():
+                return
+        if catalog_changed:
+            self.on_catalog(self.catalog())
+        if changed or force:
+            self.on_status([self._statuses[node.url] for node in self.pool.nodes])
+
+    def _check_node(self, node: BackendNode,
+                    refresh_catalog: bool) -> Dict[str, Any]:
+        """Probe one node and schedule its next probe."""
+        was_connected = self._statuses.get(node.url, {}).get("connected")
+        try:
+            self.probe(node)
+            stale = (
+                time.monotonic() - self._catalog_at.get(node.url, -1e9)
+                >= self.catalog_interval
+            )
+            if refresh_catalog or not was_connected or stale:
+                self._catalogs[node.url] = self.fetch_catalog(node)
+                self._catalog_at[node.url] = time.monotonic()
+        except Exception as e:
+            self.pool.mark_healthy(node, False, e)
+            self._failures[node.url] += 1
+            delay = min(
+                self.max_interval,
+                self.interval * 2 ** (self._failures[node.url] - 1)
+            )
+            # The pool logs the failure when taking the node out of rotation
+            self._due[node.url] = time.monotonic() + delay
+            return {"url": node.url, "connected": False, "error": str(e)}
+
+        self.pool.mark_healthy(node, True)
+        self._failures[node.url] = 0
+        self._due[node.url] = time.monotonic() + self.interval
+        if not was_connected:
+            self.logger.info(f"Backend {node.url} is online")
+        return {"url": node.url, "connected": True}
+
+    def _merge_catalogs(self) -> bool:
+        """Combine the lists of every node; return True if they changed."""
+        merged: Dict[str, List[str]] = {}
+        for node in self.pool.nodes:
+            for key, values in self._catalogs.get(node.url, {}).items():
+                entries = merged.setdefault(key, [])
+                entries.extend(value for value in values if value not in entries)
+        with self._lock:
+            if merged == self._catalog:
+                return False
+            self._catalog = merged
+        return True
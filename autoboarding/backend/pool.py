@@ -0,0 +1,300 @@
+import logging
+import threading
+import time
+from typing import (
+    Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
+)
+
+T = TypeVar("T")
+
+
+def connection_errors() -> Tuple[type, ...]:
+    """Return the errors meaning a node is unreachable, not the request bad.
+
+    requests is imported on first use to keep Krita's startup fast.
+    """
+    import requests
+    from .websocket import WebSocketError
+    return (requests.ConnectionError, requests.Timeout, WebSocketError)
+
+
+class NoBackendAvailable(ConnectionError):
+    """Raised when no healthy backend can take a job."""
+
+
+class BackendNode:
+    """One backend instance and its dispatch bookkeeping."""
+
+    def __init__(self, url: str):
+        """Initialize the node.
+
+        Args:
+            url: Backend base URL
+        """
+        self.url = url.rstrip("/")
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.healthy = True
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # Smoothed seconds per call
+        self.failures = 0
+        self.retry_at = 0.0
+        self.completed = 0
+        self.tags: List[Any] = []  # Tags of the jobs running on the node
+        self.model_key: Optional[Hashable] = None  # Last model setup used
+        self.model_swaps = 0
+
+    @property
+    def session(self):
+        """Return the node's requests.Session, creating it on first use."""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            return self._session
+
+    def close(self) -> None:
+        """Close the node's HTTP session if one was opened."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def available(self, now: float) -> bool:
+        """Return True if the node may be tried at time now."""
+        return self.healthy or now >= self.retry_at
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the node's state."""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency": self.latency,
+            "failures": self.failures,
+            "completed": self.completed,
+            "model_swaps": self.model_swaps,
+        }
+
+
+class BackendPool:
+    """Load-balanced pool of backend instances.
+
+    Jobs go to the healthy node with the fewest jobs in flight, ties
+    broken by recent latency. Nodes that fail with connection errors are
+    taken out of rotation with exponential backoff and the job is retried
+    on another node.
+    """
+
+    def __init__(self, urls: Sequence[str], max_in_flight: int = 1,
+                 max_retries: int = 2, backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        """Initialize the pool.
+
+        Args:
+            urls: Backend base URLs
+            max_in_flight: Jobs sent to one node at a time
+            max_retries: Extra attempts after a connection error
+            backoff: Initial seconds a failed node is left alone
+            max_backoff: Upper bound for the backoff
+        """
+        if not urls:
+            raise ValueError("At least one backend URL is required")
+        self.nodes = [BackendNode(url) for url in urls]
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self.model_swaps = 0
+        self.logger = logging.getLogger('Autoboarding.Pool')
+        self._cond = threading.Condition()
+
+    def acquire(self, tag: Any = None,
+                cancelled: Optional[Callable[[], bool]] = None,
+                exclude: Sequence[BackendNode] = (),
+                model_key: Optional[Hashable] = None,
+                node: Optional[BackendNode] = None) -> BackendNode:
+        """Reserve the least-loaded available node, waiting if all are busy.
+
+        Args:
+            tag: Value recorded on the node while the job runs
+            cancelled: Polled while waiting; returning True aborts the wait
+            exclude: Nodes to skip unless no other node exists
+            model_key: Model setup the job needs; equally loaded nodes
+                that already have it are preferred
+            node: Reserve this node, waiting until it is free, instead of
+                choosing one
+
+        Returns:
+            The reserved node; hand it back with release()
+
+        Raises:
+            NoBackendAvailable: If cancelled while waiting
+        """
+        with self._cond:
+            while True:
+                if cancelled and cancelled():
+                    raise NoBackendAvailable("Cancelled while waiting for a backend")
+                chosen = self._pick(exclude, model_key, node)
+                if chosen is not None:
+                    chosen.in_flight += 1
+                    chosen.tags.append(tag)
+                    return chosen
+                self._cond.wait(self._wait_time())
+
+    def release(self, node: BackendNode, tag: Any = None,
+                elapsed: Optional[float] = None,
+                error: Optional[Exception] = None) -> None:
+        """Return a node reserved with acquire().
+
+        Args:
+            node: The reserved node
+            tag: Tag passed to acquire()
+            elapsed: Seconds the job took, if it completed
+            error: Connection error that made the node fail, if any
+        """
+        with self._cond:
+            node.in_flight -= 1
+            if tag in node.tags:
+                node.tags.remove(tag)
+            if error is not None:
+                self._mark_failed(node, error)
+            elif elapsed is not None:
+                node.healthy = True
+                node.failures = 0
+                node.completed += 1
+                # Exponentially weighted so the pool adapts to load changes
+                node.latency = elapsed if node.latency is None else (
+                    0.7 * node.latency + 0.3 * elapsed
+                )
+            self._cond.notify_all()
+
+    def run(self, fn: Callable[[BackendNode], T], tag: Any = None,
+            cancelled: Optional[Callable[[], bool]] = None,
+            model_key: Optional[Hashable] = None) -> T:
+        """Run fn on a node, failing over on connection errors.
+
+        Args:
+            fn: Callable receiving the node to talk to
+            tag: Value recorded on the node while fn runs
+            cancelled: Polled while waiting for a free node
+            model_key: Model setup fn makes the node load
+
+        Returns:
+            Whatever fn returns
+        """
+        tried: List[BackendNode] = []
+        attempt = 0
+        while True:
+            node = self.acquire(tag, cancelled, tried, model_key)
+            if model_key is not None:
+                self.use_model(node, model_key)
+            started = time.monotonic()
+            try:
+                result = fn(node)
+            except connection_errors() as e:
+                self.release(node, tag, error=e)
+                tried.append(node)
+                attempt += 1
+                if attempt > self.max_retries or (cancelled and cancelled()):
+                    raise
+                self.note_retry(node, e, attempt)
+                continue
+            except Exception:
+                # The node answered, so it is healthy even if the job failed
+                self.release(node, tag)
+                raise
+            self.release(node, tag, elapsed=time.monotonic() - started)
+            return result
+
+    def use_model(self, node: BackendNode, model_key: Hashable) -> None:
+        """Record that a node is about to run with the given model setup.
+
+        Changing a node's known model setup counts as a model swap.
+        """
+        with self._cond:
+            if node.model_key is not None and node.model_key != model_key:
+                node.model_swaps += 1
+                self.model_swaps += 1
+            node.model_key = model_key
+
+    def note_retry(self, node: BackendNode, error: Exception,
+                   attempt: int) -> None:
+        """Count and log a retry after a connection error."""
+        with self._cond:
+            self.retries += 1
+        self.logger.warning(
+            f"Backend {node.url} failed ({error}), "
+            f"retrying ({attempt}/{self.max_retries})"
+        )
+
+    def nodes_for(self, tag: Any) -> List[BackendNode]:
+        """Return the nodes currently running jobs with the given tag."""
+        with self._cond:
+            return [node for node in self.nodes if tag in node.tags]
+
+    def mark_healthy(self, node: BackendNode, healthy: bool,
+                     error: Optional[Exception] = None) -> None:
+        """Record the outcome of an out-of-band health probe."""
+        with self._cond:
+            if healthy:
+                node.healthy = True
+                node.failures = 0
+            else:
+                self._mark_failed(node, error)
+            self._cond.notify_all()
+
+    def healthy_count(self) -> int:
+        """Return the number of nodes currently considered healthy."""
+        with self._cond:
+            return sum(1 for node in self.nodes if node.healthy)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return a snapshot of every node's state."""
+        with self._cond:
+            return [node.stats() for node in self.nodes]
+
+    def close(self) -> None:
+        """Close every node's HTTP session."""
+        for node in self.nodes:
+            node.close()
+
+    def _pick(self, exclude: Sequence[BackendNode],
+              model_key: Optional[Hashable],
+              only: Optional[BackendNode] = None) -> Optional[BackendNode]:
+        """Choose the best free node, or None if every node is busy."""
+        now = time.monotonic()
+        candidates = [
+            node for node in ([only] if only else self.nodes)
+            if node.available(now) and node.in_flight < self.max_in_flight
+        ]
+        preferred = [node for node in candidates if node not in exclude]
+        candidates = preferred or candidates
+        if not candidates:
+            return None
+        return min(candidates, key=lambda node: (
+            not node.healthy, node.in_flight,
+            model_key is not None and node.model_key != model_key,
+            node.latency or 0.0
+        ))
+
+    def _wait_time(self) -> float:
+        """Return how long to sleep before looking for a node again."""
+        now = time.monotonic()
+        pending = [node.retry_at - now for node in self.nodes
+                   if not node.healthy and node.retry_at > now]
+        # Wake periodically anyway so cancellation is noticed
+        return min([0.5] + pending)
+
+    def _mark_failed(self, node: BackendNode,
+                     error: Optional[Exception]) -> None:
+        """Take a node out of rotation with exponential backoff."""
+        node.healthy = False
+        node.failures += 1
+        delay = min(self.max_backoff,
+                    self.backoff * (2 ** (node.failures - 1)))
+        node.retry_at = time.monotonic() + delay
+        self.logger.warning(
+            f"Backend {node.url} marked unhealthy for {delay:.1f}s: {error}"
+        )
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import base64
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from ..imaging import decode_image
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ProgressPoller:
+    """Polls AUTOMATIC1111's progress endpoint while a job is in flight.
+
+    Runs on a worker thread of the job engine and reports through plain
+    callbacks so the owning API can re-emit them as Qt signals.
+    """
+
+    def __init__(self, session, base_url: str, interval: float,
+                 on_progress: Callable[[int, float], None],
+                 on_preview: Optional[Callable[[Image.Image], None]] = None,
+                 preview_interval: float = 1.0):
+        """Initialize the poller.
+
+        Args:
+            session: requests.Session used for polling
+            base_url: Backend base URL
+            interval: Seconds between progress requests
+            on_progress: Called with (percent, eta_seconds)
+            on_preview: Called with decoded preview images (None disables
+                previews)
+            preview_interval: Minimum seconds between decoded previews
+        """
+        self.session = session
+        self.base_url = base_url
+        self.interval = max(0.1, interval)
+        self.on_progress = on_progress
+        self.on_preview = on_preview
+        self.preview_interval = preview_interval
+        self.logger = logging.getLogger('Autoboarding.Progress')
+        self._stop = threading.Event()
+        self._next_preview = 0.0
+
+    def stop(self) -> None:
+        """Ask the polling loop to exit."""
+        self._stop.set()
+
+    def run(self) -> None:
+        """Poll until stopped."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # Progress is best effort; never fail the generation over it
+                self.logger.debug(f"Progress poll failed: {e}")
+
+    def poll(self) -> None:
+        """Fetch and report the current progress once."""
+        want_preview = (
+            self.on_preview is not None
+            and time.monotonic() >= self._next_preview
+        )
+        response = self.session.get(
+            f"{self.base_url}/sdapi/v1/progress",
+            params={"skip_current_image": "false" if want_preview else "true"},
+            timeout=max(1.0, self.interval * 4)
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if self._stop.is_set():
+            return
+
+        percent = int(round(float(data.get("progress") or 0.0) * 100))
+        eta = float(data.get("eta_relative") or 0.0)
+        self.on_progress(min(percent, 100), max(eta, 0.0))
+
+        current_image = data.get("current_image")
+        if want_preview and current_image:
+            started = time.monotonic()
+            image = decode_image(base64.b64decode(current_image))
+            elapsed = time.monotonic() - started
+            self.on_preview(image)
+            # Skip frames while decoding lags behind the requested rate
+            self._next_preview = time.monotonic() + max(
+                self.preview_interval, elapsed * 4
+            )
@@ -0,0 +1,203 @@
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Tuple
+
+
+@dataclass(frozen=True)
+class ReferenceImage:
+    """A reference image sent along with a request, e.g. a ControlNet pose.
+
+    IP-Adapter references are ControlNet units with an IP-Adapter
+    module and model.
+    """
+
+    path: str
+    module: str = "none"  # ControlNet preprocessor
+    model: str = ""  # ControlNet or IP-Adapter model
+    weight: float = 1.0
+
+
+class ReferenceAssets:
+    """Content-addressed store of reference images shared across requests.
+
+    Every frame of a storyboard usually carries the same character and
+    pose references. Files are hashed once per modification time, and
+    each distinct image is base64-encoded once (for AUTOMATIC1111
+    payloads) and uploaded once per ComfyUI instance, under a name
+    derived from its hash, so later requests only send the short name
+    or reuse the same string.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('Autoboarding.References')
+        self.uploads = 0
+        self._files: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime, size, digest)
+        self._encoded: Dict[str, str] = {}  # digest -> base64
+        self._uploaded: Dict[Tuple[str, str], str] = {}  # (url, digest) -> name
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def digest(self, path: str) -> str:
+        """Return the SHA-256 of a file, rehashing only after it changes.
+
+        Args:
+            path: Image file path
+
+        Returns:
+            Hex digest of the file content
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        stat = os.stat(path)
+        with self._lock:
+            known = self._files.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        with self._key_lock(path):
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            with self._lock:
+                previous = self._files.get(path)
+                self._files[path] = (stat.st_mtime_ns, stat.st_size, digest)
+                if previous and previous[2] != digest:
+                    self._forget(previous[2])
+        return digest
+
+    def base64(self, path: str) -> str:
+        """Return a file's content base64-encoded, encoding it only once.
+
+        Args:
+            path: Image file path
+
+        Returns:
+            Base64 text for inlining into a JSON payload
+        """
+        digest = self.digest(path)
+        with self._lock:
+            encoded = self._encoded.get(digest)
+        if encoded is not None:
+            return encoded
+        with self._key_lock(digest):
+            with self._lock:
+                encoded = self._encoded.get(digest)
+            if encoded is None:
+                with open(os.path.expanduser(path), 'rb') as f:
+                    encoded = base64.b64encode(f.read()).decode("ascii")
+                with self._lock:
+                    self._encoded[digest] = encoded
+        return encoded
+
+    def upload(self, session, base_url: str, path: str) -> str:
+        """Make a file available as a ComfyUI input image, once per instance.
+
+        Images are named after their hash, so one already in the
+        instance's input folder (e.g. from an earlier Krita session) is
+        found with a cheap /view request instead of being sent again.
+
+        Args:
+            session: requests.Session for the instance
+            base_url: Instance base URL
+            path: Image file path
+
+        Returns:
+            Image name to put into LoadImage nodes
+        """
+        extension = os.path.splitext(path)[1].lower() or ".png"
+
+        def read() -> bytes:
+            with open(os.path.expanduser(path), 'rb') as f:
+                return f.read()
+
+        return self._upload_once(
+            session, base_url, self.digest(path), extension, read
+        )
+
+    def upload_data(self, session, base_url: str, data: bytes,
+                    extension: str = ".png") -> str:
+        """Make in-memory image data available as a ComfyUI input image.
+
+        Args:
+            session: requests.Session for the instance
+            base_url: Instance base URL
+            data: Encoded image
+            extension: File extension matching the encoding
+
+        Returns:
+            Image name to put into LoadImage nodes
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        return self._upload_once(
+            session, base_url, digest, extension, lambda: data
+        )
+
+    def forget_backend(self, base_url: str) -> None:
+        """Drop the upload records of an instance, e.g. after it restarted."""
+        with self._lock:
+            for key in [k for k in self._uploaded if k[0] == base_url]:
+                del self._uploaded[key]
+
+    def _upload_once(self, session, base_url: str, digest: str,
+                     extension: str, read: Callable[[], bytes]) -> str:
+        """Upload content unless this instance already received it."""
+        key = (base_url, digest)
+        with self._lock:
+            name = self._uploaded.get(key)
+        if name is not None:
+            return name
+        with self._key_lock(key):
+            with self._lock:
+                name = self._uploaded.get(key)
+            if name is None:
+                name = self._upload(session, base_url, digest, extension, read)
+                with self._lock:
+                    self._uploaded[key] = name
+        return name
+
+    def _upload(self, session, base_url: str, digest: str,
+                extension: str, read: Callable[[], bytes]) -> str:
+        """Upload content to /upload/image unless the instance has it."""
+        filename = f"autoboarding_{digest[:24]}{extension}"
+        with session.get(
+            f"{base_url}/view",
+            params={"filename": filename, "type": "input"},
+            timeout=5,
+            stream=True
+        ) as response:
+            if response.status_code == 200:
+                return filename
+
+        mime = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = session.post(
+            f"{base_url}/upload/image",
+            files={"image": (filename, read(), mime)},
+            data={"type": "input", "overwrite": "true"},
+            timeout=30
+        )
+        response.raise_for_status()
+        result = response.json()
+        self.uploads += 1
+        self.logger.info(f"Uploaded {filename} to {base_url}")
+        name = result.get("name", filename)
+        subfolder = result.get("subfolder")
+        return f"{subfolder}/{name}" if subfolder else name
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        """Return the lock serialising work on one file or image."""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _forget(self, digest: str) -> None:
+        """Drop the encoding of content no file has anymore. Caller holds the lock.
+
+        Upload records are kept: the image is still on the instance
+        under its content name if a file changes back.
+        """
+        if not any(entry[2] == digest for entry in self._files.values()):
+            self._encoded.pop(digest, None)
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, Optional
+from .batch import BatchCall
+from .pool import BackendNode
+
+
+class JobScheduler:
+    """Hands out pending backend calls so model swaps stay rare.
+
+    Loading a different checkpoint, VAE or LoRA set costs a backend
+    several seconds, so calls are grouped by model setup. A node keeps
+    draining the group matching what it has loaded, and each group is
+    pinned to the first node that picks it up. A node only takes calls
+    from a group pinned elsewhere once there is nothing else left.
+    """
+
+    def __init__(self, calls: List[BatchCall]):
+        """Initialize the scheduler.
+
+        Args:
+            calls: Backend calls to hand out
+        """
+        self._groups: "OrderedDict[Hashable, Deque[BatchCall]]" = OrderedDict()
+        for call in calls:
+            self._groups.setdefault(call.first.model_key(), deque()).append(call)
+        self._pinned: Dict[Hashable, BackendNode] = {}
+        self._lock = threading.Lock()
+
+    def next_for(self, node: BackendNode) -> Optional[BatchCall]:
+        """Return the next call the node should run.
+
+        Args:
+            node: Node that is free to run a call
+
+        Returns:
+            The call to run, or None once every call has been handed out
+        """
+        with self._lock:
+            key = self._choose_group(node)
+            if key is None:
+                return None
+            self._pinned.setdefault(key, node)
+            group = self._groups[key]
+            call = group.popleft()
+            if not group:
+                del self._groups[key]
+            return call
+
+    def requeue(self, call: BatchCall) -> None:
+        """Put back a call that could not be completed."""
+        with self._lock:
+            key = call.first.model_key()
+            self._groups.setdefault(key, deque()).appendleft(call)
+            # Let any node retry it, preferably one with the model loaded
+            self._pinned.pop(key, None)
+
+    def pending(self) -> int:
+        """Return the number of calls not handed out yet."""
+        with self._lock:
+            return sum(len(group) for group in self._groups.values())
+
+    def _choose_group(self, node: BackendNode) -> Optional[Hashable]:
+        """Pick the model group the node should work on next."""
+        if not self._groups:
+            return None
+        if node.model_key in self._groups:
+            return node.model_key
+        # Groups already pinned to this node, then unclaimed groups
+        for key in self._groups:
+            if self._pinned.get(key) is node:
+                return key
+        for key in self._groups:
+            if key not in self._pinned:
+                return key
+        # Everything left belongs to other nodes; help with the largest
+        return max(self._groups, key=lambda key: len(self._groups[key]))
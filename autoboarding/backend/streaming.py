@@ -0,0 +1,224 @@
+import binascii
+from typing import Iterable, Iterator, Optional
+
+_WHITESPACE = b" \t\r\n"
+_ESCAPES = {
+    ord("/"): b"/", ord("\\"): b"\\", ord('"'): b'"',
+    ord("b"): b"\b", ord("f"): b"\f", ord("n"): b"\n",
+    ord("r"): b"\r", ord("t"): b"\t",
+}
+
+
+def _discard(piece: bytes) -> None:
+    """String sink for values that are skipped."""
+
+
+class _Base64Stream:
+    """Incrementally decodes base64 text arriving in arbitrary pieces."""
+
+    def __init__(self):
+        self._pending = b""
+        self._parts = []
+
+    def feed(self, text: bytes) -> None:
+        """Decode every complete 4-character group received so far."""
+        if self._pending:
+            text = self._pending + text
+        if b"\n" in text or b"\r" in text:
+            text = text.translate(None, _WHITESPACE)
+        usable = len(text) - len(text) % 4
+        if usable:
+            self._parts.append(binascii.a2b_base64(text[:usable]))
+        self._pending = text[usable:]
+
+    def finish(self) -> bytes:
+        """Return the decoded bytes once the string has ended."""
+        if self._pending:
+            # Tolerate encoders that drop the "=" padding
+            padding = b"=" * (-len(self._pending) % 4)
+            self._parts.append(binascii.a2b_base64(self._pending + padding))
+            self._pending = b""
+        return b"".join(self._parts)
+
+
+class _Scanner:
+    """Minimal pull tokenizer over a chunked JSON byte stream.
+
+    Only understands as much JSON as is needed to walk a top-level object,
+    skip values without materialising them and stream one array of
+    strings.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buf = b""
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping consumed bytes. False at EOF."""
+        for chunk in self._chunks:
+            if chunk:
+                self._buf = self._buf[self._pos:] + chunk
+                self._pos = 0
+                return True
+        return False
+
+    def _byte(self) -> int:
+        """Consume and return the next byte."""
+        if self._pos >= len(self._buf) and not self._fill():
+            raise ValueError("Unexpected end of JSON response")
+        value = self._buf[self._pos]
+        self._pos += 1
+        return value
+
+    def token(self) -> int:
+        """Consume whitespace and return the next significant byte."""
+        while True:
+            value = self._byte()
+            if value not in _WHITESPACE:
+                return value
+
+    def expect(self, char: bytes) -> None:
+        """Consume the next significant byte, which must be char."""
+        value = self.token()
+        if value != char[0]:
+            raise ValueError(
+                f"Expected {char!r} in JSON response, got {bytes([value])!r}"
+            )
+
+    def string(self, sink=None) -> Optional[bytes]:
+        """Consume the rest of a string whose opening quote was read.
+
+        Args:
+            sink: Called with each piece of raw content instead of
+                collecting it (escape sequences already resolved)
+
+        Returns:
+            The string's raw bytes, or None when streaming to sink
+        """
+        parts = []
+        emit = sink or parts.append
+        while True:
+            # bytes.find is memchr-fast, which matters for multi-MB strings
+            end = self._buf.find(b'"', self._pos)
+            backslash = self._buf.find(b"\\", self._pos,
+                                       end if end >= 0 else len(self._buf))
+            if backslash >= 0:
+                end = backslash
+            if end < 0:
+                if self._pos < len(self._buf):
+                    emit(self._buf[self._pos:])
+                self._pos = len(self._buf)
+                if not self._fill():
+                    raise ValueError("Unterminated string in JSON response")
+                continue
+            if end > self._pos:
+                emit(self._buf[self._pos:end])
+            self._pos = end + 1
+            if backslash < 0:
+                return None if sink else b"".join(parts)
+            escape = self._byte()
+            if escape == ord("u"):
+                code = self._hex4()
+                if sink is _discard:
+                    continue
+                if 0xD800 <= code < 0xDC00 and self._peek(2) == b"\\u":
+                    # A character beyond the BMP, written by an ASCII-only
+                    # encoder as a UTF-16 surrogate pair
+                    self._pos += 2
+                    low = self._hex4()
+                    if 0xDC00 <= low < 0xE000:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                    else:
+                        emit(b"\xef\xbf\xbd")
+                        code = low
+                if 0xD800 <= code < 0xE000:
+                    code = 0xFFFD  # Unpaired surrogate
+                emit(chr(code).encode("utf-8"))
+            else:
+                emit(_ESCAPES.get(escape, bytes([escape])))
+
+    def _hex4(self) -> int:
+        """Consume the four hex digits of a \\u escape."""
+        digits = bytes(self._byte() for _ in range(4))
+        try:
+            return int(digits, 16)
+        except ValueError:
+            raise ValueError(f"Invalid \\u escape in JSON response: {digits!r}")
+
+    def _peek(self, count: int) -> bytes:
+        """Return up to count upcoming bytes without consuming them."""
+        while len(self._buf) - self._pos < count and self._fill():
+            pass
+        return self._buf[self._pos:self._pos + count]
+
+    def skip_value(self, first: int) -> int:
+        """Skip a value starting with first; return the byte after it."""
+        if first == ord('"'):
+            self.string(sink=_discard)
+            return self.token()
+        if first in b"{[":
+            depth = 1
+            while depth:
+                value = self.token()
+                if value == ord('"'):
+                    self.string(sink=_discard)
+                elif value in b"{[":
+                    depth += 1
+                elif value in b"}]":
+                    depth -= 1
+            return self.token()
+        # Number, true, false or null: runs up to the next delimiter
+        value = first
+        while value not in b",}]" and value not in _WHITESPACE:
+            value = self._byte()
+        return value if value in b",}]" else self.token()
+
+
+def iter_base64_array(chunks: Iterable[bytes], key: str = "images") -> Iterator[bytes]:
+    """Stream-decode a top-level array of base64 strings from a JSON body.
+
+    Each string is base64-decoded piecewise as it arrives and yielded as
+    soon as it ends, so the response text, the parsed JSON and the other
+    images never have to be held in memory at the same time. No text
+    decoding or charset detection is done on the body.
+
+    Args:
+        chunks: Raw response body chunks, e.g. Response.iter_content()
+        key: Name of the top-level array field
+
+    Yields:
+        Decoded bytes of each array entry, in order
+
+    Raises:
+        ValueError: If the body is not a JSON object with that array
+    """
+    scanner = _Scanner(chunks)
+    scanner.expect(b"{")
+    value = scanner.token()
+    found = False
+    while value != ord("}"):
+        if value != ord('"'):
+            raise ValueError("Expected a key in JSON response")
+        name = scanner.string()
+        scanner.expect(b":")
+        value = scanner.token()
+        if name == key.encode() and value == ord("["):
+            found = True
+            value = scanner.token()
+            while value != ord("]"):
+                if value != ord('"'):
+                    raise ValueError(f"Expected strings in {key!r} array")
+                decoder = _Base64Stream()
+                scanner.string(sink=decoder.feed)
+                yield decoder.finish()
+                value = scanner.token()
+                if value == ord(","):
+                    value = scanner.token()
+            value = scanner.token()
+        else:
+            value = scanner.skip_value(value)
+        if value == ord(","):
+            value = scanner.token()
+    if not found:
+        raise ValueError(f"JSON response has no {key!r} array")
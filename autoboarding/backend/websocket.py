@@ -0,0 +1,258 @@
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import time
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_ACCEPT_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebSocketError(OSError):
+    """Raised when a WebSocket connection fails or is closed."""
+
+
+def _mask(key: bytes, data: bytes) -> bytes:
+    """XOR data with a 4-byte masking key."""
+    if not data:
+        return b""
+    repeated = (key * (len(data) // 4 + 1))[:len(data)]
+    return (
+        int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")
+    ).to_bytes(len(data), "big")
+
+
+class WebSocket:
+    """Minimal blocking WebSocket client (RFC 6455).
+
+    Only covers what following a backend's event stream needs: the
+    opening handshake, receiving text and binary messages (including
+    fragmented ones), answering pings and closing. No extensions or
+    subprotocols are negotiated.
+    """
+
+    def __init__(self, sock: socket.socket, buffered: bytes = b""):
+        """Wrap an already upgraded socket. Use connect() instead.
+
+        Args:
+            sock: Connected socket
+            buffered: Bytes read past the end of the handshake
+        """
+        self._sock = sock
+        self._buf = bytearray(buffered)
+        self._fragments = []
+        self._fragment_opcode = None
+        self.closed = False
+
+    @classmethod
+    def connect(cls, url: str, timeout: float = 10.0) -> "WebSocket":
+        """Open a WebSocket connection.
+
+        Args:
+            url: ws:// or wss:// URL
+            timeout: Seconds allowed for connecting and the handshake
+
+        Returns:
+            The connected WebSocket
+
+        Raises:
+            WebSocketError: If the connection or handshake fails
+        """
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if secure else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        key = base64.b64encode(os.urandom(16))
+
+        try:
+            sock = socket.create_connection((host, port), timeout=timeout)
+            if secure:
+                sock = ssl.create_default_context().wrap_socket(
+                    sock, server_hostname=host
+                )
+            sock.sendall(
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key.decode()}\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+                "\r\n".encode("latin-1")
+            )
+            response = b""
+            while b"\r\n\r\n" not in response:
+                data = sock.recv(4096)
+                if not data:
+                    raise WebSocketError("Connection closed during handshake")
+                response += data
+        except WebSocketError:
+            raise
+        except OSError as e:
+            raise WebSocketError(f"Could not connect to {url}: {e}") from e
+
+        head, _, rest = response.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        expected = base64.b64encode(
+            hashlib.sha1(key + _ACCEPT_GUID).digest()
+        ).decode()
+        if len(status) < 2 or status[1] != "101":
+            sock.close()
+            raise WebSocketError(f"WebSocket upgrade refused: {lines[0]}")
+        if headers.get("sec-websocket-accept") != expected:
+            sock.close()
+            raise WebSocketError("Invalid WebSocket handshake response")
+        return cls(sock, rest)
+
+    def recv(self, timeout: Optional[float] = None
+             ) -> Optional[Tuple[int, bytes]]:
+        """Wait for the next text or binary message.
+
+        Pings are answered and fragments reassembled along the way.
+
+        Args:
+            timeout: Seconds to wait (waits forever if None)
+
+        Returns:
+            (opcode, payload), or None if the timeout expired first
+
+        Raises:
+            WebSocketError: If the connection fails or is closed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            frame = self._parse_frame()
+            if frame is not None:
+                message = self._handle_frame(*frame)
+                if message is not None:
+                    return message
+                continue
+            if self.closed:
+                raise WebSocketError("WebSocket is closed")
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            try:
+                self._sock.settimeout(remaining)
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                return None
+            except OSError as e:
+                self.closed = True
+                raise WebSocketError(f"WebSocket connection failed: {e}") from e
+            if not data:
+                self.closed = True
+                raise WebSocketError("WebSocket closed by server")
+            self._buf += data
+
+    def close(self) -> None:
+        """Send a close frame and shut the socket."""
+        if not self.closed:
+            self.closed = True
+            try:
+                self._send_frame(OP_CLOSE, struct.pack("!H", 1000))
+            except OSError:
+                pass
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self) -> "WebSocket":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _parse_frame(self) -> Optional[Tuple[bool, int, bytes]]:
+        """Take one complete frame off the buffer, if there is one."""
+        buf = self._buf
+        if len(buf) < 2:
+            return None
+        fin = bool(buf[0] & 0x80)
+        opcode = buf[0] & 0x0F
+        masked = bool(buf[1] & 0x80)
+        length = buf[1] & 0x7F
+        offset = 2
+        if length == 126:
+            if len(buf) < 4:
+                return None
+            length = struct.unpack_from("!H", buf, 2)[0]
+            offset = 4
+        elif length == 127:
+            if len(buf) < 10:
+                return None
+            length = struct.unpack_from("!Q", buf, 2)[0]
+            offset = 10
+        key = b""
+        if masked:
+            if len(buf) < offset + 4:
+                return None
+            key = bytes(buf[offset:offset + 4])
+            offset += 4
+        if len(buf) < offset + length:
+            return None
+        payload = bytes(buf[offset:offset + length])
+        del buf[:offset + length]
+        if masked:
+            payload = _mask(key, payload)
+        return fin, opcode, payload
+
+    def _handle_frame(self, fin: bool, opcode: int,
+                      payload: bytes) -> Optional[Tuple[int, bytes]]:
+        """Process one frame; return a message once one is complete."""
+        if opcode == OP_PING:
+            self._send_frame(OP_PONG, payload)
+            return None
+        if opcode == OP_PONG:
+            return None
+        if opcode == OP_CLOSE:
+            self.close()
+            raise WebSocketError("WebSocket closed by server")
+        if opcode != OP_CONTINUATION:
+            self._fragment_opcode = opcode
+            self._fragments = []
+        self._fragments.append(payload)
+        if not fin:
+            return None
+        message = (self._fragment_opcode, b"".join(self._fragments))
+        self._fragments = []
+        return message
+
+    def _send_frame(self, opcode: int, payload: bytes) -> None:
+        """Send one masked frame, as clients must."""
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+        key = os.urandom(4)
+        try:
+            self._sock.sendall(bytes(header) + key + _mask(key, payload))
+        except OSError as e:
+            self.closed = True
+            raise WebSocketError(f"WebSocket send failed: {e}") from e
@@ -0,0 +1,180 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from PyQt5.QtCore import QRunnable, QThreadPool
+
+
+class Job(QRunnable):
+    """A unit of backend work executed on the job engine's thread pool.
+
+    Jobs never touch Qt widgets. Results are reported by the callable
+    itself through the owning API's signals, which Qt delivers to
+    receivers on the GUI thread as queued events.
+    """
+
+    _ids = itertools.count(1)
+    _local = threading.local()
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs):
+        """Initialize the job.
+
+        Args:
+            fn: Callable to run on a worker thread
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+        """
+        super().__init__()
+        self.job_id = next(self._ids)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self._engine: Optional["JobEngine"] = None
+        # The engine keeps its own reference and drops it in _finish
+        self.setAutoDelete(False)
+
+    @classmethod
+    def current(cls) -> Optional["Job"]:
+        """Return the job running on the calling thread, if any."""
+        return getattr(cls._local, "job", None)
+
+    def cancel(self) -> None:
+        """Flag the job as cancelled.
+
+        Cancellation is cooperative: the callable checks is_cancelled()
+        and discards its result instead of reporting it.
+        """
+        self.cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """Return True if the job has been cancelled."""
+        return self.cancelled.is_set()
+
+    def is_done(self) -> bool:
+        """Return True if the job has finished running."""
+        return self.done.is_set()
+
+    def run(self):
+        """Execute the job on a worker thread."""
+        self._local.job = self
+        try:
+            if not self.is_cancelled():
+                self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            # The callable is expected to report its own errors
+            logging.getLogger('Autoboarding.Worker').error(
+                f"Unhandled error in job {self.job_id}: {e}"
+            )
+        finally:
+            self._local.job = None
+            self.done.set()
+            if self._engine is not None:
+                self._engine._finish(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished.
+
+        Args:
+            timeout: Seconds to wait (waits forever if None)
+
+        Returns:
+            True if the job finished within the timeout
+        """
+        return self.done.wait(timeout)
+
+
+class JobEngine:
+    """Background job engine backed by a QThreadPool.
+
+    Keeps every blocking backend call (HTTP requests, image decoding)
+    off Krita's GUI thread.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """Initialize the job engine.
+
+        Args:
+            max_workers: Maximum number of concurrently running jobs
+        """
+        self.logger = logging.getLogger('Autoboarding.Worker')
+        # A private pool so plugin jobs never starve Krita's global pool
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(1, max_workers))
+        self._jobs: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue a callable for execution on a worker thread.
+
+        Args:
+            fn: Callable to run
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+
+        Returns:
+            The queued Job
+        """
+        job = Job(fn, *args, **kwargs)
+        job._engine = self
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self.pool.start(job)
+        return job
+
+    def take(self, job: Job) -> bool:
+        """Remove a job from the queue if it hasn't started yet.
+
+        Args:
+            job: Job returned by submit()
+
+        Returns:
+            True if the job was dequeued and will never run
+        """
+        if not self.pool.tryTake(job):
+            return False
+        job.cancel()
+        job.done.set()
+        self._finish(job)
+        return True
+
+    def active_jobs(self) -> int:
+        """Return the number of queued or running jobs."""
+        with self._lock:
+            return len(self._jobs)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until all queued jobs have finished.
+
+        Args:
+            timeout: Seconds to wait (waits forever if None)
+
+        Returns:
+            True if all jobs finished within the timeout
+        """
+        msecs = -1 if timeout is None else int(timeout * 1000)
+        return self.pool.waitForDone(msecs)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Drop queued jobs and wait for running ones to finish.
+
+        Args:
+            timeout: Seconds to wait for running jobs
+        """
+        self.pool.clear()
+        if not self.wait(timeout):
+            self.logger.warning("Timed out waiting for background jobs")
+        with self._lock:
+            # Whatever is left was dropped from the queue before it ran
+            for job in self._jobs.values():
+                job.cancel()
+                job.done.set()
+            self._jobs.clear()
+
+    def _finish(self, job: Job) -> None:
+        """Forget a finished job."""
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
@@ -1,8 +1,55 @@
 import json
+import logging
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
-from dataclasses import dataclass, asdict
-from typing import Optional
+from dataclasses import dataclass, asdict, field, fields
+from typing import Any, Dict, List, Optional, get_args, get_origin
+
+# Settings a generation profile can hold, and their types
+PROFILE_SETTINGS = {
+    "width": int,
+    "height": int,
+    "steps": int,
+    "cfg_scale": float,
+    "sampler": str,
+    "checkpoint": str,
+}
+
+# Allowed values of settings that only take a few
+_CHOICES = {
+    "backend_type": ("automatic1111", "comfyui"),
+}
+
+
+def _coerce(value: Any, hint: Any) -> Any:
+    """Return a loaded JSON value checked against a type annotation.
+    
+    Integers are accepted where floats are expected; anything else of
+    the wrong type raises TypeError.
+    """
+    origin = get_origin(hint)
+    if origin is list:
+        if not isinstance(value, list):
+            raise TypeError(f"expected a list, got {type(value).__name__}")
+        (item,) = get_args(hint)
+        return [_coerce(v, item) for v in value]
+    if origin is dict:
+        if not isinstance(value, dict):
+            raise TypeError(f"expected an object, got {type(value).__name__}")
+        key, item = get_args(hint)
+        return {_coerce(k, key): _coerce(v, item) for k, v in value.items()}
+    if hint is Any:
+        return value
+    if hint is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    # bool is an int subclass, but true is no valid step count
+    if not isinstance(value, hint) or (hint is int and isinstance(value, bool)):
+        raise TypeError(f"expected {hint.__name__}, got {type(value).__name__}")
+    return value
+
 
 @dataclass
 class Config:
@@ -10,8 +57,19 @@ class Config:
     
     # Backend settings
     backend_url: str = "http://127.0.0.1:7860"  # Default A1111 address
+    backend_urls: List[str] = field(default_factory=list)  # Overrides backend_url
     backend_type: str = "automatic1111"  # or "comfyui"
+    comfyui_workflow: str = ""  # API-format workflow file; empty uses the built-in graph
     timeout: int = 30
+    max_workers: int = 4  # Background job threads
+    supersede_running: bool = True  # New requests interrupt the running one
+    max_jobs_per_backend: int = 1  # Requests sent to one instance at a time
+    max_retries: int = 2  # Failover attempts after a connection error
+    retry_backoff: float = 1.0  # Initial seconds a failed instance is skipped
+    health_interval: float = 10.0  # Seconds between background probes; 0 disables
+    health_max_interval: float = 120.0  # Longest probe backoff while unreachable
+    catalog_interval: float = 300.0  # Seconds before model/sampler lists are refetched
+    warmup_on_model_change: bool = True  # Load a newly chosen checkpoint right away
     
     # Generation settings
     default_width: int = 512
@@ -19,33 +77,209 @@ class Config:
     default_steps: int = 20
     default_cfg_scale: float = 7.0
     default_sampler: str = "Euler a"
+    max_batch_size: int = 4  # Frames coalesced into one backend call
+    tile_size: int = 768  # Longest side of one tile in tiled mode
+    tile_overlap: int = 64  # Pixels blended between neighbouring tiles
+    tile_denoise: float = 0.35  # How much tiles may change the upscaled base
+    
+    # Progress settings
+    progress_interval: float = 0.5  # Seconds between progress polls
+    live_preview: bool = True  # Decode intermediate images while generating
+    preview_interval: float = 1.0  # Minimum seconds between live previews
+    preview_size: int = 256  # Longest side of downsampled previews
+    
+    # Cache settings
+    cache_enabled: bool = True  # Reuse results of fixed-seed requests with a chosen model
+    cache_max_mb: int = 1024  # Disk space for cached images
+    
+    # Metrics settings
+    metrics_log: bool = True  # Append per-job timings to autoboarding_metrics.jsonl
+    metrics_log_mb: int = 5  # Size at which the metrics log is rotated
+    
+    # History settings
+    history_enabled: bool = True  # Keep every result for the docker's gallery
+    history_max_entries: int = 2000  # Oldest results are deleted beyond this
+    history_max_mb: int = 4096  # Disk space for full-size results; 0 is unlimited
     
     # UI settings
-    prompt_history_size: int = 50
+    prompt_history_size: int = 50  # Recent prompts offered in the docker
     show_advanced: bool = False
+    show_stats: bool = False  # Timing breakdown of the last job in the docker
+    # Settings last used in the docker, keyed like PROFILE_SETTINGS; kept
+    # apart from the defaults, which e.g. size a tiled job's base image
+    last_settings: Dict[str, Any] = field(default_factory=dict)
+    
+    # Generation profiles: name -> settings from PROFILE_SETTINGS
+    profiles: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    active_profile: str = ""
+    save_delay: float = 1.0  # Seconds of quiet before changes are written
     
     def __post_init__(self):
         """Load saved configuration if it exists."""
         self.config_path = Path.home() / ".config" / "krita" / "autoboarding.json"
+        self.cache_path = self.config_path.parent / "autoboarding_cache"
+        self.logger = logging.getLogger('Autoboarding.Config')
+        self._pending: Optional[Dict[str, Any]] = None
+        self._save_due = 0.0
+        self._save_cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
         self.load()
     
+    def get_backend_urls(self) -> List[str]:
+        """Return every configured backend instance URL."""
+        return list(self.backend_urls) or [self.backend_url]
+    
     def load(self) -> None:
-        """Load configuration from disk."""
-        if self.config_path.exists():
+        """Load configuration from disk.
+        
+        Every value is checked against the type of its setting; unknown
+        keys and values of the wrong type are skipped with a warning, so
+        a hand-edited file can't break the plugin later on.
+        """
+        if not self.config_path.exists():
+            return
+        try:
+            with open(self.config_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error loading config: {e}")
+            return
+        if not isinstance(data, dict):
+            self.logger.error("Error loading config: not a JSON object")
+            return
+        hints = {item.name: item.type for item in fields(self)}
+        for key, value in data.items():
+            if key not in hints:
+                self.logger.warning(f"Ignoring unknown config setting {key!r}")
+                continue
             try:
-                with open(self.config_path, 'r') as f:
-                    data = json.load(f)
-                    for key, value in data.items():
-                        if hasattr(self, key):
-                            setattr(self, key, value)
-            except Exception as e:
-                print(f"Error loading config: {e}")
+                value = _coerce(value, hints[key])
+                if key in _CHOICES and value not in _CHOICES[key]:
+                    raise ValueError(f"expected one of {', '.join(_CHOICES[key])}")
+                if key == "profiles":
+                    value = {name: self._check_profile(settings)
+                             for name, settings in value.items()}
+                elif key == "last_settings":
+                    value = self._check_profile(value)
+            except (TypeError, ValueError) as e:
+                self.logger.warning(f"Ignoring config setting {key!r}: {e}")
+                continue
+            setattr(self, key, value)
+        if self.active_profile not in self.profiles:
+            self.active_profile = ""
     
     def save(self) -> None:
-        """Save configuration to disk."""
+        """Schedule the configuration to be written to disk.
+        
+        The write happens on a background thread once no further save()
+        has followed for save_delay seconds, so widgets can save on every
+        change. Call flush() where it must be on disk right away.
+        """
+        snapshot = asdict(self)
+        with self._save_cond:
+            self._pending = snapshot
+            self._save_due = time.monotonic() + self.save_delay
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="Autoboarding config writer",
+                    daemon=True
+                )
+                self._writer.start()
+            self._save_cond.notify()
+    
+    def flush(self) -> None:
+        """Write a scheduled save now, on the calling thread."""
+        # Held from taking the snapshot until it is written, so an older
+        # snapshot can never replace a newer one on disk
+        with self._write_lock:
+            with self._save_cond:
+                data, self._pending = self._pending, None
+            if data is not None:
+                self._write(data)
+    
+    def profile(self, name: str) -> Dict[str, Any]:
+        """Return a copy of a profile's settings.
+        
+        Raises:
+            KeyError: If there is no profile of that name
+        """
+        return dict(self.profiles[name])
+    
+    def save_profile(self, name: str, settings: Dict[str, Any]) -> None:
+        """Store settings as a named profile and make it the active one.
+        
+        Args:
+            name: Profile name, e.g. the show it is for
+            settings: Values keyed like PROFILE_SETTINGS
+        
+        Raises:
+            ValueError: If the name is empty
+            TypeError: If a setting has the wrong type
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("Profile name is empty")
+        self.profiles[name] = self._check_profile(settings)
+        self.active_profile = name
+        self.save()
+    
+    def use_profile(self, name: str) -> Dict[str, Any]:
+        """Make a profile the active one and return its settings.
+        
+        Raises:
+            KeyError: If there is no profile of that name
+        """
+        settings = self.profile(name)
+        self.active_profile = name
+        self.save()
+        return settings
+    
+    def delete_profile(self, name: str) -> None:
+        """Remove a profile, if it exists."""
+        self.profiles.pop(name, None)
+        if self.active_profile == name:
+            self.active_profile = ""
+        self.save()
+    
+    def _check_profile(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a profile's known settings, type-checked."""
+        return {key: _coerce(value, PROFILE_SETTINGS[key])
+                for key, value in settings.items() if key in PROFILE_SETTINGS}
+    
+    def _run_writer(self) -> None:
+        """Write scheduled saves once they have been quiet for save_delay."""
+        while True:
+            with self._save_cond:
+                while self._pending is None:
+                    self._save_cond.wait()
+                delay = self._save_due - time.monotonic()
+                if delay > 0:
+                    self._save_cond.wait(delay)
+                    continue
+            self.flush()
+    
+    def _write(self, data: Dict[str, Any]) -> None:
+        """Replace the config file atomically with data."""
         try:
             self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.config_path, 'w') as f:
-                json.dump(asdict(self), f, indent=2)
-        except Exception as e:
-            print(f"Error saving config: {e}")
+            # Written next to the file and renamed over it, so a crash
+            # mid-write leaves the previous file intact
+            fd, temp = tempfile.mkstemp(
+                dir=self.config_path.parent,
+                prefix=f".{self.config_path.name}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp, self.config_path)
+            except BaseException:
+                try:
+                    os.unlink(temp)
+                except OSError:
+                    pass
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Error saving config: {e}")
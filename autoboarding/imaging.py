@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional, Tuple
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+if TYPE_CHECKING:
+    # Pillow is imported on first use to keep Krita's startup fast
+    from PIL import Image
+
+
+@dataclass
+class GeneratedImage:
+    """A generated frame converted once for display and layer insertion.
+
+    pixels holds the frame as 8-bit BGRA, the byte order Krita's
+    Node.setPixelData expects for RGBA/U8 layers and the in-memory layout
+    of QImage.Format_ARGB32 on little-endian machines, so the same buffer
+    feeds both the preview and the layer without another copy or a PNG
+    round-trip.
+    """
+
+    image: Image.Image  # Decoded original, kept for caching and saving
+    pixels: bytes  # BGRA, width * height * 4 bytes
+    width: int
+    height: int
+    preview: QImage  # Downsampled copy for the docker's preview area
+    x: int = 0  # Document position to paste at
+    y: int = 0
+
+
+@dataclass(eq=False)
+class CanvasRegion:
+    """Raw pixels read from a canvas area, used as an img2img source.
+
+    Compared and hashed by identity so requests carrying one stay cheap
+    to compare; content_key() identifies the pixels themselves.
+    """
+
+    pixels: bytes  # BGRA, width * height * 4 bytes
+    x: int
+    y: int
+    width: int
+    height: int
+    mask: Optional[bytes] = None  # Selection, one byte per pixel; None = all
+    _key: Optional[str] = field(default=None, init=False, repr=False)
+
+    def content_key(self) -> str:
+        """Return a digest of the pixels and mask, computed once."""
+        if self._key is None:
+            digest = hashlib.blake2b(self.pixels, digest_size=16)
+            if self.mask is not None:
+                digest.update(self.mask)
+            self._key = f"{digest.hexdigest()}-{self.width}x{self.height}"
+        return self._key
+
+
+def decode_image(data: bytes) -> Image.Image:
+    """Decode an encoded image (PNG, JPEG, ...) and load its pixels.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        Fully loaded PIL Image
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def to_bgra(image: Image.Image) -> bytes:
+    """Return an image's pixels as 8-bit BGRA bytes.
+
+    Args:
+        image: PIL Image in any mode
+
+    Returns:
+        Raw BGRA bytes in row-major order
+    """
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return image.tobytes("raw", "BGRA")
+
+
+def qimage_from_bgra(pixels: bytes, width: int, height: int) -> QImage:
+    """Wrap a BGRA buffer in a QImage without copying it.
+
+    The QImage borrows pixels, which must stay alive as long as it does.
+
+    Args:
+        pixels: Raw BGRA bytes
+        width: Image width
+        height: Image height
+
+    Returns:
+        QImage sharing the buffer
+    """
+    return QImage(pixels, width, height, width * 4, QImage.Format_ARGB32)
+
+
+def prepare_image(image: Image.Image, preview_size: int) -> GeneratedImage:
+    """Convert a decoded frame for the GUI thread.
+
+    Meant to run on a worker thread so the GUI thread only has to turn
+    the small preview into a pixmap.
+
+    Args:
+        image: Decoded PIL Image
+        preview_size: Longest side of the preview in pixels
+
+    Returns:
+        GeneratedImage with the BGRA buffer and preview filled in
+    """
+    pixels = to_bgra(image)
+    preview = make_preview(pixels, image.width, image.height, preview_size)
+    return GeneratedImage(image, pixels, image.width, image.height, preview)
+
+
+def make_preview(pixels: bytes, width: int, height: int,
+                 preview_size: int) -> QImage:
+    """Downsample a BGRA buffer into a standalone preview QImage.
+
+    Args:
+        pixels: Raw BGRA bytes
+        width: Image width
+        height: Image height
+        preview_size: Longest side of the preview in pixels
+
+    Returns:
+        QImage owning its own (small) pixel data
+    """
+    full = qimage_from_bgra(pixels, width, height)
+    if max(width, height) <= preview_size:
+        return full.copy()
+    return full.scaled(
+        preview_size, preview_size,
+        Qt.KeepAspectRatio,
+        Qt.SmoothTransformation
+    )
+
+
+def preview_from_pil(image: Image.Image, preview_size: int) -> QImage:
+    """Downsample a PIL image straight into a preview QImage.
+
+    Cheaper than prepare_image() for throwaway frames such as live
+    previews, since only the downsampled copy is converted.
+
+    Args:
+        image: PIL Image in any mode
+        preview_size: Longest side of the preview in pixels
+
+    Returns:
+        QImage owning its own pixel data
+    """
+    from PIL import Image
+    if max(image.size) > preview_size:
+        image = image.copy()
+        image.thumbnail((preview_size, preview_size), Image.BILINEAR)
+    return qimage_from_bgra(to_bgra(image), image.width, image.height).copy()
+
+
+def fit_resolution(width: int, height: int, width_limit: int,
+                   height_limit: int) -> Tuple[int, int]:
+    """Scale a region to the pixel count of a target size, keeping its aspect.
+
+    Args:
+        width: Region width
+        height: Region height
+        width_limit: Target width
+        height_limit: Target height
+
+    Returns:
+        (width, height) rounded to multiples of 8, as the models need
+    """
+    scale = math.sqrt((width_limit * height_limit) / (width * height))
+    return (
+        max(64, int(round(width * scale / 8)) * 8),
+        max(64, int(round(height * scale / 8)) * 8),
+    )
+
+
+def encode_init_image(region: CanvasRegion, width: int,
+                      height: int) -> Tuple[bytes, Optional[bytes]]:
+    """Downsample a canvas region and encode it for img2img.
+
+    Meant to run on a worker thread. PNG compression is kept low since
+    the result only travels to a local backend.
+
+    Args:
+        region: Pixels read from the canvas
+        width: Target width
+        height: Target height
+
+    Returns:
+        (image PNG, mask PNG or None)
+    """
+    from PIL import Image
+    image = Image.frombuffer(
+        "RGBA", (region.width, region.height), region.pixels,
+        "raw", "BGRA", 0, 1
+    )
+    # Backends ignore alpha; flatten transparent areas onto white
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    image = background
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+    encoded = _png(image)
+
+    mask = None
+    if region.mask is not None:
+        mask_image = Image.frombuffer(
+            "L", (region.width, region.height), region.mask, "raw", "L", 0, 1
+        )
+        if mask_image.size != (width, height):
+            mask_image = mask_image.resize((width, height), Image.BILINEAR)
+        mask = _png(mask_image)
+    return encoded, mask
+
+
+def _png(image: Image.Image) -> bytes:
+    """Encode an image as a quickly compressed PNG."""
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def paste_into_region(image: Image.Image, region: CanvasRegion,
+                      preview_size: int) -> GeneratedImage:
+    """Scale a result back to its canvas region for pasting.
+
+    Pixels outside the selection mask are left transparent (partially
+    selected ones partially so), so the frame only covers the selected
+    area when inserted as a layer above the canvas.
+
+    Args:
+        image: Generated image at the img2img resolution
+        region: Region the init image was read from
+        preview_size: Longest side of the preview in pixels
+
+    Returns:
+        GeneratedImage positioned at the region
+    """
+    from PIL import Image
+    size = (region.width, region.height)
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    image = image.convert("RGBA")
+    if region.mask is not None:
+        mask = Image.frombuffer("L", size, region.mask, "raw", "L", 0, 1)
+        image.putalpha(mask)
+    frame = prepare_image(image, preview_size)
+    frame.x, frame.y = region.x, region.y
+    return frame
@@ -1,7 +1,11 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import sys, os
-sys.path.append(os.path.dirname(__file__), "external")
+sys.path.append(os.path.join(os.path.dirname(__file__), "external"))
 
 import logging
+from contextlib import contextmanager
 from krita import *
 from PyQt5.QtWidgets import QWidget
 
@@ -9,6 +13,26 @@ from .ui.docker import AutoboardingDocker
 from .config import Config
 from .backend.api import StableDiffusionAPI
 
+# The vendored HTTP stack and Pillow are imported lazily by the backend,
+# so this only covers the plugin's own modules and Qt/Krita bindings
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+@contextmanager
+def startup_timer(label: str):
+    """Log how long a plugin startup step takes.
+    
+    Args:
+        label: Name of the step in the log message
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        logging.getLogger('Autoboarding.Startup').info(
+            f"{label} took {elapsed:.1f} ms"
+        )
+
 class AutoboardingPlugin(Extension):
     """Main plugin class for Autoboarding."""
     
@@ -29,11 +53,18 @@ class AutoboardingPlugin(Extension):
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger('Autoboarding')
+        logging.getLogger('Autoboarding.Startup').info(
+            f"Plugin import took {_IMPORT_SECONDS * 1000:.1f} ms"
+        )
 
     def setup(self):
         """Set up the plugin configuration and dependencies."""
-        self.config = Config()
-        self.api = StableDiffusionAPI(self.config)
+        with startup_timer("setup()"):
+            self.config = Config()
+            self.api = StableDiffusionAPI(self.config)
+            Krita.instance().notifier().applicationClosing.connect(self.api.shutdown)
+            # Settings are saved in the background; write the last change
+            Krita.instance().notifier().applicationClosing.connect(self.config.flush)
         
     def createActions(self, window):
         """Create plugin actions/menu items.
@@ -55,5 +86,6 @@ class AutoboardingPlugin(Extension):
     def createDocker(self):
         """Create the plugin's docker panel."""
         if not self.docker:
-            self.docker = AutoboardingDocker(self.api, self.config)
+            with startup_timer("createDocker()"):
+                self.docker = AutoboardingDocker(self.api, self.config)
         return self.docker
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List
+
+from .imaging import CanvasRegion, GeneratedImage, prepare_image, to_bgra
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+@dataclass
+class Tile:
+    """One overlapping piece of a tiled target image."""
+
+    index: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def _starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Return tile offsets covering length, the last one flush with the end."""
+    if length <= tile:
+        return [0]
+    stride = max(8, tile - overlap)
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def plan_tiles(width: int, height: int, tile_size: int,
+               overlap: int) -> List[Tile]:
+    """Split a target image into overlapping tiles, row by row.
+
+    Args:
+        width: Target width (a multiple of 8)
+        height: Target height (a multiple of 8)
+        tile_size: Longest tile side (a multiple of 8)
+        overlap: Pixels neighbouring tiles share, blended across
+
+    Returns:
+        Tiles covering the whole target
+    """
+    tile_width, tile_height = min(tile_size, width), min(tile_size, height)
+    tiles = []
+    for y in _starts(height, tile_height, overlap):
+        for x in _starts(width, tile_width, overlap):
+            tiles.append(Tile(len(tiles), x, y, tile_width, tile_height))
+    return tiles
+
+
+def _ramp(length: int, start: bool, end: bool, overlap: int) -> bytes:
+    """Return a 0-255 weight row rising over overlap at the marked ends."""
+    weights = bytearray(b"\xff" * length)
+    overlap = min(overlap, length // 2)
+    for i in range(overlap):
+        value = (i + 1) * 255 // (overlap + 1)
+        if start:
+            weights[i] = min(weights[i], value)
+        if end:
+            weights[length - 1 - i] = min(weights[length - 1 - i], value)
+    return bytes(weights)
+
+
+def feather_mask(tile: Tile, width: int, height: int,
+                 overlap: int) -> Image.Image:
+    """Return a tile's blend mask, faded towards its neighbouring tiles.
+
+    Edges on the border of the target stay fully opaque so the outer
+    edge of the image is never blended with the upscaled base.
+
+    Args:
+        tile: Tile to build the mask for
+        width: Target width
+        height: Target height
+        overlap: Width of the fade in pixels
+
+    Returns:
+        Mode "L" mask the size of the tile
+    """
+    from PIL import Image, ImageChops
+    row = _ramp(tile.width, tile.x > 0, tile.x + tile.width < width, overlap)
+    column = _ramp(tile.height, tile.y > 0,
+                   tile.y + tile.height < height, overlap)
+    horizontal = Image.frombytes("L", (tile.width, 1), row).resize(
+        (tile.width, tile.height), Image.NEAREST
+    )
+    vertical = Image.frombytes("L", (1, tile.height), column).resize(
+        (tile.width, tile.height), Image.NEAREST
+    )
+    return ImageChops.darker(horizontal, vertical)
+
+
+class TiledCanvas:
+    """Full-size image that refined tiles are blended into as they arrive.
+
+    Starts as the upscaled base image. Each tile is composited over the
+    current content through its feather mask, so seams fade across the
+    overlap whichever neighbour finishes first, and the blended area is
+    handed back ready to be written into the document.
+    """
+
+    def __init__(self, base: Image.Image, overlap: int, preview_size: int):
+        """Initialize the canvas.
+
+        Args:
+            base: Upscaled base image at the target size
+            overlap: Pixels neighbouring tiles share
+            preview_size: Longest side of tile previews in pixels
+        """
+        self.image = base.convert("RGB")
+        self.overlap = overlap
+        self.preview_size = preview_size
+        self._lock = threading.Lock()
+
+    def region(self, tile: Tile) -> CanvasRegion:
+        """Return a tile's area of the current canvas as an img2img source."""
+        with self._lock:
+            crop = self.image.crop(
+                (tile.x, tile.y, tile.x + tile.width, tile.y + tile.height)
+            )
+        return CanvasRegion(to_bgra(crop), tile.x, tile.y,
+                            tile.width, tile.height)
+
+    def blend(self, tile: Tile, image: Image.Image) -> GeneratedImage:
+        """Merge a refined tile into the canvas.
+
+        Safe to call from several worker threads at once.
+
+        Args:
+            tile: Tile the image was generated for
+            image: Generated tile
+
+        Returns:
+            The blended tile area, positioned in the target
+        """
+        from PIL import Image
+        size = (tile.width, tile.height)
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+        mask = feather_mask(tile, self.image.width, self.image.height,
+                            self.overlap)
+        box = (tile.x, tile.y, tile.x + tile.width, tile.y + tile.height)
+        with self._lock:
+            self.image.paste(image.convert("RGB"), box[:2], mask)
+            blended = self.image.crop(box)
+        frame = prepare_image(blended, self.preview_size)
+        frame.x, frame.y = tile.x, tile.y
+        return frame
@@ -1,16 +1,22 @@
 import logging
+import time
 from typing import Optional
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QTextEdit, QSpinBox, QDoubleSpinBox,
-    QComboBox, QProgressBar, QFrame
+    QComboBox, QProgressBar, QFrame, QCheckBox, QLineEdit, QListView, QInputDialog
 )
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QPixmap, QImage
 from krita import *
 
 from ..backend.api import StableDiffusionAPI
 from ..config import Config
+from .document import (
+    begin_tiled_layer, export_region, insert_image, insert_frames_as_layers,
+    insert_frames_as_keyframes, write_tile
+)
+from .gallery import HistoryModel
 
 class AutoboardingDocker(DockWidget):
     """Main docker panel for the Autoboarding plugin."""
@@ -34,11 +40,15 @@ class AutoboardingDocker(DockWidget):
         self.main_widget = QWidget()
         self.setWidget(self.main_widget)
         self._setup_ui()
+        self._apply_settings(self.config.last_settings)
         self._connect_signals()
         
         # Initialize state
         self.current_canvas = None
         self.preview_image = None
+        self.generated_frames = {}  # Frame index -> GeneratedImage
+        self.tiled_document = None  # Document a tiled generation writes to
+        self.tiled_layer = None
     
     def _setup_ui(self):
         """Create and arrange UI components."""
@@ -53,8 +63,17 @@ class AutoboardingDocker(DockWidget):
         status_layout.addWidget(self.check_connection_btn)
         layout.addLayout(status_layout)
         
-        # Prompt input
-        layout.addWidget(QLabel("Prompt:"))
+        # Prompt input, with recently used prompts to pick from
+        prompt_layout = QHBoxLayout()
+        self.recent_prompts_input = QComboBox()
+        self.recent_prompts_input.setPlaceholderText("Recent prompts")
+        self.recent_prompts_input.setSizeAdjustPolicy(
+            QComboBox.AdjustToMinimumContentsLengthWithIcon
+        )
+        self.recent_prompts_input.setMinimumContentsLength(12)
+        prompt_layout.addWidget(QLabel("Prompt:"))
+        prompt_layout.addWidget(self.recent_prompts_input, 1)
+        layout.addLayout(prompt_layout)
         self.prompt_input = QTextEdit()
         self.prompt_input.setMaximumHeight(60)
         layout.addWidget(self.prompt_input)
@@ -65,6 +84,18 @@ class AutoboardingDocker(DockWidget):
         self.negative_prompt_input.setMaximumHeight(40)
         layout.addWidget(self.negative_prompt_input)
         
+        # Generation profiles, e.g. one per show
+        profile_layout = QHBoxLayout()
+        self.profile_input = QComboBox()
+        self.save_profile_btn = QPushButton("Save Profile...")
+        self.delete_profile_btn = QPushButton("Delete")
+        profile_layout.addWidget(QLabel("Profile:"))
+        profile_layout.addWidget(self.profile_input, 1)
+        profile_layout.addWidget(self.save_profile_btn)
+        profile_layout.addWidget(self.delete_profile_btn)
+        layout.addLayout(profile_layout)
+        self._update_profiles()
+        
         # Generation parameters
         params_layout = QHBoxLayout()
         
@@ -96,28 +127,65 @@ class AutoboardingDocker(DockWidget):
         steps_cfg_layout.addWidget(self.cfg_input)
         params_layout.addLayout(steps_cfg_layout)
         
-        # Sampler selection
+        # Sampler & model selection, filled in once a backend answers
         sampler_layout = QVBoxLayout()
         self.sampler_input = QComboBox()
-        self.sampler_input.addItems([
-            "Euler a", "Euler", "LMS", "Heun", "DPM2",
-            "DPM2 a", "DPM++ 2S a", "DPM++ 2M"
-        ])
-        self.sampler_input.setCurrentText(self.config.default_sampler)
+        self._select_sampler(self.config.default_sampler)
+        self.model_input = QComboBox()
+        self.model_input.addItem("Backend Default", "")
         sampler_layout.addWidget(QLabel("Sampler:"))
         sampler_layout.addWidget(self.sampler_input)
+        sampler_layout.addWidget(QLabel("Model:"))
+        sampler_layout.addWidget(self.model_input)
         params_layout.addLayout(sampler_layout)
         
         layout.addLayout(params_layout)
         
+        # Seed & storyboard batch
+        batch_layout = QHBoxLayout()
+        self.seed_input = QSpinBox()
+        self.seed_input.setRange(-1, 2147483647)
+        self.seed_input.setValue(-1)
+        self.seed_input.setSpecialValueText("Random")
+        self.frames_input = QSpinBox()
+        self.frames_input.setRange(1, 100)
+        self.frames_input.setValue(1)
+        self.per_line_input = QCheckBox("One panel per line")
+        self.tiled_input = QCheckBox("Tiled (high-res)")
+        batch_layout.addWidget(QLabel("Seed:"))
+        batch_layout.addWidget(self.seed_input)
+        batch_layout.addWidget(QLabel("Frames:"))
+        batch_layout.addWidget(self.frames_input)
+        batch_layout.addWidget(self.per_line_input)
+        batch_layout.addWidget(self.tiled_input)
+        layout.addLayout(batch_layout)
+        
+        # img2img / inpainting from the canvas
+        canvas_layout = QHBoxLayout()
+        self.source_input = QComboBox()
+        self.source_input.addItems(["Visible Image", "Active Layer"])
+        self.denoise_input = QDoubleSpinBox()
+        self.denoise_input.setRange(0.0, 1.0)
+        self.denoise_input.setSingleStep(0.05)
+        self.denoise_input.setValue(0.75)
+        self.generate_canvas_btn = QPushButton("Generate from Canvas")
+        canvas_layout.addWidget(self.source_input)
+        canvas_layout.addWidget(QLabel("Denoise:"))
+        canvas_layout.addWidget(self.denoise_input)
+        canvas_layout.addWidget(self.generate_canvas_btn)
+        layout.addLayout(canvas_layout)
+        
         # Generate button & progress
         gen_layout = QHBoxLayout()
         self.generate_btn = QPushButton("Generate")
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.hide()
         self.progress_bar = QProgressBar()
         self.progress_bar.setTextVisible(False)
         self.progress_bar.hide()
         gen_layout.addWidget(self.generate_btn)
         gen_layout.addWidget(self.progress_bar)
+        gen_layout.addWidget(self.cancel_btn)
         layout.addLayout(gen_layout)
         
         # Preview area
@@ -131,82 +199,594 @@ class AutoboardingDocker(DockWidget):
         self.insert_btn = QPushButton("Insert into Document")
         self.insert_btn.setEnabled(False)
         layout.addWidget(self.insert_btn)
+        
+        # Storyboard insertion
+        storyboard_layout = QHBoxLayout()
+        self.storyboard_mode_input = QComboBox()
+        self.storyboard_mode_input.addItems(["Timeline Frames", "Layer Group"])
+        self.insert_storyboard_btn = QPushButton("Insert Storyboard")
+        self.insert_storyboard_btn.setEnabled(False)
+        storyboard_layout.addWidget(self.storyboard_mode_input)
+        storyboard_layout.addWidget(self.insert_storyboard_btn)
+        layout.addLayout(storyboard_layout)
+        
+        # Gallery of past results; only visible thumbnails are loaded
+        history_layout = QHBoxLayout()
+        self.history_search_input = QLineEdit()
+        self.history_search_input.setPlaceholderText("Search prompts...")
+        self.history_search_input.setClearButtonEnabled(True)
+        history_layout.addWidget(QLabel("History:"))
+        history_layout.addWidget(self.history_search_input)
+        layout.addLayout(history_layout)
+        self.history_model = HistoryModel(self.api.history, self)
+        self.history_view = QListView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setViewMode(QListView.IconMode)
+        self.history_view.setIconSize(QSize(96, 96))
+        self.history_view.setUniformItemSizes(True)
+        self.history_view.setResizeMode(QListView.Adjust)
+        self.history_view.setMovement(QListView.Static)
+        self.history_view.setLayoutMode(QListView.Batched)
+        self.history_view.setBatchSize(64)
+        self.history_view.setMaximumHeight(240)
+        layout.addWidget(self.history_view)
+        history_buttons = QHBoxLayout()
+        self.history_insert_btn = QPushButton("Insert Selected")
+        self.history_reuse_btn = QPushButton("Reuse Settings")
+        history_buttons.addWidget(self.history_insert_btn)
+        history_buttons.addWidget(self.history_reuse_btn)
+        layout.addLayout(history_buttons)
+        # Searching waits for a pause in typing
+        self.history_search_timer = QTimer(self)
+        self.history_search_timer.setSingleShot(True)
+        self.history_search_timer.setInterval(250)
+        self._update_recent_prompts()
+        
+        # Timing breakdown of the last job
+        self.stats_input = QCheckBox("Show Timing")
+        self.stats_input.setChecked(self.config.show_stats)
+        self.stats_label = QLabel("No jobs yet")
+        self.stats_label.setWordWrap(True)
+        self.stats_label.setVisible(self.config.show_stats)
+        layout.addWidget(self.stats_input)
+        layout.addWidget(self.stats_label)
     
     def _connect_signals(self):
         """Connect UI signals to handlers."""
         self.check_connection_btn.clicked.connect(self._check_connection)
+        # Backends are only watched while the docker is on screen
+        self.visibilityChanged.connect(self.api.set_monitoring)
         self.generate_btn.clicked.connect(self._generate)
+        self.generate_canvas_btn.clicked.connect(self._generate_from_canvas)
+        self.tiled_input.toggled.connect(self._on_tiled_toggled)
+        self.model_input.currentIndexChanged.connect(self._on_model_changed)
+        self.stats_input.toggled.connect(self._on_stats_toggled)
+        self.profile_input.activated.connect(self._on_profile_chosen)
+        self.save_profile_btn.clicked.connect(self._save_profile)
+        self.delete_profile_btn.clicked.connect(self._delete_profile)
+        # Last used settings are kept for the next session
+        for spin in (self.width_input, self.height_input, self.steps_input,
+                     self.cfg_input):
+            spin.valueChanged.connect(self._remember_settings)
+        self.sampler_input.currentIndexChanged.connect(self._remember_settings)
+        self.model_input.currentIndexChanged.connect(self._remember_settings)
+        self.recent_prompts_input.activated.connect(self._on_recent_prompt)
+        self.history_search_input.textChanged.connect(
+            self.history_search_timer.start
+        )
+        self.history_search_timer.timeout.connect(self._search_history)
+        self.history_view.doubleClicked.connect(self._insert_history)
+        self.history_insert_btn.clicked.connect(self._insert_history)
+        self.history_reuse_btn.clicked.connect(self._reuse_history)
+        self.cancel_btn.clicked.connect(self.api.cancel)
         self.insert_btn.clicked.connect(self._insert_into_document)
+        self.insert_storyboard_btn.clicked.connect(self._insert_storyboard)
         
         # Connect API signals
         self.api.generation_started.connect(self._on_generation_started)
         self.api.generation_progress.connect(self._on_generation_progress)
+        self.api.generation_eta.connect(self._on_generation_eta)
+        self.api.generation_preview.connect(self._on_generation_preview)
         self.api.generation_complete.connect(self._on_generation_complete)
         self.api.generation_failed.connect(self._on_generation_failed)
+        self.api.generation_cancelled.connect(self._on_generation_cancelled)
+        self.api.frame_complete.connect(self._on_frame_complete)
+        self.api.batch_progress.connect(self._on_batch_progress)
+        self.api.batch_complete.connect(self._on_batch_complete)
+        self.api.tile_complete.connect(self._on_tile_complete)
+        self.api.connection_checked.connect(self._on_connection_checked)
+        self.api.catalog_updated.connect(self._on_catalog_updated)
+        self.api.job_metrics.connect(self._on_job_metrics)
+        self.api.history_added.connect(self._on_history_added)
+        self.api.history_loaded.connect(self._on_history_loaded)
     
     def _check_connection(self):
         """Check backend API connection."""
-        status = self.api.check_connection()
+        self.check_connection_btn.setEnabled(False)
+        self.status_label.setText("⚪ Checking...")
+        self.api.check_connection()
+    
+    def _on_connection_checked(self, status: dict):
+        """Handle the result of a connection check.
+        
+        Also called by the background health monitor whenever a backend
+        connects or disconnects.
+        """
+        self.check_connection_btn.setEnabled(True)
         if status["connected"]:
-            self.status_label.setText(f"🟢 Connected ({status['api_type']})")
-            self.generate_btn.setEnabled(True)
+            text = f"🟢 Connected ({status['api_type']})"
+            if status.get("total_backends", 1) > 1:
+                text += f" {status['backends']}/{status['total_backends']} backends"
+            self.status_label.setText(text)
+            # Don't unblock a running generation's buttons
+            idle = self.cancel_btn.isHidden() or self.config.supersede_running
+            self.generate_btn.setEnabled(idle)
+            self.generate_canvas_btn.setEnabled(idle)
         else:
             self.status_label.setText(f"🔴 Error: {status['error']}")
             self.generate_btn.setEnabled(False)
+            self.generate_canvas_btn.setEnabled(False)
+    
+    def _on_catalog_updated(self, catalog: dict):
+        """Fill the sampler and model lists with what the backends offer."""
+        samplers = catalog.get("samplers") or []
+        if samplers:
+            current = self.sampler_input.currentText()
+            # Falling back to another sampler isn't a choice to remember
+            self.sampler_input.blockSignals(True)
+            self.sampler_input.clear()
+            self.sampler_input.addItems(samplers)
+            for name in (current, self.config.default_sampler):
+                if name in samplers:
+                    self.sampler_input.setCurrentText(name)
+                    break
+            self.sampler_input.blockSignals(False)
+        
+        current = self.model_input.currentData() or ""
+        # Repopulating must not trigger a warm-up
+        self.model_input.blockSignals(True)
+        self.model_input.clear()
+        self.model_input.addItem("Backend Default", "")
+        for name in catalog.get("models") or []:
+            self.model_input.addItem(name, name)
+        index = self.model_input.findData(current)
+        self.model_input.setCurrentIndex(max(0, index))
+        self.model_input.blockSignals(False)
+    
+    def _on_model_changed(self, index: int):
+        """Load a newly chosen checkpoint before the next generation."""
+        checkpoint = self._checkpoint()
+        if checkpoint and self.config.warmup_on_model_change:
+            self.api.warm_up(checkpoint)
+    
+    def _checkpoint(self) -> str:
+        """Return the chosen checkpoint, or "" for the backend default."""
+        return self.model_input.currentData() or ""
+    
+    def _select_checkpoint(self, checkpoint: str):
+        """Choose a checkpoint, listing it if the backends haven't yet."""
+        index = self.model_input.findData(checkpoint)
+        if index < 0:
+            self.model_input.addItem(checkpoint, checkpoint)
+            index = self.model_input.count() - 1
+        self.model_input.setCurrentIndex(index)
+    
+    def _select_sampler(self, sampler: str):
+        """Choose a sampler, listing it if the backends haven't yet."""
+        if self.sampler_input.findText(sampler) < 0:
+            self.sampler_input.addItem(sampler)
+        self.sampler_input.setCurrentText(sampler)
+    
+    def _settings(self) -> dict:
+        """Return the current generation settings as a profile."""
+        return {
+            "width": self.width_input.value(),
+            "height": self.height_input.value(),
+            "steps": self.steps_input.value(),
+            "cfg_scale": self.cfg_input.value(),
+            "sampler": self.sampler_input.currentText(),
+            "checkpoint": self._checkpoint(),
+        }
+    
+    def _remember_settings(self, *args):
+        """Store the current settings to restore them next time."""
+        self.config.last_settings = self._settings()
+        # Written in the background once the changes settle
+        self.config.save()
+    
+    def _update_profiles(self):
+        """Fill the profile list from the configuration."""
+        self.profile_input.clear()
+        self.profile_input.addItem("(None)", "")
+        for name in sorted(self.config.profiles, key=str.lower):
+            self.profile_input.addItem(name, name)
+        self.profile_input.setCurrentIndex(
+            max(0, self.profile_input.findData(self.config.active_profile))
+        )
+        self.delete_profile_btn.setEnabled(bool(self.config.active_profile))
+    
+    def _on_profile_chosen(self, index: int):
+        """Switch every generation setting to a profile's."""
+        name = self.profile_input.itemData(index)
+        self.delete_profile_btn.setEnabled(bool(name))
+        if not name:
+            self.config.active_profile = ""
+            self.config.save()
+            return
+        self._apply_settings(self.config.use_profile(name))
+    
+    def _apply_settings(self, settings: dict):
+        """Set the generation settings from a profile-style dict."""
+        # Profiles and last used settings may hold tiled sizes beyond
+        # the plain limits
+        limit = max(settings.get("width", 0), settings.get("height", 0))
+        if limit > self.width_input.maximum():
+            self.tiled_input.setChecked(True)
+            self._on_tiled_toggled(True)
+        for spin, key in ((self.width_input, "width"),
+                          (self.height_input, "height"),
+                          (self.steps_input, "steps"),
+                          (self.cfg_input, "cfg_scale")):
+            if key in settings:
+                spin.setValue(settings[key])
+        if settings.get("sampler"):
+            self._select_sampler(settings["sampler"])
+        if "checkpoint" in settings:
+            self._select_checkpoint(settings["checkpoint"])
+    
+    def _save_profile(self):
+        """Save the current settings under a profile name."""
+        name, ok = QInputDialog.getText(
+            self, "Save Profile", "Profile name:",
+            text=self.config.active_profile
+        )
+        if not ok or not name.strip():
+            return
+        self.config.save_profile(name, self._settings())
+        self._update_profiles()
+    
+    def _delete_profile(self):
+        """Delete the chosen profile."""
+        name = self.profile_input.currentData()
+        if name:
+            self.config.delete_profile(name)
+            self._update_profiles()
     
     def _generate(self):
         """Start image generation."""
-        self.api.generate_image(
+        # Generation starts asynchronously; block repeat clicks right away
+        # unless a new click is meant to supersede the running job
+        self.generate_btn.setEnabled(self.config.supersede_running)
+        self.generate_canvas_btn.setEnabled(self.config.supersede_running)
+        
+        prompt = self.prompt_input.toPlainText()
+        if self.per_line_input.isChecked():
+            prompts = [line.strip() for line in prompt.splitlines()
+                       if line.strip()]
+        else:
+            prompts = [prompt]
+        frames = self.frames_input.value()
+        seed = self.seed_input.value()
+        
+        if self.tiled_input.isChecked():
+            document = self.current_canvas.document() if self.current_canvas else None
+            if not document:
+                self._on_generation_failed("No document open")
+                return
+            # Tiles are written into this document as they finish
+            self.tiled_document = document
+            self.tiled_layer = None
+            self.api.generate_tiled(
+                prompt=prompt,
+                width=self.width_input.value(),
+                height=self.height_input.value(),
+                negative_prompt=self.negative_prompt_input.toPlainText(),
+                steps=self.steps_input.value(),
+                cfg_scale=self.cfg_input.value(),
+                sampler=self.sampler_input.currentText(),
+                seed=seed,
+                checkpoint=self._checkpoint()
+            )
+            return
+        
+        if len(prompts) == 1 and frames == 1:
+            self.api.generate_image(
+                prompt=prompt,
+                negative_prompt=self.negative_prompt_input.toPlainText(),
+                width=self.width_input.value(),
+                height=self.height_input.value(),
+                steps=self.steps_input.value(),
+                cfg_scale=self.cfg_input.value(),
+                sampler=self.sampler_input.currentText(),
+                seed=seed,
+                checkpoint=self._checkpoint()
+            )
+            return
+        
+        # Each prompt gets `frames` consecutive seeds
+        requests = []
+        for panel_prompt in prompts:
+            for i in range(frames):
+                requests.append(self.api.make_request(
+                    prompt=panel_prompt,
+                    negative_prompt=self.negative_prompt_input.toPlainText(),
+                    width=self.width_input.value(),
+                    height=self.height_input.value(),
+                    steps=self.steps_input.value(),
+                    cfg_scale=self.cfg_input.value(),
+                    sampler=self.sampler_input.currentText(),
+                    seed=seed + i if seed >= 0 else -1,
+                    frame=len(requests),
+                    checkpoint=self._checkpoint()
+                ))
+        self.generated_frames = {}
+        self.insert_storyboard_btn.setEnabled(False)
+        self.api.generate_batch(requests)
+    
+    def _generate_from_canvas(self):
+        """Regenerate the selected area of the canvas (img2img/inpainting)."""
+        document = self.current_canvas.document() if self.current_canvas else None
+        if not document:
+            self.status_label.setText("🔴 Error: No document open")
+            return
+        node = None
+        if self.source_input.currentText() == "Active Layer":
+            node = document.activeNode()
+        try:
+            # Only raw pixels are read here; scaling and encoding happen
+            # on a worker thread
+            region = export_region(document, node)
+        except Exception as e:
+            self.logger.error(f"Reading the canvas failed: {e}")
+            self.status_label.setText(f"🔴 Error: {e}")
+            return
+        
+        self.generate_btn.setEnabled(self.config.supersede_running)
+        self.generate_canvas_btn.setEnabled(self.config.supersede_running)
+        self.api.generate_img2img(
+            region,
             prompt=self.prompt_input.toPlainText(),
             negative_prompt=self.negative_prompt_input.toPlainText(),
             width=self.width_input.value(),
             height=self.height_input.value(),
             steps=self.steps_input.value(),
             cfg_scale=self.cfg_input.value(),
-            sampler=self.sampler_input.currentText()
+            sampler=self.sampler_input.currentText(),
+            seed=self.seed_input.value(),
+            denoising_strength=self.denoise_input.value(),
+            checkpoint=self._checkpoint()
         )
     
     def _on_generation_started(self):
         """Handle generation start."""
         self.progress_bar.show()
         self.progress_bar.setValue(0)
-        self.generate_btn.setEnabled(False)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.setTextVisible(False)
+        self.cancel_btn.show()
+        self.generate_btn.setEnabled(self.config.supersede_running)
+        self.generate_canvas_btn.setEnabled(self.config.supersede_running)
         self.insert_btn.setEnabled(False)
     
     def _on_generation_progress(self, progress: int):
         """Handle generation progress update."""
         self.progress_bar.setValue(progress)
     
+    def _on_generation_eta(self, eta: float):
+        """Show the estimated time remaining on the progress bar."""
+        if eta > 0:
+            self.progress_bar.setFormat(f"%p% ({eta:.0f}s left)")
+            self.progress_bar.setTextVisible(True)
+    
+    def _on_generation_preview(self, image):
+        """Show an intermediate image while generation is running."""
+        self._show_preview(image)
+    
     def _on_generation_complete(self, image):
         """Handle generation completion."""
         self.preview_image = image
         self._update_preview()
         self.progress_bar.hide()
+        self.cancel_btn.hide()
         self.generate_btn.setEnabled(True)
+        self.generate_canvas_btn.setEnabled(True)
+        self.insert_btn.setEnabled(True)
+    
+    def _on_frame_complete(self, frame: int, image):
+        """Handle a finished storyboard frame."""
+        self.generated_frames[frame] = image
+        self.preview_image = image
+        self._update_preview()
         self.insert_btn.setEnabled(True)
+        self.insert_storyboard_btn.setEnabled(True)
+    
+    def _on_tiled_toggled(self, tiled: bool):
+        """Allow print-resolution sizes only in tiled mode."""
+        limit = 16384 if tiled else 2048
+        self.width_input.setMaximum(limit)
+        self.height_input.setMaximum(limit)
+    
+    def _on_tile_complete(self, tile):
+        """Write a finished tile straight into the tiled layer."""
+        if self.tiled_document is None:
+            return
+        started = time.perf_counter()
+        try:
+            if self.tiled_layer is None:
+                # The first tile is the upscaled base covering the target
+                self.tiled_layer = begin_tiled_layer(
+                    self.tiled_document, tile.width, tile.height
+                )
+                self.preview_image = tile
+                self._update_preview()
+            write_tile(self.tiled_document, self.tiled_layer, tile)
+            self._record_insert(started)
+        except Exception as e:
+            self.logger.error(f"Writing tile failed: {e}")
+            self.status_label.setText(f"🔴 Error: {e}")
+    
+    def _on_batch_progress(self, done: int, total: int):
+        """Show how many storyboard frames are finished."""
+        self.status_label.setText(f"🟢 Generated {done}/{total} frames")
+    
+    def _on_batch_complete(self):
+        """Handle storyboard batch completion."""
+        self.progress_bar.hide()
+        self.cancel_btn.hide()
+        self.generate_btn.setEnabled(True)
+        self.generate_canvas_btn.setEnabled(True)
     
     def _on_generation_failed(self, error: str):
         """Handle generation failure."""
         self.progress_bar.hide()
+        self.cancel_btn.hide()
         self.generate_btn.setEnabled(True)
+        self.generate_canvas_btn.setEnabled(True)
         self.status_label.setText(f"🔴 Error: {error}")
     
+    def _on_generation_cancelled(self):
+        """Handle generation cancellation."""
+        self.progress_bar.hide()
+        self.cancel_btn.hide()
+        self.generate_btn.setEnabled(True)
+        self.generate_canvas_btn.setEnabled(True)
+        # Restore the last finished result over any partial live preview
+        self._update_preview()
+        self.insert_btn.setEnabled(self.preview_image is not None)
+    
     def _update_preview(self):
         """Update the preview image display."""
         if self.preview_image:
-            # Convert PIL Image to QPixmap
-            data = self.preview_image.convert("RGBA").tobytes("raw", "RGBA")
-            qimg = QImage(data, self.preview_image.width, self.preview_image.height,
-                         QImage.Format_RGBA8888)
-            pixmap = QPixmap.fromImage(qimg)
-            
-            # Scale to fit preview area while maintaining aspect ratio
-            scaled = pixmap.scaled(
-                self.preview_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.preview_label.setPixmap(scaled)
+            self._show_preview(self.preview_image.preview)
+    
+    def _show_preview(self, image: QImage):
+        """Draw a downsampled QImage into the preview area."""
+        pixmap = QPixmap.fromImage(image)
+        
+        # Scale to fit preview area while maintaining aspect ratio
+        scaled = pixmap.scaled(
+            self.preview_label.size(),
+            Qt.KeepAspectRatio,
+            Qt.SmoothTransformation
+        )
+        self.preview_label.setPixmap(scaled)
+    
+    def _on_history_added(self, entry_id: int):
+        """Show a new result in the gallery."""
+        self.history_model.add(entry_id)
+        self._update_recent_prompts()
+    
+    def _update_recent_prompts(self):
+        """Fill the recent prompts list from the history."""
+        if self.api.history is None:
+            self.recent_prompts_input.setEnabled(False)
+            return
+        prompts = self.api.history.recent_prompts(self.config.prompt_history_size)
+        self.recent_prompts_input.clear()
+        for prompt in prompts:
+            # Long prompts are shortened for the list, kept whole as data
+            label = prompt if len(prompt) <= 60 else prompt[:57] + "..."
+            self.recent_prompts_input.addItem(label, prompt)
+        self.recent_prompts_input.setCurrentIndex(-1)
+    
+    def _on_recent_prompt(self, index: int):
+        """Put a recently used prompt back into the prompt field."""
+        prompt = self.recent_prompts_input.itemData(index)
+        if prompt:
+            self.prompt_input.setPlainText(prompt)
+    
+    def _search_history(self):
+        """Filter the gallery by the search text."""
+        self.history_model.set_query(self.history_search_input.text())
+    
+    def _selected_history_row(self) -> int:
+        """Return the selected gallery row, or -1."""
+        index = self.history_view.currentIndex()
+        return index.row() if index.isValid() else -1
+    
+    def _insert_history(self, *args):
+        """Load the selected past result for insertion into the document."""
+        entry_id = self.history_model.entry_id(self._selected_history_row())
+        if entry_id is None:
+            return
+        if not self.current_canvas or not self.current_canvas.document():
+            self.status_label.setText("🔴 Error: No document open")
+            return
+        # Decoded at full size on a worker thread; see _on_history_loaded
+        self.api.load_history(entry_id)
+    
+    def _on_history_loaded(self, image):
+        """Insert a loaded past result as a new layer."""
+        document = self.current_canvas.document() if self.current_canvas else None
+        if not document:
+            return
+        started = time.perf_counter()
+        insert_image(document, image, "AI Generated (History)")
+        self._record_insert(started)
+    
+    def _reuse_history(self):
+        """Load the selected past result's prompt and settings."""
+        entry = self.history_model.entry(self._selected_history_row())
+        if entry is None:
+            return
+        params = entry.params
+        self.prompt_input.setPlainText(entry.prompt)
+        self.negative_prompt_input.setPlainText(entry.negative_prompt)
+        self.seed_input.setValue(entry.seed)
+        # Tiled sizes can exceed the plain limits, so set the mode first
+        self.tiled_input.setChecked(params.get("mode") == "tiled")
+        self.width_input.setValue(entry.width)
+        self.height_input.setValue(entry.height)
+        self.steps_input.setValue(params.get("steps", self.steps_input.value()))
+        self.cfg_input.setValue(params.get("cfg_scale", self.cfg_input.value()))
+        if self.sampler_input.findText(params.get("sampler", "")) >= 0:
+            self.sampler_input.setCurrentText(params["sampler"])
+        model = self.model_input.findData(params.get("checkpoint", ""))
+        if model >= 0:
+            self.model_input.setCurrentIndex(model)
+        if "denoising_strength" in params:
+            self.denoise_input.setValue(params["denoising_strength"])
+    
+    def _on_stats_toggled(self, shown: bool):
+        """Show or hide the timing breakdown."""
+        self.config.show_stats = shown
+        self.config.save()
+        self.stats_label.setVisible(shown)
+        if shown:
+            self._update_stats()
+    
+    def _on_job_metrics(self, record: dict):
+        """Refresh the timing breakdown when a job finishes."""
+        if self.stats_label.isVisible():
+            self._update_stats()
+    
+    def _update_stats(self):
+        """Show where the last job's time went, and session totals."""
+        summary = self.api.metrics.summary()
+        last = summary["last"]
+        if last is None:
+            self.stats_label.setText("No jobs yet")
+            return
+        spans = " · ".join(
+            f"{name.replace('_', ' ')} {ms / 1000:.2f}s"
+            for name, ms in last["spans_ms"].items()
+        )
+        counts = last["counts"]
+        self.stats_label.setText(
+            f"Last {last['kind']} ({last['frames']} frames, {last['status']}): "
+            f"{last['total_ms'] / 1000:.2f}s\n{spans}\n"
+            f"{counts.get('calls', 0)} calls · "
+            f"{counts.get('cache_hits', 0)} cache hits · "
+            f"{counts.get('retries', 0)} retries · "
+            f"{counts.get('model_swaps', 0)} model swaps\n"
+            f"{summary['jobs']} jobs this session"
+        )
+    
+    def _record_insert(self, started: float):
+        """Add the time since started to the last job's insert span."""
+        self.api.record_span("insert", time.perf_counter() - started)
+        if self.stats_label.isVisible():
+            self._update_stats()
     
     def _insert_into_document(self):
         """Insert the generated image into the Krita document."""
@@ -215,30 +795,30 @@ class AutoboardingDocker(DockWidget):
             
         document = self.current_canvas.document()
         if document:
-            # Create a new layer
-            root = document.rootNode()
-            layer = document.createNode("AI Generated", "paintlayer")
-            root.addChildNode(layer, None)
-            
-            # Convert PIL image to bytes
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.WriteOnly)
-            
-            # Save as PNG
-            qimg = QImage(
-                self.preview_image.tobytes("raw", "RGBA"),
-                self.preview_image.width,
-                self.preview_image.height,
-                QImage.Format_RGBA8888
-            )
-            qimg.save(buffer, "PNG")
-            
-            # Insert into layer
-            layer.setPixelData(bytes(byte_array), 0, 0, 
-                             self.preview_image.width,
-                             self.preview_image.height)
-            document.refreshProjection()
+            started = time.perf_counter()
+            insert_image(document, self.preview_image)
+            self._record_insert(started)
+    
+    def _insert_storyboard(self):
+        """Insert every generated storyboard frame into the document at once."""
+        if not self.generated_frames or not self.current_canvas:
+            return
+        
+        document = self.current_canvas.document()
+        if not document:
+            return
+        frames = [self.generated_frames[index]
+                  for index in sorted(self.generated_frames)]
+        started = time.perf_counter()
+        try:
+            if self.storyboard_mode_input.currentText() == "Timeline Frames":
+                insert_frames_as_keyframes(document, frames)
+            else:
+                insert_frames_as_layers(document, frames)
+            self._record_insert(started)
+        except Exception as e:
+            self.logger.error(f"Storyboard insertion failed: {e}")
+            self.status_label.setText(f"🔴 Error: {e}")
     
     def canvas_changed(self, canvas):
         """Handle canvas change events."""
@@ -0,0 +1,216 @@
+import logging
+from typing import List, Optional
+from krita import Krita
+
+from PyQt5.QtGui import QImage
+
+from ..imaging import CanvasRegion, GeneratedImage
+
+logger = logging.getLogger('Autoboarding.Document')
+
+
+def _match_pixel_format(layer) -> None:
+    """Make a layer accept the 8-bit BGRA buffers of GeneratedImage."""
+    if layer.colorModel() != "RGBA" or layer.colorDepth() != "U8":
+        layer.setColorSpace("RGBA", "U8", "sRGB-elle-V2-srgbtrc.icc")
+
+
+def _write(layer, frame: GeneratedImage) -> None:
+    """Copy a frame's prepared pixels into a layer at the frame's position."""
+    layer.setPixelData(frame.pixels, frame.x, frame.y, frame.width, frame.height)
+
+
+def insert_image(document, frame: GeneratedImage,
+                 name: str = "AI Generated"):
+    """Insert one frame as a new paint layer on top of the document.
+
+    Args:
+        document: Krita Document
+        frame: Prepared frame to insert
+        name: Name of the new layer
+
+    Returns:
+        The new layer
+    """
+    layer = document.createNode(name, "paintlayer")
+    document.rootNode().addChildNode(layer, None)
+    _match_pixel_format(layer)
+    _write(layer, frame)
+    document.refreshProjection()
+    return layer
+
+
+def begin_tiled_layer(document, width: int, height: int,
+                      name: str = "AI Tiled"):
+    """Create the layer a tiled generation is written into.
+
+    The canvas is grown to the target size first if it is smaller.
+
+    Args:
+        document: Krita Document
+        width: Target width
+        height: Target height
+        name: Name of the new layer
+
+    Returns:
+        The new layer
+    """
+    if document.width() < width or document.height() < height:
+        document.resizeImage(0, 0, max(document.width(), width),
+                             max(document.height(), height))
+    layer = document.createNode(name, "paintlayer")
+    document.rootNode().addChildNode(layer, None)
+    _match_pixel_format(layer)
+    return layer
+
+
+def write_tile(document, layer, frame: GeneratedImage) -> None:
+    """Write one finished tile into its area of a tiled layer.
+
+    Args:
+        document: Krita Document holding the layer
+        layer: Layer from begin_tiled_layer()
+        frame: Blended tile, positioned in the target
+    """
+    _write(layer, frame)
+    document.refreshProjection()
+
+
+def insert_frames_as_layers(document, frames: List[GeneratedImage],
+                            name: str = "AI Storyboard"):
+    """Insert frames as separate layers inside one new group layer.
+
+    The group is filled while still detached and attached to the
+    document in a single step, so the whole batch is one undoable
+    change and the projection is refreshed once.
+
+    Args:
+        document: Krita Document
+        frames: Prepared frames in panel order
+        name: Name of the new group layer
+
+    Returns:
+        The new group layer
+    """
+    group = document.createNode(name, "grouplayer")
+    previous = None
+    for index, frame in enumerate(frames, 1):
+        layer = document.createNode(f"Panel {index}", "paintlayer")
+        group.addChildNode(layer, previous)
+        _match_pixel_format(layer)
+        _write(layer, frame)
+        # Only the first panel stays visible so the canvas isn't a stack
+        layer.setVisible(index == 1)
+        previous = layer
+    document.rootNode().addChildNode(group, None)
+    document.refreshProjection()
+    return group
+
+
+def insert_frames_as_keyframes(document, frames: List[GeneratedImage],
+                               name: str = "AI Animatic",
+                               start_time: Optional[int] = None):
+    """Insert frames as keyframes on consecutive frames of one layer.
+
+    libkis has no keyframe API, so keyframes are created with Krita's
+    "add_blank_frame" action, which works on the active node of the
+    active document. Each keyframe is therefore its own undo step, but
+    the projection is only refreshed once at the end.
+
+    Args:
+        document: Krita Document, must be the active document
+        frames: Prepared frames in timeline order
+        name: Name of the new animation layer
+        start_time: First frame number (defaults to the current time)
+
+    Returns:
+        The new animation layer
+    """
+    app = Krita.instance()
+    active = app.activeDocument()
+    if active is None or (active.rootNode().uniqueId()
+                          != document.rootNode().uniqueId()):
+        raise RuntimeError("Storyboard frames can only go into the active document")
+
+    start = document.currentTime() if start_time is None else start_time
+    end = start + len(frames) - 1
+    if document.fullClipRangeEndTime() < end:
+        document.setFullClipRangeEndTime(end)
+
+    layer = document.createNode(name, "paintlayer")
+    document.rootNode().addChildNode(layer, None)
+    _match_pixel_format(layer)
+    document.setActiveNode(layer)
+
+    add_frame = app.action("add_blank_frame")
+    for offset, frame in enumerate(frames):
+        document.setCurrentTime(start + offset)
+        add_frame.trigger()
+        document.waitForDone()
+        _write(layer, frame)
+
+    document.setCurrentTime(start)
+    document.refreshProjection()
+    logger.info(f"Inserted {len(frames)} keyframes at frames {start}-{end}")
+    return layer
+
+
+def export_region(document, node=None) -> CanvasRegion:
+    """Read the selected canvas area as raw pixels for img2img.
+
+    Pixels come straight from Document.pixelData/Node.pixelData, so
+    nothing is written to disk or encoded on the GUI thread. The area
+    is the selection's bounding box, or the whole canvas (or layer) if
+    nothing is selected, and the selection itself becomes the mask.
+
+    Args:
+        document: Krita Document
+        node: Layer to read; None reads the merged visible image
+
+    Returns:
+        CanvasRegion with BGRA pixels and the selection mask
+
+    Raises:
+        RuntimeError: If the area is empty or the layer isn't 8-bit RGBA
+    """
+    document.waitForDone()
+    x, y, width, height = 0, 0, document.width(), document.height()
+    if node is not None:
+        bounds = node.bounds()
+        x, y, width, height = _intersect(
+            (x, y, width, height),
+            (bounds.x(), bounds.y(), bounds.width(), bounds.height())
+        )
+
+    mask = None
+    selection = document.selection()
+    if selection is not None and selection.width() and selection.height():
+        x, y, width, height = _intersect(
+            (x, y, width, height),
+            (selection.x(), selection.y(), selection.width(), selection.height())
+        )
+        if width and height:
+            mask = bytes(selection.pixelData(x, y, width, height))
+    if not width or not height:
+        raise RuntimeError("Nothing to read: the selected area is empty")
+
+    source = node or document
+    if source.colorModel() == "RGBA" and source.colorDepth() == "U8":
+        pixels = bytes(source.pixelData(x, y, width, height))
+    elif node is None:
+        # Other color spaces: let Krita convert the projection to sRGB
+        image = document.projection(x, y, width, height).convertToFormat(
+            QImage.Format_ARGB32
+        )
+        pixels = image.constBits().asstring(image.byteCount())
+    else:
+        raise RuntimeError("Only 8-bit RGBA layers can be used as a source")
+    return CanvasRegion(pixels, x, y, width, height, mask)
+
+
+def _intersect(a, b):
+    """Return the intersection of two (x, y, width, height) rectangles."""
+    left, top = max(a[0], b[0]), max(a[1], b[1])
+    right = min(a[0] + a[2], b[0] + b[2])
+    bottom = min(a[1] + a[3], b[1] + b[3])
+    return left, top, max(0, right - left), max(0, bottom - top)
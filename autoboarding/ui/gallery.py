@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+from ..backend.history import GenerationHistory, HistoryEntry
+
+
+class HistoryModel(QAbstractListModel):
+    """List model over the generation history that loads rows lazily.
+
+    Only the ids of matching entries are held. Metadata and thumbnails
+    are read when a view asks for a row, which a QListView with uniform
+    item sizes only does for rows on screen, and kept in small LRU
+    caches so scrolling back doesn't hit the database again.
+    """
+
+    CACHE_SIZE = 200
+
+    def __init__(self, history: Optional[GenerationHistory], parent=None):
+        """Initialize the model.
+
+        Args:
+            history: History to show (None shows nothing)
+            parent: Parent QObject
+        """
+        super().__init__(parent)
+        self.history = history
+        self.query = ""
+        self._ids: List[int] = []
+        self._pixmaps: "OrderedDict[int, QPixmap]" = OrderedDict()
+        self._entries: "OrderedDict[int, Optional[HistoryEntry]]" = OrderedDict()
+        self.refresh()
+
+    def set_query(self, query: str) -> None:
+        """Show only entries whose prompt matches a search."""
+        self.query = query.strip()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the matching ids from the history."""
+        self.beginResetModel()
+        self._ids = self.history.ids(self.query) if self.history else []
+        self.endResetModel()
+
+    def add(self, entry_id: int) -> None:
+        """Show a newly recorded entry at the top."""
+        if self.query:
+            # Whether it matches is the search index's call
+            self.refresh()
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._ids.insert(0, entry_id)
+        self.endInsertRows()
+
+    def entry_id(self, row: int) -> Optional[int]:
+        """Return the history id shown in a row."""
+        return self._ids[row] if 0 <= row < len(self._ids) else None
+
+    def entry(self, row: int) -> Optional[HistoryEntry]:
+        """Return the metadata shown in a row, reading it once."""
+        entry_id = self.entry_id(row)
+        if entry_id is None or self.history is None:
+            return None
+        if entry_id in self._entries:
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id]
+        entry = self.history.entry(entry_id)
+        self._remember(self._entries, entry_id, entry)
+        return entry
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        if role == Qt.DecorationRole:
+            return self._thumbnail(index.row())
+        if role == Qt.ToolTipRole:
+            entry = self.entry(index.row())
+            if entry is None:
+                return None
+            seed = "random" if entry.seed < 0 else entry.seed
+            return (f"{entry.prompt}\n{entry.width}x{entry.height}, "
+                    f"seed {seed}, {entry.params.get('sampler', '')}")
+        return None
+
+    def _thumbnail(self, row: int) -> Optional[QPixmap]:
+        """Return a row's thumbnail, decoding it on first display."""
+        entry_id = self.entry_id(row)
+        if entry_id is None or self.history is None:
+            return None
+        pixmap = self._pixmaps.get(entry_id)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(entry_id)
+            return pixmap
+        data = self.history.thumbnail(entry_id)
+        if data is None:
+            return None
+        pixmap = QPixmap.fromImage(QImage.fromData(data, "JPEG"))
+        self._remember(self._pixmaps, entry_id, pixmap)
+        return pixmap
+
+    def _remember(self, cache: OrderedDict, key: int, value: Any) -> None:
+        """Add to an LRU cache, dropping the oldest beyond CACHE_SIZE."""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
@@ -0,0 +1 @@
+"""Benchmarks for the Autoboarding request path; see run.py."""
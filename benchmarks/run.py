@@ -0,0 +1,392 @@
+"""Benchmarks for the Autoboarding request path.
+
+Measures end-to-end latency and throughput of StableDiffusionAPI against
+local fake backends (see server.py), plus microbenchmarks of the steps
+that run for every image: decoding the response, converting the image
+for Qt and, when run inside Krita, inserting it as a layer.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+
+import argparse
+import base64
+import dataclasses
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load_plugin() -> None:
+    """Make the plugin's modules importable outside Krita.
+
+    The package __init__ imports krita to register the plugin; the
+    backend and imaging modules don't need it, so the package is
+    registered without running it. Vendored dependencies are put on
+    the path as plugin.py does.
+    """
+    if "autoboarding" not in sys.modules:
+        package = types.ModuleType("autoboarding")
+        package.__path__ = [str(ROOT / "autoboarding")]
+        sys.modules["autoboarding"] = package
+    sys.path.append(str(ROOT / "autoboarding" / "external"))
+
+
+_load_plugin()
+
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer  # noqa: E402
+
+from autoboarding.backend.api import StableDiffusionAPI  # noqa: E402
+from autoboarding.backend.streaming import iter_base64_array  # noqa: E402
+from autoboarding.config import Config  # noqa: E402
+from autoboarding.imaging import decode_image, prepare_image  # noqa: E402
+
+from .server import noise_png, serve  # noqa: E402
+
+# Metrics compared by --compare, and whether higher is better
+_COMPARED = {
+    "images_per_minute": True,
+    "mean_ms": False,
+    "p95_ms": False,
+    "mb_per_second": True,
+}
+# Changes smaller than this many percent are reported as noise
+_NOISE_PERCENT = 5.0
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    """Return mean/median/p95/min of durations in milliseconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+    }
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    """Call fn repeat times and return each call's duration in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _config(**overrides) -> Config:
+    """Return a Config with default values, ignoring the user's saved file."""
+    config = Config()
+    for item in dataclasses.fields(Config):
+        if item.default is not dataclasses.MISSING:
+            setattr(config, item.name, item.default)
+        else:
+            setattr(config, item.name, item.default_factory())
+    config.cache_enabled = False  # Every request must reach the backend
+    config.health_interval = 0
+    # Keep benchmark images out of the user's gallery and metrics log, and
+    # history writes out of the timed path
+    config.history_enabled = False
+    config.metrics_log = False
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+class _Waiter:
+    """Runs the Qt event loop until one of the given signals fires."""
+
+    def __init__(self, *signals):
+        self.loop = QEventLoop()
+        self.error: Optional[str] = None
+        for signal in signals:
+            signal.connect(self.loop.quit)
+
+    def fail(self, error: str) -> None:
+        """Record a failure and stop waiting."""
+        self.error = error
+        self.loop.quit()
+
+    def wait(self, timeout: float) -> None:
+        """Block until a signal fires; raise on failure or timeout."""
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self.fail(f"Timed out after {timeout}s"))
+        timer.start(int(timeout * 1000))
+        self.loop.exec_()
+        timer.stop()
+        if self.error:
+            raise RuntimeError(self.error)
+
+
+def bench_single(args) -> Dict[str, Any]:
+    """Sequential single-image generations on one backend."""
+    servers = serve(args.backend, 1, **_server_options(args))
+    api = StableDiffusionAPI(_config(
+        backend_urls=[s.url for s in servers], backend_type=args.backend,
+        live_preview=args.live_preview
+    ))
+    try:
+        samples = []
+        for i in range(args.jobs):
+            waiter = _Waiter(api.generation_complete)
+            api.generation_failed.connect(waiter.fail)
+            started = time.perf_counter()
+            api.generate_image(f"benchmark {i}", seed=i)
+            waiter.wait(args.timeout)
+            samples.append(time.perf_counter() - started)
+            api.generation_failed.disconnect(waiter.fail)
+        result = _summary(samples)
+        result["images"] = len(samples)
+        result["images_per_minute"] = round(60 * len(samples) / sum(samples), 2)
+        return result
+    finally:
+        api.shutdown()
+        for server in servers:
+            server.close()
+
+
+def _run_batch(args, backends: int, max_batch_size: int) -> Dict[str, Any]:
+    """Generate one storyboard batch and report its throughput."""
+    servers = serve(args.backend, backends, **_server_options(args))
+    api = StableDiffusionAPI(_config(
+        backend_urls=[s.url for s in servers], backend_type=args.backend,
+        live_preview=args.live_preview, max_batch_size=max_batch_size,
+        max_retries=max(2, backends)
+    ))
+    try:
+        frames = []
+        waiter = _Waiter(api.batch_complete)
+        api.generation_failed.connect(waiter.fail)
+        api.frame_complete.connect(lambda index, image: frames.append(index))
+        requests = [
+            api.make_request("benchmark", seed=1000 + i, frame=i)
+            for i in range(args.frames)
+        ]
+        started = time.perf_counter()
+        api.generate_batch(requests)
+        waiter.wait(args.timeout)
+        elapsed = time.perf_counter() - started
+        return {
+            "images": len(frames),
+            "backends": backends,
+            "max_batch_size": max_batch_size,
+            "seconds": round(elapsed, 3),
+            "images_per_minute": round(60 * len(frames) / elapsed, 2),
+            "retries": api.pool.retries,
+            "backend_calls": [server.stats() for server in servers],
+        }
+    finally:
+        api.shutdown()
+        for server in servers:
+            server.close()
+
+
+def bench_batch(args) -> Dict[str, Any]:
+    """A storyboard batch coalesced into batched calls on one backend."""
+    return _run_batch(args, 1, args.batch_size)
+
+
+def bench_concurrent(args) -> Dict[str, Any]:
+    """A storyboard batch spread over several backends, one frame per call."""
+    return _run_batch(args, args.backends, 1)
+
+
+def bench_decode(args) -> Dict[str, Any]:
+    """Streamed decoding of a txt2img response against json.loads."""
+    png = noise_png(args.image_size)
+    encoded = base64.b64encode(png).decode("ascii")
+    body = json.dumps({
+        "images": [encoded] * args.batch_size, "parameters": {}, "info": "{}"
+    }).encode()
+    chunk = StableDiffusionAPI.STREAM_CHUNK_SIZE
+    chunks = [body[i:i + chunk] for i in range(0, len(body), chunk)]
+
+    streamed = _timed(lambda: list(iter_base64_array(chunks)), args.repeat)
+    parsed = _timed(
+        lambda: [base64.b64decode(image)
+                 for image in json.loads(b"".join(chunks))["images"]],
+        args.repeat
+    )
+    png_decode = _timed(lambda: decode_image(png), args.repeat)
+    megabytes = len(body) / (1024 * 1024)
+    result = {
+        "body_mb": round(megabytes, 3),
+        "streamed": _summary(streamed),
+        "json": _summary(parsed),
+        "png_decode": _summary(png_decode),
+    }
+    result["streamed"]["mb_per_second"] = round(
+        megabytes / statistics.mean(streamed), 2
+    )
+    result["json"]["mb_per_second"] = round(megabytes / statistics.mean(parsed), 2)
+    return result
+
+
+def bench_convert(args) -> Dict[str, Any]:
+    """PIL to BGRA buffer and preview QImage conversion of one frame."""
+    image = decode_image(noise_png(args.image_size))
+    samples = _timed(lambda: prepare_image(image, 256), args.repeat)
+    return _summary(samples)
+
+
+def bench_insert(args) -> Dict[str, Any]:
+    """Inserting a frame as a layer; only possible inside Krita."""
+    try:
+        from krita import Krita
+    except ImportError:
+        return {"skipped": "krita module not available"}
+    from autoboarding.ui.document import insert_image
+    frame = prepare_image(decode_image(noise_png(args.image_size)), 256)
+    document = Krita.instance().createDocument(
+        args.image_size, args.image_size, "benchmark", "RGBA", "U8", "", 72.0
+    )
+    try:
+        samples = _timed(lambda: insert_image(document, frame), args.repeat)
+    finally:
+        document.close()
+    return _summary(samples)
+
+
+BENCHMARKS = {
+    "single": bench_single,
+    "batch": bench_batch,
+    "concurrent": bench_concurrent,
+    "decode": bench_decode,
+    "convert": bench_convert,
+    "insert": bench_insert,
+}
+
+
+def _server_options(args) -> Dict[str, Any]:
+    """Return the FakeBackend options chosen on the command line."""
+    return {
+        "latency": args.latency,
+        "image_latency": args.image_latency,
+        "image_size": args.image_size,
+        "failure_rate": args.failure_rate,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    """Return the checked-out commit, if this is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metrics(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten the compared metrics of a results dict."""
+    found = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            found.update(_metrics(value, name + "."))
+        elif key in _COMPARED and isinstance(value, (int, float)):
+            found[name] = value
+    return found
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Describe how each compared metric changed between two runs."""
+    before = _metrics(previous["results"])
+    after = _metrics(current["results"])
+    lines = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if _COMPARED[name.rsplit(".", 1)[1]] else change < 0
+        verdict = "better" if better else "worse"
+        if abs(change) < _NOISE_PERCENT:
+            verdict = "same"
+        lines.append(f"{name:45} {old:>12.2f} -> {new:>12.2f} "
+                     f"({change:+6.1f}%, {verdict})")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the selected benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Autoboarding request path"
+    )
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS),
+                        help=f"Benchmarks to run (default: all of "
+                             f"{', '.join(BENCHMARKS)})")
+    parser.add_argument("--backend", default="automatic1111",
+                        choices=["automatic1111", "comfyui"])
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Seconds per fake generation call")
+    parser.add_argument("--image-latency", type=float, default=0.05,
+                        help="Extra seconds per generated image")
+    parser.add_argument("--image-size", type=int, default=512,
+                        help="Side of the generated images in pixels")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fraction of generation calls dropped")
+    parser.add_argument("--jobs", type=int, default=10,
+                        help="Sequential jobs in the single benchmark")
+    parser.add_argument("--frames", type=int, default=16,
+                        help="Frames in the batch benchmarks")
+    parser.add_argument("--batch-size", type=int, default=4,
+                        help="max_batch_size for the batch benchmark")
+    parser.add_argument("--backends", type=int, default=4,
+                        help="Fake backends in the concurrent benchmark")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="Repetitions of each microbenchmark")
+    parser.add_argument("--live-preview", action="store_true",
+                        help="Poll for live previews while generating")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write the JSON results here")
+    parser.add_argument("--compare", help="Earlier JSON results to compare with")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    results = {}
+    for name in args.benchmarks:
+        print(f"Running {name}...", file=sys.stderr, flush=True)
+        results[name] = BENCHMARKS[name](args)
+    del app
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "compare", "benchmarks")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print("\n".join(compare(previous, report)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
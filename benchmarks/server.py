@@ -0,0 +1,380 @@
+"""Local stand-in for an AUTOMATIC1111 or ComfyUI server.
+
+Speaks just enough of each API for StableDiffusionAPI to run its full
+request path against it: generation, progress, model listing, health
+probes and, for ComfyUI, the /ws event stream and /view downloads.
+Images are random noise PNGs, so response sizes are close to what a
+real backend sends. Generation is serialised per server like on a
+single GPU.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def noise_png(size: int, seed: int = 0) -> bytes:
+    """Return a size x size PNG of random noise (compresses like a photo)."""
+    from PIL import Image
+    data = random.Random(seed).randbytes(size * size * 3)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (size, size), data).save(
+        buffer, "PNG", compress_level=1
+    )
+    return buffer.getvalue()
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    """Build one unmasked server-to-client WebSocket frame."""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+class FakeBackend:
+    """A fake backend server running on a background thread.
+
+    Args:
+        kind: "automatic1111" or "comfyui"
+        latency: Seconds every generation call takes
+        image_latency: Extra seconds per generated image
+        image_size: Side of the returned square images in pixels
+        failure_rate: Fraction of generation calls whose connection is
+            dropped without a response, to exercise failover
+        seed: Seed for failures and image content
+    """
+
+    def __init__(self, kind: str = "automatic1111", latency: float = 0.2,
+                 image_latency: float = 0.05, image_size: int = 512,
+                 failure_rate: float = 0.0, seed: int = 0):
+        if kind not in ("automatic1111", "comfyui"):
+            raise ValueError(f"Unknown backend kind: {kind}")
+        self.kind = kind
+        self.latency = latency
+        self.image_latency = image_latency
+        self.failure_rate = failure_rate
+        self.png = noise_png(image_size, seed)
+        self.encoded = base64.b64encode(self.png).decode("ascii")
+        self.detected_map = base64.b64encode(
+            noise_png(image_size, seed + 1)
+        ).decode("ascii")
+        self.calls = 0
+        self.images = 0
+        self.failures = 0
+        self.previews = 0  # Progress answers that carried a preview image
+        self.interrupts = 0
+        self._interrupted = threading.Event()
+        self._random = random.Random(seed)
+        self._gpu = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._clients: Dict[str, Tuple[Any, threading.Lock]] = {}
+        self._queue: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._queue_cond = threading.Condition()
+        self._stopped = False
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        if kind == "comfyui":
+            threading.Thread(target=self._run_queue, daemon=True).start()
+
+    def close(self) -> None:
+        """Stop serving."""
+        self._stopped = True
+        with self._queue_cond:
+            self._queue_cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls, images and dropped calls were served."""
+        with self._stats_lock:
+            return {"calls": self.calls, "images": self.images,
+                    "failures": self.failures}
+
+    def __enter__(self) -> "FakeBackend":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _should_fail(self) -> bool:
+        """Decide whether to drop the current generation call."""
+        with self._stats_lock:
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+            return fail
+
+    def _generate(self, count: int) -> None:
+        """Occupy the fake GPU for one call producing count images.
+
+        An interrupt ends the current call early, like on a real backend.
+        """
+        with self._gpu:
+            self._interrupted.clear()
+            self._interrupted.wait(self.latency + self.image_latency * count)
+        with self._stats_lock:
+            self.calls += 1
+            self.images += count
+
+    def _interrupt(self) -> None:
+        """Cut the running generation short."""
+        with self._stats_lock:
+            self.interrupts += 1
+        self._interrupted.set()
+
+    def _run_queue(self) -> None:
+        """Execute queued ComfyUI prompts one at a time, like ComfyUI."""
+        while True:
+            with self._queue_cond:
+                while not self._queue and not self._stopped:
+                    self._queue_cond.wait()
+                if self._stopped:
+                    return
+                client_id, prompt_id, graph = self._queue.pop(0)
+            self._execute(client_id, prompt_id, graph)
+
+    def _execute(self, client_id: str, prompt_id: str,
+                 graph: Dict[str, Any]) -> None:
+        """Run one ComfyUI prompt and report it over the client's socket."""
+        def send(event: str, data: Dict[str, Any]) -> None:
+            client = self._clients.get(client_id)
+            if client is None:
+                return
+            stream, lock = client
+            try:
+                with lock:
+                    stream.write(_ws_frame(0x1, json.dumps(
+                        {"type": event, "data": data}
+                    ).encode()))
+                    stream.flush()
+            except OSError:
+                self._clients.pop(client_id, None)
+
+        count = 1
+        outputs = []
+        for node_id, node in graph.items():
+            if node.get("class_type") == "EmptyLatentImage":
+                count = int(node["inputs"].get("batch_size", 1))
+            if node.get("class_type") == "SaveImage":
+                outputs.append(node_id)
+        send("execution_start", {"prompt_id": prompt_id})
+        self._generate(count)
+        send("progress", {"value": 1, "max": 1, "prompt_id": prompt_id})
+        for node_id in outputs:
+            send("executed", {"node": node_id, "prompt_id": prompt_id, "output": {
+                "images": [{"filename": f"{prompt_id}_{i}.png", "subfolder": "",
+                            "type": "output"} for i in range(count)]
+            }})
+        send("executing", {"node": None, "prompt_id": prompt_id})
+
+    def _handler(self):
+        """Build the request handler class bound to this backend."""
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def send(self, body: Any, status: int = 200,
+                     content_type: str = "application/json") -> None:
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def drop(self) -> None:
+                """Close the connection without answering."""
+                self.close_connection = True
+
+            def body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                if backend.kind == "automatic1111":
+                    self.get_automatic1111(parts.path, query)
+                else:
+                    self.get_comfyui(parts.path, query)
+
+            def do_POST(self) -> None:
+                path = urlsplit(self.path).path
+                data = self.body()
+                if backend.kind == "automatic1111":
+                    self.post_automatic1111(path, data)
+                else:
+                    self.post_comfyui(path, data)
+
+            def get_automatic1111(self, path: str,
+                                  query: Dict[str, List[str]]) -> None:
+                if path == "/sdapi/v1/progress":
+                    # The live preview is only sent when asked for
+                    preview = query.get("skip_current_image") == ["false"]
+                    with backend._stats_lock:
+                        backend.previews += preview
+                    self.send({"progress": 0.5, "eta_relative": 1.0,
+                               "current_image": backend.encoded if preview else None})
+                elif path == "/sdapi/v1/sd-models":
+                    self.send([{"title": "bench.safetensors [0000]",
+                                "model_name": "bench"}])
+                elif path == "/sdapi/v1/samplers":
+                    self.send([{"name": "Euler a"}, {"name": "Euler"}])
+                elif path == "/sdapi/v1/loras":
+                    self.send([])
+                else:
+                    self.send({"detail": "Not Found"}, 404)
+
+            def post_automatic1111(self, path: str, data: bytes) -> None:
+                if path == "/sdapi/v1/interrupt":
+                    backend._interrupt()
+                if path in ("/sdapi/v1/interrupt", "/sdapi/v1/options"):
+                    self.send({})
+                    return
+                if path not in ("/sdapi/v1/txt2img", "/sdapi/v1/img2img"):
+                    self.send({"detail": "Not Found"}, 404)
+                    return
+                if backend._should_fail():
+                    self.drop()
+                    return
+                payload = json.loads(data)
+                count = payload.get("batch_size", 1) * payload.get("n_iter", 1)
+                backend._generate(count)
+                # Multi-image calls lead with a grid, like the real thing,
+                # and ControlNet appends one detected map per unit
+                units = payload.get("alwayson_scripts", {}).get(
+                    "controlnet", {}).get("args", [])
+                images = [backend.encoded] * (count + (1 if count > 1 else 0))
+                images += [backend.detected_map] * len(units)
+                self.send({"images": images, "parameters": payload, "info": "{}"})
+
+            def get_comfyui(self, path: str, query: Dict[str, List[str]]) -> None:
+                if path == "/ws":
+                    self.websocket(query["clientId"][0])
+                elif path == "/system_stats":
+                    self.send({"system": {}, "devices": []})
+                elif path.startswith("/object_info/"):
+                    node_class = path.rsplit("/", 1)[1]
+                    inputs = {
+                        "CheckpointLoaderSimple": ("ckpt_name", ["bench.safetensors"]),
+                        "KSampler": ("sampler_name", ["euler", "euler_ancestral"]),
+                        "LoraLoader": ("lora_name", []),
+                    }
+                    if node_class not in inputs:
+                        self.send({}, 404)
+                        return
+                    name, values = inputs[node_class]
+                    self.send({node_class: {"input": {"required": {name: [values]}}}})
+                elif path == "/view":
+                    if query.get("type") == ["input"]:
+                        self.send({}, 404)
+                    else:
+                        self.send(backend.png, content_type="image/png")
+                else:
+                    self.send({}, 404)
+
+            def post_comfyui(self, path: str, data: bytes) -> None:
+                if path == "/interrupt":
+                    backend._interrupt()
+                if path in ("/interrupt", "/queue"):
+                    self.send({})
+                elif path == "/upload/image":
+                    self.send({"name": "upload.png", "subfolder": "", "type": "input"})
+                elif path == "/prompt":
+                    if backend._should_fail():
+                        self.drop()
+                        return
+                    payload = json.loads(data)
+                    prompt_id = uuid.uuid4().hex
+                    with backend._queue_cond:
+                        backend._queue.append(
+                            (payload["client_id"], prompt_id, payload["prompt"])
+                        )
+                        backend._queue_cond.notify()
+                    self.send({"prompt_id": prompt_id, "number": 0,
+                               "node_errors": {}})
+                else:
+                    self.send({}, 404)
+
+            def websocket(self, client_id: str) -> None:
+                key = self.headers["Sec-WebSocket-Key"].encode()
+                accept = base64.b64encode(hashlib.sha1(key + _WS_GUID).digest())
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept.decode())
+                self.end_headers()
+                self.wfile.flush()
+                backend._clients[client_id] = (self.wfile, threading.Lock())
+                try:
+                    # Client frames (close, pongs) are read and ignored
+                    while self.rfile.read(1):
+                        pass
+                except OSError:
+                    pass
+                backend._clients.pop(client_id, None)
+                self.close_connection = True
+
+        return Handler
+
+
+def serve(kind: str, count: int = 1, **options) -> List[FakeBackend]:
+    """Start several identical fake backends.
+
+    Args:
+        kind: "automatic1111" or "comfyui"
+        count: Number of servers
+        **options: Passed on to FakeBackend
+
+    Returns:
+        The running servers; close() each when done
+    """
+    seed = options.pop("seed", 0)
+    return [FakeBackend(kind, seed=seed + i, **options) for i in range(count)]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run a fake backend in the foreground, e.g. for manual testing."""
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", default="automatic1111",
+                        choices=["automatic1111", "comfyui"])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--image-latency", type=float, default=0.05)
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    backend = FakeBackend(args.kind, args.latency, args.image_latency,
+                          args.image_size, args.failure_rate)
+    print(f"Fake {args.kind} server listening on {backend.url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Test setup: make the plugin's modules importable outside Krita."""
+
+import dataclasses
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The package __init__ imports krita to register the plugin; the modules
+# under test don't need it, so the package is registered without running it
+if "autoboarding" not in sys.modules:
+    package = types.ModuleType("autoboarding")
+    package.__path__ = [str(ROOT / "autoboarding")]
+    sys.modules["autoboarding"] = package
+sys.path.append(str(ROOT / "autoboarding" / "external"))
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))  # For the fake servers in benchmarks/
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Return a Config with default values, kept away from the user's files."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    from autoboarding.config import Config
+    config = Config()
+    for item in dataclasses.fields(Config):
+        if item.default is not dataclasses.MISSING:
+            setattr(config, item.name, item.default)
+        else:
+            setattr(config, item.name, item.default_factory())
+    config.health_interval = 0
+    config.cache_enabled = False
+    config.history_enabled = False
+    config.metrics_log = False
+    return config
+
+
+@pytest.fixture
+def make_api(config):
+    """Return a factory for StableDiffusionAPIs on fake backend servers."""
+    from autoboarding.backend.api import StableDiffusionAPI
+    from benchmarks.server import serve
+
+    created = []
+
+    def make(kind="automatic1111", count=1, **options):
+        options.setdefault("latency", 0.01)
+        options.setdefault("image_latency", 0.0)
+        options.setdefault("image_size", 64)
+        servers = serve(kind, count, **options)
+        config.backend_type = kind
+        config.backend_urls = [server.url for server in servers]
+        api = StableDiffusionAPI(config)
+        created.append((api, servers))
+        return api, servers
+
+    yield make
+    for api, servers in created:
+        api.shutdown()
+        for server in servers:
+            server.close()
@@ -0,0 +1,54 @@
+from autoboarding.backend.batch import GenerationRequest, coalesce
+
+
+def frames(count, seed=-1, prompt="board", **fields):
+    return [GenerationRequest(prompt, seed=seed + i if seed >= 0 else -1,
+                              frame=i, **fields)
+            for i in range(count)]
+
+
+def shape(calls):
+    return [(call.batch_size, call.n_iter) for call in calls]
+
+
+def test_every_request_is_covered_exactly_once():
+    requests = frames(7) + frames(3, prompt="other") + frames(5, seed=10)
+    calls = coalesce(requests, max_batch_size=2)
+
+    covered = [request for call in calls for request in call.requests]
+    assert sorted(covered, key=id) == sorted(requests, key=id)
+    for call in calls:
+        assert len(call.requests) == call.image_count
+
+
+def test_random_seed_runs_split_by_max_batch_size():
+    assert shape(coalesce(frames(12), max_batch_size=2)) == [(2, 6)]
+    assert shape(coalesce(frames(7), max_batch_size=3)) == [(3, 2), (1, 1)]
+    assert shape(coalesce(frames(3), max_batch_size=0)) == [(1, 3)]
+
+
+def test_n_iter_is_capped_for_backends_that_need_it():
+    assert shape(coalesce(frames(7), max_batch_size=3, max_n_iter=1)) == [
+        (3, 1), (3, 1), (1, 1)
+    ]
+    assert shape(coalesce(frames(9), max_batch_size=2, max_n_iter=3)) == [
+        (2, 3), (2, 1), (1, 1)
+    ]
+
+
+def test_fixed_seeds_only_coalesce_when_consecutive():
+    requests = frames(3, seed=100) + frames(2, seed=500)
+    calls = coalesce(requests, max_batch_size=4)
+
+    assert [[r.seed for r in call.requests] for call in calls] == [
+        [100, 101, 102], [500, 501]
+    ]
+
+
+def test_different_parameters_never_share_a_call():
+    requests = [GenerationRequest("a"), GenerationRequest("a", steps=30),
+                GenerationRequest("a", checkpoint="x"), GenerationRequest("a")]
+    calls = coalesce(requests, max_batch_size=4)
+
+    assert [len(call.requests) for call in calls] == [2, 1, 1]
+    assert calls[0].requests == [requests[0], requests[3]]
@@ -0,0 +1,114 @@
+import random
+import threading
+
+from PIL import Image
+
+from autoboarding.backend.cache import GenerationCache
+
+
+def noise(seed: int, size: int = 32) -> Image.Image:
+    data = random.Random(seed).randbytes(size * size * 3)
+    return Image.frombytes("RGB", (size, size), data)
+
+
+def test_make_key_ignores_key_order():
+    assert (GenerationCache.make_key({"a": 1, "b": [2, 3]})
+            == GenerationCache.make_key({"b": [2, 3], "a": 1}))
+    assert (GenerationCache.make_key({"a": 1})
+            != GenerationCache.make_key({"a": 2}))
+
+
+def test_round_trip_and_statistics(tmp_path):
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    image = noise(0)
+
+    assert cache.get("k") is None
+    cache.put("k", image, {"seed": 1})
+
+    assert cache.get("k").tobytes() == image.tobytes()
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    cache.put("probe", noise(0))
+    size = cache.stats()["bytes"]
+    cache = GenerationCache(tmp_path / "lru", int(size * 2.5))
+
+    cache.put("a", noise(1))
+    cache.put("b", noise(2))
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("c", noise(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert len(list((tmp_path / "lru").glob("*/*.png"))) == 2
+
+
+def test_index_survives_a_restart_in_lru_order(tmp_path):
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    cache.put("a", noise(1))
+    cache.put("b", noise(2))
+    cache.get("a")
+    cache.flush()
+
+    reopened = GenerationCache(tmp_path, 10 * 1024 * 1024)
+
+    assert list(reopened._entries) == ["b", "a"]
+    assert reopened.get("b") is not None
+
+
+def test_missing_files_and_corrupt_index_are_dropped(tmp_path):
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    cache.put("a", noise(1))
+    for path in tmp_path.glob("*/*.png"):
+        path.unlink()
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+    (tmp_path / GenerationCache.INDEX_NAME).write_text("not json")
+    assert GenerationCache(tmp_path, 1024).stats()["entries"] == 0
+
+
+def test_corrupt_files_are_dropped(tmp_path):
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    cache.put("a", noise(1))
+    for path in tmp_path.glob("*/*.png"):
+        path.write_bytes(b"not a png")
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["misses"] == 1
+
+
+def test_images_are_decoded_without_holding_the_lock(tmp_path, monkeypatch):
+    from PIL import Image
+
+    cache = GenerationCache(tmp_path, 10 * 1024 * 1024)
+    cache.put("a", noise(1))
+    cache.put("b", noise(2))
+    decoding, release = threading.Event(), threading.Event()
+    open_image = Image.open
+
+    def slow_open(path, *args):
+        if path.name.startswith("a"):
+            decoding.set()
+            release.wait(5)
+        return open_image(path, *args)
+
+    monkeypatch.setattr(Image, "open", slow_open)
+    results = {}
+    reader = threading.Thread(target=lambda: results.update(a=cache.get("a")))
+    reader.start()
+    try:
+        assert decoding.wait(5)
+        # Another worker's lookup isn't held up by the slow read
+        other = threading.Thread(target=lambda: results.update(b=cache.get("b")))
+        other.start()
+        other.join(2)
+        assert not other.is_alive() and results["b"] is not None
+    finally:
+        release.set()
+        reader.join(5)
+    assert results["a"] is not None
+    assert cache.stats()["hits"] == 2
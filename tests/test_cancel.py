@@ -0,0 +1,71 @@
+import time
+
+from PyQt5.QtCore import Qt
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def collect(signal):
+    """Record a signal's emissions straight from the worker threads."""
+    emitted = []
+    signal.connect(lambda *args: emitted.append(args), Qt.DirectConnection)
+    return emitted
+
+
+def running_on_node(api, job):
+    return lambda: bool(api.pool.nodes_for(job.job_id))
+
+
+def test_changed_request_supersedes_the_running_one(make_api):
+    api, (server,) = make_api(latency=2.0)
+    completed = collect(api.generation_complete)
+
+    first = api.generate_image("castle")
+    assert wait_until(running_on_node(api, first))
+    second = api.generate_image("harbour")
+
+    assert first.is_cancelled() and not second.is_cancelled()
+    assert second.wait(5) and first.wait(5)
+    # The first call was cut short and its result thrown away
+    assert wait_until(lambda: server.interrupts == 1)
+    assert len(completed) == 1
+    assert server.stats()["calls"] == 2
+
+
+def test_identical_request_is_ignored_while_running(make_api):
+    api, (server,) = make_api(latency=0.3)
+    completed = collect(api.generation_complete)
+
+    first = api.generate_image("castle", seed=3)
+    second = api.generate_image("castle", seed=3)
+
+    assert second is first
+    assert first.wait(5) and not first.is_cancelled()
+    assert len(completed) == 1 and server.stats()["calls"] == 1
+    # Once it is done, the same request runs again
+    assert api.generate_image("castle", seed=3) is not first
+
+
+def test_cancel_stops_every_running_generation(config, make_api):
+    config.supersede_running = False
+    api, servers = make_api(count=2, latency=2.0)
+    completed = collect(api.generation_complete)
+    cancelled = collect(api.generation_cancelled)
+
+    jobs = [api.generate_image("castle"), api.generate_image("harbour")]
+    assert wait_until(lambda: all(running_on_node(api, job)() for job in jobs))
+    assert not any(job.is_cancelled() for job in jobs)
+
+    api.cancel()
+
+    assert all(job.is_cancelled() for job in jobs)
+    assert all(job.wait(5) for job in jobs)
+    assert wait_until(lambda: [s.interrupts for s in servers] == [1, 1])
+    assert completed == [] and cancelled == [()]
+    api.cancel()  # Nothing left to cancel
+    assert cancelled == [()]
@@ -0,0 +1,125 @@
+import json
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from autoboarding.config import _coerce
+
+
+@pytest.mark.parametrize("value,hint,expected", [
+    (3, int, 3),
+    (3, float, 3.0),
+    (2.5, float, 2.5),
+    (True, bool, True),
+    ("x", str, "x"),
+    (["a", "b"], List[str], ["a", "b"]),
+    ({"p": {"width": 1}}, Dict[str, Dict[str, Any]], {"p": {"width": 1}}),
+])
+def test_coerce_accepts_matching_values(value, hint, expected):
+    result = _coerce(value, hint)
+    assert result == expected and type(result) is type(expected)
+
+
+@pytest.mark.parametrize("value,hint", [
+    ("30", int),
+    (True, int),  # bool is an int subclass, but no valid count
+    (1, bool),
+    (1.5, int),
+    (None, str),
+    (["a", 3], List[str]),
+    ("a", List[str]),
+    ({"p": 1}, Dict[str, Dict[str, Any]]),
+])
+def test_coerce_rejects_wrong_types(value, hint):
+    with pytest.raises(TypeError):
+        _coerce(value, hint)
+
+
+def write_config(config, data):
+    config.config_path.parent.mkdir(parents=True, exist_ok=True)
+    config.config_path.write_text(json.dumps(data))
+
+
+def test_load_skips_invalid_settings(config):
+    write_config(config, {
+        "default_width": 768,
+        "default_steps": "30",
+        "default_cfg_scale": 5,
+        "backend_type": "other",
+        "bogus": 1,
+        "profiles": {"show": {"width": 1024, "sampler": "Euler", "junk": 1}},
+        "active_profile": "missing",
+    })
+
+    config.load()
+
+    assert config.default_width == 768
+    assert config.default_steps == 20
+    assert config.default_cfg_scale == 5.0
+    assert config.backend_type == "automatic1111"
+    assert config.profiles == {"show": {"width": 1024, "sampler": "Euler"}}
+    assert config.active_profile == ""
+
+
+def test_load_survives_a_corrupt_file(config):
+    config.config_path.parent.mkdir(parents=True, exist_ok=True)
+    config.config_path.write_text('{"default_width": 7')
+
+    config.load()
+
+    assert config.default_width == 512
+
+
+def test_saves_are_debounced_and_written_atomically(config):
+    config.save_delay = 0.2
+    started = time.perf_counter()
+    for width in range(64, 164):
+        config.last_settings = {"width": width}
+        config.save()
+    assert time.perf_counter() - started < 0.5
+    assert not config.config_path.exists()
+
+    deadline = time.monotonic() + 3
+    while not config.config_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.1)
+
+    data = json.loads(config.config_path.read_text())
+    assert data["last_settings"] == {"width": 163}
+    assert data["default_width"] == 512
+    # Only the config file remains; the temporary file was renamed over it
+    assert [p.name for p in config.config_path.parent.iterdir()] == [
+        config.config_path.name
+    ]
+
+
+def test_flush_writes_pending_changes_now(config):
+    config.save_delay = 60
+    config.default_steps = 42
+    config.save()
+
+    config.flush()
+
+    assert json.loads(config.config_path.read_text())["default_steps"] == 42
+
+
+def test_profiles_round_trip(config):
+    config.save_profile(" show A ", {"width": 1024, "cfg_scale": 6})
+    config.save_profile("show B", {"steps": 12})
+    assert config.active_profile == "show B"
+
+    assert config.use_profile("show A") == {"width": 1024, "cfg_scale": 6.0}
+    config.delete_profile("show B")
+    config.flush()
+    config.profiles = {}
+    config.load()
+
+    assert config.profiles == {"show A": {"width": 1024, "cfg_scale": 6.0}}
+    assert config.active_profile == "show A"
+    with pytest.raises(TypeError):
+        config.save_profile("bad", {"width": "wide"})
+    with pytest.raises(ValueError):
+        config.save_profile("  ", {})
+    with pytest.raises(KeyError):
+        config.use_profile("missing")
@@ -0,0 +1,51 @@
+import io
+
+import pytest
+from PIL import Image
+
+from autoboarding.backend.batch import coalesce
+from autoboarding.backend.references import ReferenceImage
+from benchmarks.server import noise_png
+
+
+def test_comfyui_random_seed_frames_respect_max_batch_size(make_api):
+    # One prompt per n_iter, each with a latent of batch_size images
+    api, (server,) = make_api("comfyui")
+    requests = [api.make_request("board", seed=-1, frame=i) for i in range(12)]
+    (call,) = coalesce(requests, max_batch_size=2)
+    node = api.pool.nodes[0]
+
+    images = api._generate_on(node, call)
+
+    assert len(images) == 12
+    assert server.stats() == {"calls": 6, "images": 12, "failures": 0}
+
+
+def test_fixed_seed_frames_are_queued_one_per_prompt(make_api):
+    api, (server,) = make_api("comfyui")
+    requests = [api.make_request("board", seed=100 + i, frame=i)
+                for i in range(3)]
+    (call,) = coalesce(requests, max_batch_size=4)
+
+    images = api._generate_on(api.pool.nodes[0], call)
+
+    assert len(images) == 3
+    assert server.stats()["calls"] == 3
+
+
+@pytest.mark.parametrize("frames", [1, 3])
+def test_controlnet_detected_maps_are_not_taken_for_frames(make_api, tmp_path,
+                                                          frames):
+    # A1111 appends one detected map per unit after the frames
+    api, (server,) = make_api("automatic1111")
+    pose = tmp_path / "pose.png"
+    pose.write_bytes(noise_png(8, 7))
+    references = (ReferenceImage(str(pose)), ReferenceImage(str(pose)))
+    requests = [api.make_request("board", frame=i, references=references)
+                for i in range(frames)]
+    (call,) = coalesce(requests, max_batch_size=4)
+
+    images = api._generate_on(api.pool.nodes[0], call)
+
+    frame = Image.open(io.BytesIO(server.png)).tobytes()
+    assert [image.tobytes() == frame for image in images] == [True] * frames
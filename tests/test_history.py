@@ -0,0 +1,79 @@
+import pytest
+from PIL import Image
+
+from autoboarding.backend.history import GenerationHistory
+
+
+def noise(size: int, seed: int) -> Image.Image:
+    """Return an image that doesn't compress, so file sizes are predictable."""
+    import random
+    data = random.Random(seed).randbytes(size * size * 3)
+    return Image.frombytes("RGB", (size, size), data)
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = GenerationHistory(tmp_path / "history")
+    yield history
+    history.close()
+
+
+def test_entries_are_searchable_by_prompt_prefix(history):
+    castle = history.add(noise(16, 0), "a red castle at dusk", "", 3,
+                         {"steps": 20})
+    sea = history.add(noise(16, 1), "blue sea", "castle", -1, {})
+
+    assert history.ids() == [sea, castle]
+    assert history.ids("cast") == [castle]  # Negative prompts aren't searched
+    assert history.ids("RED dusk") == [castle]
+    assert history.ids('"quoted" OR') == []
+    entry = history.entry(castle)
+    assert (entry.prompt, entry.seed, entry.params) == (
+        "a red castle at dusk", 3, {"steps": 20})
+    assert history.image(castle).size == (16, 16)
+    assert history.recent_prompts(5) == ["blue sea", "a red castle at dusk"]
+
+
+def test_like_fallback_matches_substrings(history):
+    history.full_text = False
+    entry_id = history.add(noise(16, 0), "100% cat_ears", "", 1, {})
+    history.add(noise(16, 1), "dog", "", 1, {})
+
+    assert history.ids("cat_") == [entry_id]
+    assert history.ids("100%") == [entry_id]
+    assert history.ids("_") == [entry_id]
+
+
+def test_oldest_entries_beyond_max_entries_are_deleted(tmp_path):
+    history = GenerationHistory(tmp_path, max_entries=3)
+    ids = [history.add(noise(8, i), f"frame {i}", "", i, {}) for i in range(5)]
+    files = list(tmp_path.glob("*/*.png"))
+    history.close()
+
+    history = GenerationHistory(tmp_path, max_entries=3)
+    assert history.ids() == ids[:1:-1]
+    assert len(files) == 3
+    assert history.entry(ids[0]) is None
+    history.close()
+
+
+def test_oldest_entries_beyond_max_bytes_are_deleted(tmp_path):
+    history = GenerationHistory(tmp_path)
+    first = history.add(noise(64, 0), "first", "", 1, {})
+    size = history.total_bytes()
+    history.max_bytes = int(size * 2.5)
+
+    ids = [first] + [history.add(noise(64, i), "more", "", 1, {})
+                     for i in range(1, 5)]
+
+    assert history.ids() == ids[:2:-1]
+    assert history.total_bytes() <= history.max_bytes
+    assert len(list(tmp_path.glob("*/*.png"))) == 2
+
+
+def test_newest_entry_is_kept_even_if_larger_than_the_limit(tmp_path):
+    history = GenerationHistory(tmp_path, max_bytes=1)
+    history.add(noise(32, 0), "old", "", 1, {})
+    newest = history.add(noise(32, 1), "new", "", 1, {})
+
+    assert history.ids() == [newest]
@@ -0,0 +1,101 @@
+import io
+
+import pytest
+from PIL import Image
+
+from autoboarding.imaging import (
+    CanvasRegion, encode_init_image, fit_resolution, paste_into_region,
+    prepare_image, to_bgra
+)
+
+
+def test_to_bgra_swaps_red_and_blue_and_keeps_alpha():
+    assert to_bgra(Image.new("RGB", (1, 1), (10, 20, 30))) == bytes(
+        [30, 20, 10, 255])
+    assert to_bgra(Image.new("RGBA", (1, 1), (10, 20, 30, 40))) == bytes(
+        [30, 20, 10, 40])
+    assert to_bgra(Image.new("L", (2, 1), 7)) == bytes([7, 7, 7, 255] * 2)
+
+
+def test_prepare_image_fills_the_buffer_and_a_downsampled_preview():
+    image = Image.new("RGB", (1000, 500), (10, 20, 30))
+
+    frame = prepare_image(image, 256)
+
+    assert (frame.width, frame.height) == (1000, 500)
+    assert len(frame.pixels) == 1000 * 500 * 4
+    assert frame.pixels[:4] == bytes([30, 20, 10, 255])
+    assert (frame.preview.width(), frame.preview.height()) == (256, 128)
+    assert frame.preview.pixelColor(128, 64).getRgb() == (10, 20, 30, 255)
+    assert (frame.x, frame.y) == (0, 0)
+
+
+def test_small_images_are_previewed_at_full_size():
+    frame = prepare_image(Image.new("RGB", (40, 30), (200, 100, 50)), 256)
+
+    assert (frame.preview.width(), frame.preview.height()) == (40, 30)
+    assert frame.preview.pixelColor(39, 29).getRgb() == (200, 100, 50, 255)
+
+
+@pytest.mark.parametrize("width,height", [(333, 217), (1001, 77), (8, 8)])
+def test_fit_resolution_keeps_area_and_aspect_in_multiples_of_8(width, height):
+    fitted = fit_resolution(width, height, 512, 512)
+
+    assert all(side % 8 == 0 and side >= 64 for side in fitted)
+    assert fitted[0] * fitted[1] == pytest.approx(512 * 512, rel=0.1)
+    if min(fitted) > 64:
+        assert fitted[0] / fitted[1] == pytest.approx(width / height, rel=0.05)
+
+
+def selection(width=333, height=217):
+    """Return a region: left half red, right half clear, top half selected."""
+    row = (bytes([0, 0, 255, 255]) * (width // 2)
+           + bytes([0, 0, 0, 0]) * (width - width // 2))
+    mask = bytes([255]) * (width * (height // 2)) + bytes(
+        width * (height - height // 2))
+    return CanvasRegion(row * height, 40, 24, width, height, mask)
+
+
+def test_init_image_is_flattened_onto_white_and_scaled():
+    region = selection()
+    width, height = fit_resolution(region.width, region.height, 512, 512)
+
+    image_png, mask_png = encode_init_image(region, width, height)
+
+    image = Image.open(io.BytesIO(image_png))
+    assert (image.mode, image.size) == ("RGB", (width, height))
+    assert image.getpixel((2, 2)) == (255, 0, 0)
+    assert image.getpixel((width - 3, 2)) == (255, 255, 255)
+    mask = Image.open(io.BytesIO(mask_png))
+    assert (mask.mode, mask.size) == ("L", (width, height))
+    assert mask.getpixel((2, 2)) == 255
+    assert mask.getpixel((2, height - 3)) == 0
+
+
+def test_init_image_without_a_mask_keeps_the_size():
+    region = selection()
+    region.mask = None
+
+    image_png, mask_png = encode_init_image(region, 333, 217)
+
+    assert Image.open(io.BytesIO(image_png)).size == (333, 217)
+    assert mask_png is None
+
+
+def test_result_is_pasted_back_at_the_region_through_the_mask():
+    region = selection()
+    width, height = fit_resolution(region.width, region.height, 512, 512)
+    result = Image.new("RGB", (width, height), (0, 255, 0))
+
+    frame = paste_into_region(result, region, 64)
+
+    assert (frame.x, frame.y) == (40, 24)
+    assert (frame.width, frame.height) == (333, 217)
+    assert len(frame.pixels) == 333 * 217 * 4
+
+    def pixel(x, y):
+        offset = (y * 333 + x) * 4
+        return tuple(frame.pixels[offset:offset + 4])
+
+    assert pixel(0, 0) == (0, 255, 0, 255)  # BGRA, selected
+    assert pixel(332, 216)[3] == 0  # Outside the selection
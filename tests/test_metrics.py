@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+
+from autoboarding.backend.metrics import Metrics, count, current, span
+
+
+def test_nested_spans_are_timed_separately_and_add_up():
+    metrics = Metrics()
+    timings = metrics.begin(1, "batch")
+    with span("compute"):
+        time.sleep(0.02)
+        with span("decode"):
+            time.sleep(0.02)
+    with span("decode"):
+        time.sleep(0.02)
+    count("calls")
+    count("calls")
+
+    record = metrics.finish(timings, "ok")
+
+    spans = record["spans_ms"]
+    assert spans["compute"] >= 40  # Includes the nested decode
+    assert spans["decode"] >= 40  # Both decode spans
+    assert record["total_ms"] >= spans["compute"]
+    assert record["counts"] == {"calls": 2}
+    assert current() is None
+    with span("ignored"):  # No job bound any more
+        pass
+    assert metrics.summary()["jobs"] == 1
+    assert "ignored" not in metrics.summary()["spans_ms"]
+
+
+def test_helper_threads_report_into_the_bound_job():
+    metrics = Metrics()
+    timings = metrics.begin(2, "batch")
+
+    def helper():
+        assert current() is None
+        with metrics.bind(timings):
+            with span("download"):
+                time.sleep(0.01)
+        assert current() is None
+
+    thread = threading.Thread(target=helper)
+    thread.start()
+    thread.join()
+
+    assert metrics.finish(timings, "ok")["spans_ms"]["download"] >= 10
+
+
+def test_log_is_rotated_by_size(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    metrics = Metrics(log, max_bytes=1000, backups=2)
+    for job_id in range(50):
+        metrics.finish(metrics.begin(job_id, "single"), "ok")
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["metrics.jsonl", "metrics.jsonl.1", "metrics.jsonl.2"]
+    for name in files:
+        assert (tmp_path / name).stat().st_size <= 1000
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert records[-1]["job"] == 49 and records[-1]["status"] == "ok"
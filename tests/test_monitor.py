@@ -0,0 +1,100 @@
+import threading
+import time
+
+from autoboarding.backend.monitor import HealthMonitor
+from autoboarding.backend.pool import BackendPool
+
+
+def make_monitor(probes):
+    pool = BackendPool(["http://a", "http://b"])
+    statuses = []
+    monitor = HealthMonitor(
+        pool,
+        probe=lambda node: probes.append(node.url),
+        fetch_catalog=lambda node: {"models": [node.url[-1]]},
+        on_status=statuses.append,
+        on_catalog=lambda catalog: None,
+        interval=1.0,
+    )
+    return monitor, statuses
+
+
+def test_check_probes_every_node_and_merges_catalogs():
+    probes = []
+    monitor, statuses = make_monitor(probes)
+
+    monitor.check(force=True)
+
+    assert probes == ["http://a", "http://b"]
+    assert [status["connected"] for status in statuses[-1]] == [True, True]
+    assert monitor.catalog() == {"models": ["a", "b"]}
+
+
+def test_paused_monitor_stops_probing_until_resumed():
+    probes = []
+    monitor, _ = make_monitor(probes)
+    thread = threading.Thread(target=monitor.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 2
+        while len(probes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        monitor.pause()
+        time.sleep(0.05)
+        paused_at = len(probes)
+        monitor.wake()
+        time.sleep(1.2)
+        assert len(probes) == paused_at
+
+        monitor.resume()
+        deadline = time.monotonic() + 2
+        while len(probes) == paused_at and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(probes) > paused_at
+    finally:
+        monitor.stop()
+        thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_stop_ends_a_paused_monitor():
+    monitor, _ = make_monitor([])
+    monitor.pause()
+    thread = threading.Thread(target=monitor.run)
+    thread.start()
+    monitor.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_warm_up_waits_for_nodes_busy_with_user_jobs(make_api):
+    api, servers = make_api(count=2)
+    busy = api.pool.acquire(tag="user job")
+
+    job = api.warm_up("bench")
+    deadline = time.monotonic() + 2
+    while servers[1].stats()["calls"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert servers[0].stats()["calls"] == 0
+    assert busy.model_key is None
+
+    api.pool.release(busy, tag="user job")
+    assert job.wait(2)
+    assert [server.stats()["calls"] for server in servers] == [1, 1]
+    assert all(node.in_flight == 0 for node in api.pool.nodes)
+    key = api.make_request("", checkpoint="bench").model_key()
+    assert [node.model_key for node in api.pool.nodes] == [key, key]
+
+
+def test_cancelled_warm_up_stops_waiting_for_a_busy_node(make_api):
+    api, (server,) = make_api()
+    busy = api.pool.acquire()
+
+    first = api.warm_up("a")
+    api.warm_up("b")  # Supersedes the first
+
+    assert first.wait(2)
+    api.pool.release(busy)
+    api.engine.wait(2)
+    assert server.stats()["calls"] == 1
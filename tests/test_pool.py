@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from autoboarding.backend.batch import coalesce
+from autoboarding.backend.pool import BackendPool, NoBackendAvailable
+
+
+def give_up_after(seconds):
+    deadline = time.monotonic() + seconds
+    return lambda: time.monotonic() > deadline
+
+
+def test_jobs_go_to_the_least_loaded_then_fastest_node():
+    pool = BackendPool(["http://a", "http://b", "http://c"])
+    a, b, c = pool.nodes
+    a.latency, b.latency, c.latency = 2.0, 0.5, 1.0
+
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first, elapsed=0.1)
+
+    assert (first, second) == (b, c)
+    assert pool.acquire() is b  # Free again and now even faster
+    assert pool.acquire() is a
+
+
+def test_failed_node_is_skipped_for_its_backoff():
+    pool = BackendPool(["http://a", "http://b"], backoff=0.3)
+    a, b = pool.nodes
+    pool.release(pool.acquire(), error=ConnectionError("refused"))
+
+    busy = pool.acquire()
+    assert busy is b
+    with pytest.raises(NoBackendAvailable):
+        pool.acquire(cancelled=give_up_after(0.1))
+
+    time.sleep(0.25)
+    assert pool.acquire() is a  # Tried again once the backoff is over
+    pool.release(a, error=ConnectionError("refused"))
+    assert a.retry_at - time.monotonic() > 0.5  # Doubled after a repeat
+
+
+def test_frames_fail_over_from_a_dropping_backend(config, make_api):
+    config.retry_backoff = 5.0
+    api, servers = make_api(count=2, latency=0.05)
+    servers[0].failure_rate = 1.0  # Every call's connection is dropped
+    # Seeds that don't follow on make one call per frame
+    requests = [api.make_request("board", seed=10 * i, frame=i)
+                for i in range(6)]
+    calls = coalesce(requests, config.max_batch_size)
+    frames = []
+
+    api._dispatch(calls, None, lambda call, images: frames.extend(
+        request.frame for request in call.requests))
+
+    assert sorted(frames) == list(range(6))
+    assert servers[0].stats()["failures"] == 1
+    assert servers[1].stats()["images"] == 6
+    assert api.pool.retries == 1
+    failed, healthy = api.pool.nodes
+    assert not failed.healthy
+    assert 4.0 < failed.retry_at - time.monotonic() <= 5.0
+    # Only the healthy node is handed out during the backoff
+    assert api.pool.acquire() is healthy
+    with pytest.raises(NoBackendAvailable):
+        api.pool.acquire(cancelled=give_up_after(0.1))
+    api.pool.release(healthy)
+
+
+def test_queued_batches_do_not_starve_their_helpers(config, make_api):
+    # Every worker thread runs a batch; their helper loops queue behind
+    # them and must not be waited for
+    config.supersede_running = False
+    config.max_jobs_per_backend = 2
+    api, (server,) = make_api()
+    threads = api.engine.pool.maxThreadCount()
+    jobs = []
+    for i in range(threads):
+        # Seeds that don't follow on make two calls per batch
+        requests = [api.make_request(f"board {i}", seed=2 * frame, frame=frame)
+                    for frame in range(2)]
+        jobs.append(api.generate_batch(requests))
+
+    assert all(job.wait(10) for job in jobs)
+    assert server.stats()["images"] == 2 * threads
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from autoboarding.backend.progress import ProgressPoller
+from benchmarks.server import FakeBackend
+
+
+@pytest.fixture
+def server():
+    with FakeBackend(latency=0, image_size=32) as server:
+        yield server
+
+
+def make_poller(server, preview_interval):
+    progress, previews = [], []
+    poller = ProgressPoller(
+        requests.Session(), server.url, 0.1,
+        lambda percent, eta: progress.append((percent, eta)),
+        previews.append, preview_interval
+    )
+    return poller, progress, previews
+
+
+def test_previews_are_only_requested_every_preview_interval(server):
+    poller, progress, previews = make_poller(server, 0.3)
+
+    for _ in range(3):
+        poller.poll()
+    assert server.previews == 1
+    time.sleep(0.35)
+    poller.poll()
+
+    assert progress == [(50, 1.0)] * 4
+    assert server.previews == 2
+    assert [image.size for image in previews] == [(32, 32)] * 2
+
+
+def test_previews_can_be_turned_off(server):
+    poller, progress, _ = make_poller(server, 0)
+    poller.on_preview = None
+
+    poller.poll()
+
+    assert progress == [(50, 1.0)] and server.previews == 0
+
+
+def test_stopped_poller_reports_nothing_and_exits(server):
+    poller, progress, _ = make_poller(server, 0)
+    thread = threading.Thread(target=poller.run)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while not progress and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    poller.stop()
+    thread.join(1)
+    reported = len(progress)
+    poller.poll()
+
+    assert not thread.is_alive()
+    assert reported >= 1 and len(progress) == reported
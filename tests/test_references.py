@@ -0,0 +1,66 @@
+import base64
+import hashlib
+import os
+
+import requests
+
+from autoboarding.backend.references import ReferenceAssets
+from benchmarks.server import FakeBackend
+
+
+def write(path, data, mtime_ns):
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_files_are_hashed_and_encoded_once_per_content(tmp_path):
+    assets = ReferenceAssets()
+    pose = tmp_path / "pose.png"
+    write(pose, b"pose one", 1_000_000_000)
+    copy = tmp_path / "copy.png"
+    write(copy, b"pose one", 1_000_000_000)
+
+    encoded = assets.base64(str(pose))
+
+    assert encoded == base64.b64encode(b"pose one").decode("ascii")
+    assert assets.digest(str(pose)) == hashlib.sha256(b"pose one").hexdigest()
+    assert assets.base64(str(copy)) is encoded  # Same content, same string
+
+
+def test_changed_files_are_rehashed_by_modification_time(tmp_path):
+    assets = ReferenceAssets()
+    pose = tmp_path / "pose.png"
+    write(pose, b"pose one", 1_000_000_000)
+    first = assets.digest(str(pose))
+    assets.base64(str(pose))
+
+    # Same size and time: taken as unchanged without reading the file
+    write(pose, b"pose two", 1_000_000_000)
+    assert assets.digest(str(pose)) == first
+
+    write(pose, b"pose two", 2_000_000_000)
+    assert assets.digest(str(pose)) == hashlib.sha256(b"pose two").hexdigest()
+    assert assets.base64(str(pose)) == base64.b64encode(b"pose two").decode()
+    assert first not in assets._encoded  # No file has the old content
+
+
+def test_images_are_uploaded_once_per_instance(tmp_path):
+    assets = ReferenceAssets()
+    pose = tmp_path / "pose.png"
+    write(pose, b"pose one", 1_000_000_000)
+    session = requests.Session()
+
+    with FakeBackend("comfyui", latency=0) as a, \
+            FakeBackend("comfyui", latency=0) as b:
+        name = assets.upload(session, a.url, str(pose))
+        assert assets.upload(session, a.url, str(pose)) == name
+        assert assets.upload_data(session, a.url, b"pose one") == name
+        assert assets.uploads == 1
+
+        assets.upload(session, b.url, str(pose))
+        assert assets.uploads == 2
+
+        assets.forget_backend(a.url)  # E.g. after a restart
+        assets.upload(session, a.url, str(pose))
+        assert assets.uploads == 3
+    session.close()
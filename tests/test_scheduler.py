@@ -0,0 +1,52 @@
+from autoboarding.backend.batch import BatchCall, GenerationRequest
+from autoboarding.backend.pool import BackendNode
+from autoboarding.backend.scheduler import JobScheduler
+
+
+def calls_for(*checkpoints):
+    return [BatchCall([GenerationRequest("p", checkpoint=c, frame=i)])
+            for i, c in enumerate(checkpoints)]
+
+
+def test_each_model_stays_on_one_node():
+    a, b = BackendNode("http://a"), BackendNode("http://b")
+    scheduler = JobScheduler(calls_for("x", "y", "x", "y", "x"))
+
+    first_a = scheduler.next_for(a)
+    first_b = scheduler.next_for(b)
+    a.model_key, b.model_key = first_a.first.model_key(), first_b.first.model_key()
+    order_a = [first_a] + [scheduler.next_for(a) for _ in range(2)]
+
+    assert {call.first.checkpoint for call in order_a} == {"x"}
+    assert scheduler.next_for(b).first.checkpoint == "y"
+    assert scheduler.next_for(a) is None
+    assert scheduler.pending() == 0
+
+
+def test_node_prefers_the_model_it_has_loaded():
+    a = BackendNode("http://a")
+    a.model_key = GenerationRequest("p", checkpoint="y").model_key()
+    scheduler = JobScheduler(calls_for("x", "y"))
+
+    assert scheduler.next_for(a).first.checkpoint == "y"
+
+
+def test_idle_node_helps_with_the_largest_pinned_group():
+    a, b = BackendNode("http://a"), BackendNode("http://b")
+    scheduler = JobScheduler(calls_for("x", "x", "x"))
+
+    scheduler.next_for(a)
+
+    assert scheduler.next_for(b).first.checkpoint == "x"
+    assert scheduler.pending() == 1
+
+
+def test_requeued_calls_come_back_first():
+    a = BackendNode("http://a")
+    scheduler = JobScheduler(calls_for("x", "x"))
+    call = scheduler.next_for(a)
+
+    scheduler.requeue(call)
+
+    assert scheduler.pending() == 2
+    assert scheduler.next_for(BackendNode("http://b")) is call
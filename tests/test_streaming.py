@@ -0,0 +1,67 @@
+import base64
+import json
+
+import pytest
+
+from autoboarding.backend.streaming import iter_base64_array
+
+
+def chunked(data: bytes, size: int):
+    """Split a body into chunks of size bytes, like iter_content()."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def encode(images, **fields) -> bytes:
+    body = dict(fields, images=[base64.b64encode(i).decode() for i in images])
+    return json.dumps(body).encode()
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 1 << 20])
+def test_decodes_images_across_chunk_boundaries(size):
+    images = [bytes(range(256)) * 5, b"second", b""]
+    body = encode(images, parameters={"prompt": "a \"quoted\" [cat]"},
+                  info="{}")
+    assert list(iter_base64_array(chunked(body, size))) == images
+
+
+def test_skips_fields_before_and_after_the_array():
+    body = (b'{"a": [1, {"b": "]}"}], "n": -1.5e3, "t": true, "z": null,'
+            b' "images": ["aGk="], "info": {"x": ["y"]}}')
+    assert list(iter_base64_array([body])) == [b"hi"]
+
+
+def test_surrogate_pair_escapes_in_skipped_fields():
+    # ensure_ascii writes characters beyond the BMP as surrogate pairs
+    body = json.dumps({"images": ["AAAA"],
+                       "parameters": {"prompt": "cat \U0001F600"}}).encode()
+    assert b"\\ud83d\\ude00" in body
+    assert list(iter_base64_array(chunked(body, 5))) == [b"\x00\x00\x00"]
+
+
+def test_escapes_in_keys_are_resolved():
+    body = b'{"\\u0069mages": ["aGk="], "\\ud83d\\ude00": 1, "\\ud83d": 2}'
+    assert list(iter_base64_array([body])) == [b"hi"]
+
+
+def test_unpadded_and_wrapped_base64():
+    body = b'{"images": ["aGk", "aGVs\\nbG8="]}'
+    assert list(iter_base64_array([body])) == [b"hi", b"hello"]
+
+
+def test_images_are_yielded_before_the_body_ends():
+    def chunks():
+        yield b'{"images": ["aGk=", '
+        raise AssertionError("read past the first image")
+
+    assert next(iter_base64_array(chunks())) == b"hi"
+
+
+@pytest.mark.parametrize("body", [
+    b'{"info": "x"}',
+    b'{"images": ["aGk=", ',
+    b'[1, 2]',
+    b'{"images": ["aGk="], "x": "\\uZZZZ"}',
+])
+def test_malformed_bodies_raise_value_error(body):
+    with pytest.raises(ValueError):
+        list(iter_base64_array([body]))
@@ -0,0 +1,80 @@
+import pytest
+
+from autoboarding.backend.worker import Job
+from autoboarding.tiling import plan_tiles
+
+
+@pytest.mark.parametrize("width,height,tile_size,overlap", [
+    (512, 512, 768, 64),
+    (2048, 1024, 768, 64),
+    (4096, 2304, 768, 64),
+    (1000, 776, 256, 32),
+])
+def test_tiles_cover_the_target_with_overlap(width, height, tile_size, overlap):
+    tiles = plan_tiles(width, height, tile_size, overlap)
+
+    assert [tile.index for tile in tiles] == list(range(len(tiles)))
+    covered = set()
+    for tile in tiles:
+        assert tile.width <= tile_size and tile.height <= tile_size
+        assert tile.x + tile.width <= width and tile.y + tile.height <= height
+        covered.add((tile.x, tile.y))
+    assert len(covered) == len(tiles)
+    # Neighbours in a row share at least the overlap
+    xs = sorted({tile.x for tile in tiles})
+    for left, right in zip(xs, xs[1:]):
+        assert left + tiles[0].width - right >= min(overlap, tiles[0].width // 2)
+    assert xs[-1] + tiles[0].width == width
+    assert max(tile.y + tile.height for tile in tiles) == height
+
+
+def test_small_target_is_a_single_tile():
+    (tile,) = plan_tiles(320, 200, 768, 64)
+    assert (tile.x, tile.y, tile.width, tile.height) == (0, 0, 320, 200)
+
+
+@pytest.fixture
+def tiled_config(config, tmp_path):
+    config.tile_size = 64
+    config.tile_overlap = 16
+    config.default_width = config.default_height = 64
+    return config
+
+
+def test_tiled_generation_refines_every_tile(tiled_config, make_api):
+    api, (server,) = make_api()
+    written = []
+    api.tile_complete.connect(written.append)
+    request = api.make_request("castle", seed=7)
+
+    api._run_tiled([request], 160, 96)
+
+    tiles = plan_tiles(160, 96, 64, 16)
+    assert len(written) == 1 + len(tiles)
+    assert server.stats()["calls"] == 1 + len(tiles)
+    # The first report is the whole upscaled base, then one per tile
+    assert (written[0].width, written[0].height) == (160, 96)
+
+
+def test_cancelled_tiled_base_is_not_cached(tiled_config, make_api, tmp_path):
+    tiled_config.cache_enabled = True
+    tiled_config.cache_path = tmp_path / "cache"
+    api, (server,) = make_api()
+    request = api.make_request("castle", seed=7, checkpoint="bench")
+    job = Job(lambda: None)
+    generate = api._generate
+
+    def generate_then_cancel(call, job):
+        images = generate(call, job)
+        job.cancel()  # Superseded while the base was generating
+        return images
+
+    api._generate = generate_then_cancel
+    Job._local.job = job
+    try:
+        api._run_tiled([request], 160, 96)
+    finally:
+        Job._local.job = None
+
+    assert server.stats()["calls"] == 1
+    assert api._cache_lookup(request) is None
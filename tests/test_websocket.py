@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from autoboarding.backend.websocket import (
+    OP_BINARY, OP_CLOSE, OP_CONTINUATION, OP_PING, OP_PONG, OP_TEXT,
+    WebSocket, WebSocketError, _mask
+)
+
+
+def frame(opcode: int, payload: bytes, fin: bool = True) -> bytes:
+    """Build an unmasked server frame."""
+    header = bytes([(0x80 if fin else 0) | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    return header + payload
+
+
+def read_client_frame(sock: socket.socket):
+    """Read one masked client frame from the server side."""
+    def read(count):
+        data = b""
+        while len(data) < count:
+            data += sock.recv(count - len(data))
+        return data
+
+    first, second = read(2)
+    assert second & 0x80, "client frames must be masked"
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", read(8))[0]
+    key = read(4)
+    return first & 0x0F, _mask(key, read(length))
+
+
+@pytest.fixture
+def pair():
+    client, server = socket.socketpair()
+    ws = WebSocket(client)
+    yield ws, server
+    ws.close()
+    server.close()
+
+
+def test_mask_is_its_own_inverse():
+    key = b"\x01\x02\x03\x04"
+    data = bytes(range(11))
+    assert _mask(key, data) != data
+    assert _mask(key, _mask(key, data)) == data
+    assert _mask(key, b"") == b""
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 65535, 65536, 200000])
+def test_receives_messages_of_every_length_encoding(pair, size):
+    ws, server = pair
+    payload = bytes(i % 251 for i in range(size))
+    server.sendall(frame(OP_BINARY, payload))
+    assert ws.recv(timeout=2) == (OP_BINARY, payload)
+
+
+def test_reassembles_fragments_split_across_reads(pair):
+    ws, server = pair
+    data = (frame(OP_TEXT, b"hel", fin=False)
+            + frame(OP_PING, b"hi")  # Control frames may interleave
+            + frame(OP_CONTINUATION, b"lo"))
+    sender = threading.Thread(
+        target=lambda: [server.sendall(data[i:i + 3])
+                        for i in range(0, len(data), 3)]
+    )
+    sender.start()
+    assert ws.recv(timeout=2) == (OP_TEXT, b"hello")
+    sender.join()
+    assert read_client_frame(server) == (OP_PONG, b"hi")
+
+
+def test_data_buffered_after_the_handshake_is_read_first():
+    client, server = socket.socketpair()
+    ws = WebSocket(client, frame(OP_TEXT, b"early"))
+    assert ws.recv(timeout=1) == (OP_TEXT, b"early")
+    ws.close()
+    server.close()
+
+
+def test_recv_times_out_without_a_message(pair):
+    ws, _ = pair
+    assert ws.recv(timeout=0.05) is None
+
+
+def test_close_frame_from_server_raises(pair):
+    ws, server = pair
+    server.sendall(frame(OP_CLOSE, struct.pack("!H", 1000)))
+    with pytest.raises(WebSocketError):
+        ws.recv(timeout=1)
+    assert ws.closed
+    assert read_client_frame(server)[0] == OP_CLOSE
+
+
+def test_dropped_connection_raises(pair):
+    ws, server = pair
+    server.close()
+    with pytest.raises(WebSocketError):
+        ws.recv(timeout=1)
+
+
+def serve_handshake(accept=None):
+    """Answer one upgrade request, with a wrong accept key if given one."""
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def answer():
+        conn, _ = listener.accept()
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        key = [line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+               if line.lower().startswith(b"sec-websocket-key")][0]
+        expected = base64.b64encode(hashlib.sha1(
+            key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest())
+        conn.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: "
+            + (accept or expected) + b"\r\n\r\n" + frame(OP_TEXT, b"welcome")
+        )
+        conn.recv(1024)  # Wait for the client's close
+        conn.close()
+        listener.close()
+
+    threading.Thread(target=answer, daemon=True).start()
+    return f"ws://127.0.0.1:{listener.getsockname()[1]}/ws?clientId=test"
+
+
+def test_connect_completes_the_handshake():
+    with WebSocket.connect(serve_handshake(), timeout=2) as ws:
+        assert ws.recv(timeout=2) == (OP_TEXT, b"welcome")
+
+
+def test_connect_rejects_a_wrong_accept_key():
+    with pytest.raises(WebSocketError):
+        WebSocket.connect(serve_handshake(accept=b"bogus"), timeout=2)
+
+
+def test_connect_fails_cleanly_without_a_server():
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    with pytest.raises(WebSocketError):
+        WebSocket.connect(f"ws://127.0.0.1:{port}/ws", timeout=1)
+
+
+def test_follows_the_fake_comfyui_event_stream():
+    from benchmarks.server import FakeBackend
+
+    with FakeBackend("comfyui", latency=0, image_latency=0,
+                     image_size=16) as backend:
+        url = backend.url.replace("http://", "ws://") + "/ws?clientId=c1"
+        with WebSocket.connect(url, timeout=2) as ws:
+            # Registered once the handshake is done
+            for _ in range(100):
+                if "c1" in backend._clients:
+                    break
+                time.sleep(0.01)
+            backend._execute("c1", "p1", {
+                "9": {"class_type": "SaveImage", "inputs": {}}
+            })
+            events = []
+            while not events or events[-1] != "executing":
+                opcode, payload = ws.recv(timeout=2)
+                assert opcode == OP_TEXT
+                events.append(json.loads(payload)["type"])
+    assert events == ["execution_start", "progress", "executed", "executing"]
@@ -0,0 +1,70 @@
+import threading
+
+from autoboarding.backend.worker import Job, JobEngine
+
+
+def test_jobs_run_off_the_calling_thread_and_know_themselves():
+    engine = JobEngine(2)
+    seen = []
+
+    job = engine.submit(lambda value: seen.append(
+        (value, Job.current(), threading.current_thread())), 42)
+
+    assert job.wait(2)
+    (value, current, thread) = seen[0]
+    assert (value, current) == (42, job)
+    assert thread is not threading.current_thread()
+    assert Job.current() is None
+    assert engine.wait(2) and engine.active_jobs() == 0
+
+
+def test_jobs_cancelled_before_they_start_never_run():
+    engine = JobEngine(1)
+    release = threading.Event()
+    ran = []
+    blocker = engine.submit(release.wait, 5)
+    queued = engine.submit(ran.append, "queued")
+
+    queued.cancel()
+    release.set()
+
+    assert queued.wait(2) and blocker.wait(2)
+    assert queued.is_cancelled() and ran == []
+
+
+def test_errors_are_contained_in_the_job():
+    engine = JobEngine(1)
+
+    job = engine.submit(lambda: 1 / 0)
+
+    assert job.wait(2) and job.is_done()
+    assert engine.submit(lambda: None).wait(2)
+
+
+def test_queued_jobs_can_be_taken_back():
+    engine = JobEngine(1)
+    started, release = threading.Event(), threading.Event()
+    blocker = engine.submit(lambda: (started.set(), release.wait(5)))
+    queued = engine.submit(lambda: None)
+    started.wait(2)
+
+    assert not engine.take(blocker)  # Already running
+    assert engine.take(queued)
+    assert queued.is_done() and queued.is_cancelled()
+    assert engine.active_jobs() == 1
+    release.set()
+    assert engine.wait(2)
+
+
+def test_shutdown_drops_queued_jobs():
+    engine = JobEngine(1)
+    release = threading.Event()
+    ran = []
+    blocker = engine.submit(release.wait, 0.2)
+    queued = engine.submit(ran.append, "queued")
+
+    engine.shutdown(2)
+
+    assert blocker.is_done()
+    assert queued.is_done() and queued.is_cancelled() and ran == []
+    assert engine.active_jobs() == 0